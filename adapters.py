@@ -0,0 +1,72 @@
+# adapters.py - מתאמי אתרים מהודרים מתוך התיאורים ב-sites.py
+
+import re
+from typing import Dict, List, Optional, Pattern
+from bs4 import Tag
+from sites import ADAPTERS
+from fields import FieldExtractor
+
+
+def _compile(pattern: Optional[str]) -> Optional[Pattern]:
+    """מהדר ביטוי של מחלקה (class), או None אם לא הוגדר"""
+    return re.compile(pattern, re.I) if pattern else None
+
+
+class SiteAdapter:
+    """תיאור אתר מהודר - הביטויים נבנים פעם אחת לכל ריצה ומשמשים לכל הכרטיסים"""
+
+    def __init__(self, name: str, spec: Dict):
+        self.name = name
+        self.label: Optional[str] = spec.get("label")
+        self.container_tags: List[str] = spec["container_tags"]
+        self.container_class: Pattern = re.compile(spec["container_class"], re.I)
+        self.title_tags: List[str] = spec.get("title_tags", ["h2", "h3", "h4"])
+        self.title_class = _compile(spec.get("title_class"))
+        self.desc_tags: Optional[List[str]] = spec.get("desc_tags")
+        self.desc_class = _compile(spec.get("desc_class"))
+        self.price_class = _compile(spec.get("price_class"))
+        self.link_class = _compile(spec.get("link_class"))
+        self.title_fallback: Optional[str] = spec.get("title_fallback")
+        self.enrich: bool = spec.get("enrich", False)
+        self.structured: Optional[str] = spec.get("structured")
+        self.page_param: Optional[str] = spec.get("page_param")
+        self.end_marker = _compile(spec.get("end_marker"))
+        # חילוץ מחיר, טלפון ומיקום מהכרטיסים - לפי מחלקת המחיר של המתאם
+        self.fields = FieldExtractor(self.price_class)
+
+    def site_label(self, site: Dict) -> str:
+        """השם שמופיע בתוצאות - של המתאם, או של האתר"""
+        return self.label or site["name"]
+
+    def find_title(self, card: Tag) -> Optional[Tag]:
+        """אלמנט הכותרת בכרטיס"""
+        if self.title_class:
+            return card.find(self.title_tags, class_=self.title_class)
+        return card.find(self.title_tags)
+
+    def find_description(self, card: Tag) -> Optional[Tag]:
+        """אלמנט התיאור בכרטיס (אם הוגדר למתאם)"""
+        if not self.desc_tags:
+            return None
+        if self.desc_class:
+            return card.find(self.desc_tags, class_=self.desc_class)
+        return card.find(self.desc_tags)
+
+    def find_price(self, card: Tag) -> Optional[Tag]:
+        """אלמנט המחיר בכרטיס (אם הוגדר למתאם)"""
+        if not self.price_class:
+            return None
+        return card.find(class_=self.price_class)
+
+    def find_link(self, card: Tag) -> Optional[Tag]:
+        """הקישור של המודעה - הכרטיס עצמו אם הוא קישור"""
+        if card.name == "a" and card.get("href"):
+            return card
+        if self.link_class:
+            return card.find("a", href=True, class_=self.link_class) or card.find("a", href=True)
+        return card.find("a", href=True)
+
+
+def compile_adapters() -> Dict[str, SiteAdapter]:
+    """מהדר את כל המתאמים מ-sites.py - פעם אחת לכל ריצה"""
+    return {name: SiteAdapter(name, spec) for name, spec in ADAPTERS.items()}
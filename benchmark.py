@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# benchmark.py - מדידות ביצועים אופליין
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+from fingerprints import FingerprintSet, fingerprint
+
+
+def _item_ids(count: int, salt: str = "") -> List[str]:
+    """מזהים באותו פורמט של generate_item_id (MD5 hex)"""
+    return [hashlib.md5(f"{salt}{i}".encode()).hexdigest() for i in range(count)]
+
+
+def _timed(func):
+    """מריץ פונקציה ומחזיר (תוצאה, שניות, שיא זיכרון בבתים)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_seen(sizes: List[int], lookups: int = 100_000) -> List[Dict]:
+    """משווה את קבוצת ה-JSON הישנה מול קבוצת הטביעות הקומפקטית"""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            ids = _item_ids(size)
+            # חצי מהחיפושים פוגעים וחצי לא
+            probes = random.sample(ids, min(lookups // 2, size)) + _item_ids(lookups // 2, salt="miss")
+
+            json_path = os.path.join(tmp, "seen_items.json")
+            with open(json_path, "w") as f:
+                json.dump({"items": ids, "last_updated": ""}, f, indent=2)
+
+            def load_json():
+                with open(json_path, "r") as f:
+                    return set(json.load(f).get("items", []))
+
+            json_set, json_load, json_mem = _timed(load_json)
+            started = time.perf_counter()
+            json_hits = sum(1 for key in probes if key in json_set)
+            json_lookup = time.perf_counter() - started
+            del json_set
+
+            fp_path = os.path.join(tmp, "seen_items.fp")
+            FingerprintSet.from_keys(ids).save(fp_path)
+            fp_set, fp_load, fp_mem = _timed(lambda: FingerprintSet.load(fp_path))
+            started = time.perf_counter()
+            fp_hits = sum(1 for key in probes if fingerprint(key) in fp_set)
+            fp_lookup = time.perf_counter() - started
+            fp_set.close()
+
+            rows.append({
+                "size": size,
+                "json": {
+                    "file_bytes": os.path.getsize(json_path),
+                    "load_s": round(json_load, 4),
+                    "memory_bytes": json_mem,
+                    "lookup_us": round(json_lookup / len(probes) * 1e6, 3),
+                    "hits": json_hits,
+                },
+                "fingerprints": {
+                    "file_bytes": os.path.getsize(fp_path),
+                    "load_s": round(fp_load, 4),
+                    "memory_bytes": fp_mem,
+                    "lookup_us": round(fp_lookup / len(probes) * 1e6, 3),
+                    "hits": fp_hits,
+                },
+            })
+    return rows
+
+
+def print_seen(rows: List[Dict]) -> None:
+    """מדפיס טבלת השוואה"""
+    print(f"{'size':>9} | {'store':<12} | {'file KB':>9} | {'load ms':>8} | {'mem KB':>9} | {'lookup us':>9}")
+    print("-" * 72)
+    for row in rows:
+        for name in ("json", "fingerprints"):
+            r = row[name]
+            print(f"{row['size']:>9} | {name:<12} | {r['file_bytes'] / 1024:>9.0f} | {r['load_s'] * 1000:>8.1f} | "
+                  f"{r['memory_bytes'] / 1024:>9.0f} | {r['lookup_us']:>9.3f}")
+
+
+# ==========================================
+# מתאמי אתרים מול דפי HTML שמורים וסינתטיים
+# ==========================================
+
+_MODELS = ["גלוק 17", "גלוק 19", "Sig Sauer P320", "CZ 75", "Jericho 941", "Beretta 92", "Walther PDP"]
+_CITIES = ["תל אביב", "ירושלים", "חיפה", "באר שבע", "נתניה", "ראשון לציון"]
+_WORDS = "מצב מעולה כמו חדש שמור היטב כולל נרתיק ומחסניות נוספות נמכר עקב מעבר דירה בדיקה במקום".split()
+
+
+def _class_word(pattern: Optional[str], default: str) -> str:
+    """מילה ראשונה מתוך ביטוי מחלקה - כדי שהמתאם יזהה את האלמנט הסינתטי"""
+    words = re.findall(r"[A-Za-z][\w-]*", pattern or "")
+    return words[0] if words else default
+
+
+def synthetic_page(adapter_name: str, cards: int, hit_ratio: float = 0.1, seed: int = 0) -> str:
+    """
+    דף רשימה סינתטי בסגנון המתאם - cards כרטיסים, כ-hit_ratio מהם עם מילת חיפוש
+    במתאם עם __NEXT_DATA__ אותן מודעות מוטמעות גם כ-JSON.
+    """
+    from config import SEARCH_TERMS
+    from sites import ADAPTERS
+
+    spec = ADAPTERS[adapter_name]
+    rng = random.Random(seed)
+    tag = spec["container_tags"][0]
+    card_class = _class_word(spec["container_class"], "card")
+    title_tag = spec.get("title_tags", ["h2"])[0]
+    title_class = _class_word(spec.get("title_class"), "title")
+    desc_tag = (spec.get("desc_tags") or ["p"])[0]
+    desc_class = _class_word(spec.get("desc_class"), "desc")
+    price_class = _class_word(spec.get("price_class"), "price")
+
+    parts = ['<!DOCTYPE html><html dir="rtl"><head><meta charset="utf-8"><title>רשימה</title>',
+             '<style>body{font-family:Arial}</style></head><body>',
+             '<header><nav><ul>' + "".join(f'<li><a href="/c/{i}">קטגוריה {i}</a></li>' for i in range(30)) + '</ul></nav></header>',
+             '<main><section class="results">']
+    objects = []
+    for i in range(cards):
+        term = rng.choice(SEARCH_TERMS) if rng.random() < hit_ratio else ""
+        title = f"{rng.choice(_MODELS)} {term}".strip()
+        desc = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(40, 70)))
+        price = rng.randint(20, 150) * 100
+        city = rng.choice(_CITIES)
+        parts.append(
+            f'<{tag} class="{card_class}" data-id="{i}">'
+            f'<div class="media"><img src="/img/{i}.jpg" alt=""></div>'
+            f'<{title_tag} class="{title_class}">{title}</{title_tag}>'
+            f'<{desc_tag} class="{desc_class}">{desc} טלפון 05{rng.randint(0, 9)}-{rng.randint(1000000, 9999999)}</{desc_tag}>'
+            f'<span class="{price_class}">{price:,} ₪</span><span class="city">{city}</span>'
+            f'<a href="/item/{i}">לפרטים</a></{tag}>'
+        )
+        objects.append({"token": f"t{i}", "title": title, "price": price,
+                        "address": {"city": {"text": city}}, "metaData": {"description": desc}})
+    parts.append('</section></main><footer>' + "<p>כל הזכויות שמורות</p>" * 20 + '</footer>')
+    if spec.get("structured") == "next_data":
+        data = {"props": {"pageProps": {"feed": {"private": objects}}}}
+        parts.append(f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data, ensure_ascii=False)}</script>')
+    parts.append('</body></html>')
+    return "".join(parts)
+
+
+def load_fixtures(directory: str) -> List[Tuple[str, str, str]]:
+    """דפים שמורים מהתיקייה - (מתאם, שם, HTML). המתאם הוא תחילת שם הקובץ עד הנקודה הראשונה"""
+    from sites import ADAPTERS
+
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        name = os.path.basename(path)
+        adapter_name = name.split(".")[0]
+        if adapter_name not in ADAPTERS:
+            adapter_name = "generic"
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            fixtures.append((adapter_name, name, f.read()))
+    return fixtures
+
+
+def _best(func: Callable, repeat: int):
+    """מריץ repeat פעמים ומחזיר (תוצאה, הזמן הטוב ביותר בשניות)"""
+    best = None
+    result = None
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def bench_page(scraper, adapter_name: str, markup: str, parser: str, repeat: int = 3) -> Dict:
+    """מודד דף אחד: פענוח, חילוץ כרטיסים, התאמה ובניית רשומות, ושיא זיכרון של כל השרשרת"""
+    from cards import extract_cards
+    from parsers import parse_html, resolve_backend
+    from structured import decode_next_data_listings
+
+    adapter = scraper.adapters[adapter_name]
+    site = {"name": adapter_name, "base_url": "https://example.com"}
+    size_mb = len(markup.encode("utf-8")) / 1e6
+
+    scan, prefilter_s = _best(lambda: scraper.prefilter.scan(markup), repeat)
+    soup, parse_s = _best(lambda: parse_html(markup, parser), repeat)
+    (cards, _), cards_s = _best(lambda: extract_cards(soup, adapter.container_tags, adapter.container_class), repeat)
+    texts = [text for _, text in cards]
+    terms, match_s = _best(lambda: [scraper.match_term(text) for text in texts], repeat)
+    matched = [(card, text, term) for (card, text), term in zip(cards, terms) if term]
+    _, extract_s = _best(lambda: [scraper._build_listing(adapter, site, card, text, term, "https://example.com")
+                                  for card, text, term in matched], repeat)
+
+    def pipeline():
+        page = parse_html(markup, parser)
+        found, _ = extract_cards(page, adapter.container_tags, adapter.container_class)
+        for card, text in found:
+            term = scraper.match_term(text)
+            if term:
+                scraper._build_listing(adapter, site, card, text, term, "https://example.com")
+
+    _, _, peak = _timed(pipeline)
+    total_s = parse_s + cards_s + match_s + extract_s
+    row = {
+        "adapter": adapter_name,
+        "parser": resolve_backend(parser),
+        "mb": round(size_mb, 3),
+        "prefilter_ms": round(prefilter_s * 1000, 2),
+        "prefilter_mb_s": round(size_mb / prefilter_s, 2) if prefilter_s else 0.0,
+        "prefilter_hits": len(scan.hits),
+        "cards": len(cards),
+        "matches": len(matched),
+        "parse_ms": round(parse_s * 1000, 2),
+        "parse_mb_s": round(size_mb / parse_s, 2) if parse_s else 0.0,
+        "cards_ms": round(cards_s * 1000, 2),
+        "match_ms": round(match_s * 1000, 2),
+        "match_cards_s": round(len(cards) / match_s) if match_s else 0,
+        "extract_ms": round(extract_s * 1000, 2),
+        "extract_cards_s": round(len(matched) / extract_s) if extract_s else 0,
+        "total_ms": round(total_s * 1000, 2),
+        "total_cards_s": round(len(cards) / total_s) if total_s else 0,
+        "total_mb_s": round(size_mb / total_s, 2) if total_s else 0.0,
+        "peak_mb": round(peak / 1e6, 2),
+    }
+
+    # מסלול ה-JSON המוטמע - בלי DOM בכלל
+    if adapter.structured == "next_data":
+        listings, structured_s = _best(lambda: decode_next_data_listings(markup, site["base_url"]), repeat)
+        if listings:
+            results, structured_match_s = _best(lambda: scraper._structured_results(adapter, site, listings), repeat)
+            row["structured_ms"] = round((structured_s + structured_match_s) * 1000, 2)
+            row["structured_cards_s"] = round(len(listings) / (structured_s + structured_match_s))
+            row["structured_matches"] = len(results)
+    return row
+
+
+# המימוש הקודם של חילוץ השדות - ביטוי אחרי ביטוי וחיפוש נפרד לכל אלמנט - כבסיס להשוואה
+_LEGACY_PRICE = [
+    r"(\d{1,3}(?:,\d{3})*)\s*₪",
+    r"₪\s*(\d{1,3}(?:,\d{3})*)",
+    r"(\d{1,3}(?:,\d{3})*)\s*ש[״\']?ח",
+    r"(\d{4,5})\s*(?:שקל|שח)",
+    r"מחיר[:\s]*(\d{1,3}(?:,\d{3})*)",
+]
+_LEGACY_PHONE = [r"(0\d{1,2}[-\s]?\d{7})", r"(05\d[-\s]?\d{7})", r"(\d{3}[-\s]?\d{7})"]
+
+
+def _legacy_first(patterns: List[str], text: str, default: str, prefix: str = "") -> str:
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            return prefix + match.group(1)
+    return default
+
+
+def _legacy_fields(adapter, card, text: str) -> Dict:
+    price_elem = adapter.find_price(card)
+    price = _legacy_first(_LEGACY_PRICE, price_elem.get_text(), "לא צוין", "₪") if price_elem else "לא צוין"
+    if price == "לא צוין":
+        price = _legacy_first(_LEGACY_PRICE, text, "לא צוין", "₪")
+    location_elem = card.find(class_=re.compile(r"(location|city|area|address)", re.I))
+    return {
+        "price": price,
+        "phone": _legacy_first(_LEGACY_PHONE, text, ""),
+        "location": location_elem.get_text().strip()[:50] if location_elem else "",
+    }
+
+
+def bench_fields(adapters: List[str], card_counts: List[int], parser: str, repeat: int) -> List[Dict]:
+    """
+    משווה את חילוץ השדות הקודם מול FieldExtractor על כל הכרטיסים בדפים סינתטיים
+    diffs - כרטיסים שבהם התוצאה שונה (הטלפון מושווה אחרי נרמול).
+    """
+    from adapters import compile_adapters
+    from cards import extract_cards
+    from fields import normalize_phone
+    from parsers import parse_html
+
+    compiled = compile_adapters()
+    rows = []
+    for name in adapters:
+        adapter = compiled[name]
+        for count in card_counts:
+            soup = parse_html(synthetic_page(name, count, seed=count), parser)
+            cards, _ = extract_cards(soup, adapter.container_tags, adapter.container_class)
+            legacy, legacy_s = _best(lambda: [_legacy_fields(adapter, card, text) for card, text in cards], repeat)
+            engine, engine_s = _best(lambda: adapter.fields.extract_many(cards), repeat)
+            diffs = sum(
+                1 for old, new in zip(legacy, engine)
+                if (old["price"], normalize_phone(old["phone"]) if old["phone"] else "", old["location"])
+                != (new["price"], new["phone"], new["location"])
+            )
+            rows.append({
+                "case": f"{name}/synthetic-{count}",
+                "cards": len(cards),
+                "legacy_ms": round(legacy_s * 1000, 2),
+                "engine_ms": round(engine_s * 1000, 2),
+                "engine_cards_s": round(len(cards) / engine_s) if engine_s else 0,
+                "speedup": round(legacy_s / engine_s, 2) if engine_s else 0.0,
+                "diffs": diffs,
+            })
+    return rows
+
+
+def print_fields(rows: List[Dict]) -> None:
+    """מדפיס טבלת השוואה לחילוץ השדות"""
+    print(f"{'case':<34} | {'cards':>6} | {'legacy ms':>10} | {'engine ms':>10} | {'cards/s':>8} | {'speedup':>7} | {'diffs':>5}")
+    print("-" * 98)
+    for r in rows:
+        print(f"{r['case']:<34} | {r['cards']:>6} | {r['legacy_ms']:>10.2f} | {r['engine_ms']:>10.2f} | "
+              f"{r['engine_cards_s']:>8} | {r['speedup']:>6.2f}x | {r['diffs']:>5}")
+
+
+def bench_adapters(adapters: List[str], card_counts: List[int], fixtures_dir: Optional[str],
+                   parser: str, repeat: int) -> List[Dict]:
+    """מריץ את כל המתאמים מול דפים סינתטיים בכמה גדלים ומול הדפים השמורים"""
+    from scraper import GunScraper
+
+    scraper = GunScraper(known_listings=set())
+    cases = [(name, f"synthetic-{count}", synthetic_page(name, count)) for name in adapters for count in card_counts]
+    if fixtures_dir and os.path.isdir(fixtures_dir):
+        cases += [case for case in load_fixtures(fixtures_dir) if case[0] in adapters]
+
+    rows = []
+    for adapter_name, case, markup in cases:
+        row = bench_page(scraper, adapter_name, markup, parser, repeat)
+        row["case"] = f"{adapter_name}/{case}"
+        rows.append(row)
+        print(f"  ⏱️ {row['case']}: {row['total_ms']:.0f} ms")
+    return rows
+
+
+def print_adapters(rows: List[Dict]) -> None:
+    """מדפיס טבלת תפוקה לכל מקרה"""
+    print(f"{'case':<34} | {'MB':>6} | {'cards':>6} | {'prefilter MB/s':>14} | {'parse MB/s':>10} | {'match c/s':>10} | "
+          f"{'extract c/s':>11} | {'total MB/s':>10} | {'peak MB':>8}")
+    print("-" * 132)
+    for r in rows:
+        print(f"{r['case']:<34} | {r['mb']:>6.2f} | {r['cards']:>6} | {r['prefilter_mb_s']:>14.2f} | {r['parse_mb_s']:>10.2f} | "
+              f"{r['match_cards_s']:>10} | {r['extract_cards_s']:>11} | {r['total_mb_s']:>10.2f} | {r['peak_mb']:>8.1f}")
+
+
+def load_thresholds(path: str) -> Dict:
+    """קובץ הספים - "repeat" הוא מספר החזרות שלפיו הספים כוילו"""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def check_thresholds(rows: List[Dict], path: str) -> List[str]:
+    """
+    בודק את התוצאות מול קובץ הספים - min_<שדה> הוא רצפה ו-max_<שדה> הוא תקרה
+    "default" חל על כל המקרים, ו-"cases" (לפי שם המקרה או המתאם) גובר עליו.
+    """
+    thresholds = load_thresholds(path)
+    violations = []
+    for row in rows:
+        limits = dict(thresholds.get("default", {}))
+        limits.update(thresholds.get("cases", {}).get(row["adapter"], {}))
+        limits.update(thresholds.get("cases", {}).get(row["case"], {}))
+        for key, limit in limits.items():
+            bound, field = key.split("_", 1)
+            value = row.get(field)
+            if value is None:
+                continue
+            if (bound == "min" and value < limit) or (bound == "max" and value > limit):
+                violations.append(f"{row['case']}: {field}={value} ({bound} {limit})")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YAD2 Scraper benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seen = sub.add_parser("seen", help="JSON set vs. compact fingerprint set")
+    seen.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    seen.add_argument("--output", help="write results as JSON")
+
+    from sites import ADAPTERS
+    adapters = sub.add_parser("adapters", help="site adapters over saved and synthetic HTML pages")
+    adapters.add_argument("--adapters", nargs="+", default=list(ADAPTERS), choices=list(ADAPTERS))
+    adapters.add_argument("--cards", type=int, nargs="+", default=[50, 1000, 7000],
+                          help="cards per synthetic page (7,000 is roughly 6 MB)")
+    adapters.add_argument("--fixtures", default="fixtures", help="directory of saved <adapter>.*.html pages")
+    adapters.add_argument("--parser", default=None, help="HTML parser (default: HTML_PARSER from config)")
+    adapters.add_argument("--repeat", type=int, default=None,
+                          help="best of N runs per case (default 3; with --thresholds at least the calibrated repeat)")
+    adapters.add_argument("--output", help="write results as JSON")
+    adapters.add_argument("--thresholds", help="JSON file of min_/max_ limits; exit 1 on regression")
+
+    fields = sub.add_parser("fields", help="legacy per-pattern field helpers vs. single-pass FieldExtractor")
+    fields.add_argument("--adapters", nargs="+", default=list(ADAPTERS), choices=list(ADAPTERS))
+    fields.add_argument("--cards", type=int, nargs="+", default=[50, 1000])
+    fields.add_argument("--parser", default=None, help="HTML parser (default: HTML_PARSER from config)")
+    fields.add_argument("--repeat", type=int, default=3)
+    fields.add_argument("--output", help="write results as JSON")
+
+    args = parser.parse_args()
+    if args.command == "seen":
+        rows = bench_seen(args.sizes)
+        print_seen(rows)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(rows, f, indent=2)
+    elif args.command == "adapters":
+        from config import HTML_PARSER
+        repeat = args.repeat or 3
+        if args.thresholds:
+            # הספים כוילו על הטוב מבין כמה ריצות - פחות ריצות מזה מודדות רעש ולא רגרסיה
+            calibrated = int(load_thresholds(args.thresholds).get("repeat", 1))
+            if repeat < calibrated:
+                if args.repeat:
+                    print(f"ℹ️ --repeat {args.repeat} הועלה ל-{calibrated}, מספר החזרות שלפיו כוילו הספים")
+                repeat = calibrated
+        rows = bench_adapters(args.adapters, args.cards, args.fixtures, args.parser or HTML_PARSER, repeat)
+        print_adapters(rows)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(rows, f, indent=2, ensure_ascii=False)
+        if args.thresholds:
+            violations = check_thresholds(rows, args.thresholds)
+            for violation in violations:
+                print(f"❌ {violation}")
+            if violations:
+                sys.exit(1)
+            print("✅ כל הספים עומדים")
+
+    elif args.command == "fields":
+        from config import HTML_PARSER
+        rows = bench_fields(args.adapters, args.cards, args.parser or HTML_PARSER, args.repeat)
+        print_fields(rows)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(rows, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# cache.py - מטמונים מתמידים: בקשות HTTP מותנות ושדות מדפים פנימיים
+
+import json
+import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import requests
+from config import (
+    SEEN_ITEMS_FILE,
+    HTTP_CACHE_FILE,
+    INNER_CACHE_FILE,
+    INNER_CACHE_TTL_DAYS,
+    INNER_CACHE_MAX_ENTRIES,
+)
+
+
+def _cache_path(filename: str) -> str:
+    """מיקום קובץ המטמון - באותה תיקייה של קובץ הפריטים שנראו"""
+    return os.path.join(os.path.dirname(SEEN_ITEMS_FILE), filename)
+
+
+class ResponseCache:
+    """
+    זוכר לכל URL את ה-ETag, Last-Modified וגיבוב התוכן מהריצה הקודמת
+    fingerprint - טביעה של הגדרות ההתאמה (מילים, פרופילים, שאילתות). רשומה שנשמרה עם הגדרות אחרות
+    לא נחשבת: דף שלא השתנה עדיין צריך להיבדק מול מילים חדשות. לכל דף נשמרים גם המזהים של
+    המודעות שהיו בו, כדי לעדכן להן "נראה לאחרונה" כשהדף מדולג.
+    """
+
+    def __init__(self, path: str = None, fingerprint: str = ""):
+        self.path = path or _cache_path(HTTP_CACHE_FILE)
+        self.fingerprint = fingerprint
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """טוען את המטמון מהדיסק"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f).get("entries", {})
+        except Exception as e:
+            print(f"Error loading HTTP cache: {e}")
+
+    def save(self) -> None:
+        """שומר את המטמון לדיסק"""
+        try:
+            with self._lock:
+                data = {"entries": self.entries, "last_updated": datetime.now().isoformat()}
+            with open(self.path, "w") as f:
+                json.dump(data, f, indent=2)
+        except Exception as e:
+            print(f"Error saving HTTP cache: {e}")
+
+    def _entry(self, url: str) -> Dict:
+        """הרשומה של ה-URL אם נשמרה עם ההגדרות הנוכחיות, אחרת רשומה ריקה"""
+        entry = self.entries.get(url, {})
+        return entry if entry.get("config", "") == self.fingerprint else {}
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """כותרות If-None-Match / If-Modified-Since לבקשה הבאה"""
+        entry = self._entry(url)
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def same_version(self, url: str, response: requests.Response) -> bool:
+        """
+        האם התגובה מעידה שהדף לא השתנה עוד לפני קריאת הגוף - 304, או ETag חזק
+        זהה לזה של הסריקה הקודמת (שרת שמתעלם מ-If-None-Match ושולח את אותו דף שוב)
+        """
+        entry = self._entry(url)
+        if response.status_code == 304:
+            return bool(entry)
+        etag = response.headers.get("ETag", "")
+        return bool(etag) and not etag.startswith("W/") and bool(entry.get("hash")) and entry.get("etag") == etag
+
+    def is_unchanged(self, url: str, response: requests.Response, body_hash: Optional[str] = None) -> bool:
+        """
+        בודק אם הדף לא השתנה מהריצה הקודמת ומעדכן את הרשומה
+        body_hash - גיבוב שחושב תוך כדי קריאה זורמת (אחרת מחושב מגוף התגובה)
+        """
+        if self.same_version(url, response):
+            return True
+        if response.status_code == 304:
+            return False
+
+        if body_hash is None:
+            body_hash = hashlib.sha1(response.content).hexdigest()
+        with self._lock:
+            previous = self._entry(url)
+            unchanged = previous.get("hash") == body_hash
+            entry = {
+                "etag": response.headers.get("ETag", ""),
+                "last_modified": response.headers.get("Last-Modified", ""),
+                "hash": body_hash,
+                "config": self.fingerprint,
+            }
+            if unchanged:
+                # הדף לא נסרק שוב - המודעות שלו נשארות מהריצה הקודמת
+                entry["items"] = previous.get("items", [])
+                entry["listings"] = previous.get("listings", [])
+            self.entries[url] = entry
+        return unchanged
+
+    def remember(self, url: str, items: Iterable[str], listings: Iterable[str]) -> None:
+        """שומר את מזהי המודעות (במאגר הפריטים שנראו ובעימוד) שנמצאו בדף שנסרק"""
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                entry["items"] = sorted(set(items))
+                entry["listings"] = sorted(set(listings))
+
+    def page_keys(self, url: str) -> Tuple[List[str], List[str]]:
+        """(מזהי פריטים, מפתחות מודעות) שנשמרו לדף בסריקה האחרונה שלו"""
+        entry = self._entry(url)
+        return entry.get("items", []), entry.get("listings", [])
+
+
+class InnerPageCache:
+    """מטמון LRU עם תוקף לשדות שחולצו מדפים פנימיים של מודעות (לפי URL)"""
+
+    def __init__(self, path: str = None, ttl_days: float = INNER_CACHE_TTL_DAYS,
+                 max_entries: int = INNER_CACHE_MAX_ENTRIES):
+        self.path = path or _cache_path(INNER_CACHE_FILE)
+        self.ttl = ttl_days * 24 * 3600
+        self.max_entries = max_entries
+        # הישן ביותר בשימוש ראשון - כך שהפינוי הוא מתחילת הרשימה
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """טוען את המטמון מהדיסק ומשליך רשומות שפג תוקפן"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    entries = json.load(f).get("entries", {})
+                now = time.time()
+                for url, entry in entries.items():
+                    if now - entry.get("fetched_at", 0) < self.ttl:
+                        self.entries[url] = entry
+        except Exception as e:
+            print(f"Error loading inner page cache: {e}")
+
+    def save(self) -> None:
+        """שומר את המטמון לדיסק לפי סדר השימוש"""
+        try:
+            with self._lock:
+                data = {"entries": dict(self.entries), "last_updated": datetime.now().isoformat()}
+            with open(self.path, "w") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            print(f"Error saving inner page cache: {e}")
+
+    def get(self, url: str) -> Optional[Dict]:
+        """מחזיר את השדות השמורים ל-URL, או None אם אין רשומה בתוקף"""
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry and time.time() - entry.get("fetched_at", 0) < self.ttl:
+                self.entries.move_to_end(url)
+                self.hits += 1
+                return dict(entry["fields"])
+            if entry:
+                del self.entries[url]
+            self.misses += 1
+            return None
+
+    def put(self, url: str, fields: Dict) -> None:
+        """שומר שדות ל-URL ומפנה את הרשומות הישנות מעבר לגבול"""
+        with self._lock:
+            self.entries[url] = {"fields": fields, "fetched_at": time.time()}
+            self.entries.move_to_end(url)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
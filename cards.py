@@ -0,0 +1,97 @@
+# cards.py - חילוץ כרטיסי מודעות במעבר יחיד על עץ ה-DOM
+
+import re
+from typing import List, Pattern, Sequence, Tuple
+from bs4 import BeautifulSoup, Tag
+from bs4.element import NavigableString, CData
+
+# אותם סוגי טקסט ש-get_text() מחזיר (ללא הערות, סקריפטים וסגנונות)
+_TEXT_TYPES = (NavigableString, CData)
+# בא אחרי כל קטע טקסט בטקסט של כרטיס - גבול מילה בין אלמנטים (גם ב-streaming.py)
+TEXT_SEPARATOR = " "
+
+
+def class_matches(tag: Tag, pattern: Pattern) -> bool:
+    """בודק אם אחת המחלקות של התגית מתאימה לתבנית (כמו find_all עם class_)"""
+    classes = tag.get("class")
+    if not classes:
+        return False
+    if isinstance(classes, str):
+        return bool(pattern.search(classes))
+    return any(pattern.search(c) for c in classes) or bool(pattern.search(" ".join(classes)))
+
+
+def extract_cards(
+    soup: BeautifulSoup,
+    tags: Sequence[str],
+    class_pattern: Pattern,
+    mode: str = "outer",
+) -> Tuple[List[Tuple[Tag, str]], str]:
+    """
+    מחלץ כרטיסי מודעות במעבר אחד על העץ ומחזיר ([(כרטיס, טקסט)], טקסט הדף)
+
+    גבול המודעה נקבע לפי הקישורים: מיכל מתאים שיש בו קישור הוא מודעה, ומיכל מתאים בלי קישור
+    (card-header, item-price) הוא שדה של המודעה שסביבו. מיכלים מקוננים מתאחדים לרשומה אחת:
+    outer - המיכל החיצוני ביותר שמכיל קישור מודעה אחד בלבד (רשת עם כמה מודעות לא נחשבת כרטיס)
+    inner - המיכל הפנימי ביותר שיש בו קישור
+    מיכל בלי אף קישור נחשב כרטיס רק אם הוא לא בתוך מיכל מתאים אחר.
+    הטקסט של כל כרטיס נחתך מטקסט הדף שנבנה פעם אחת, כך שהעלות ליניארית בגודל הדף.
+    אחרי כל קטע טקסט בא רווח, כך שמילים משני אלמנטים סמוכים לא מתחברות ("45 mos</h2><p>מצב").
+    """
+    if isinstance(class_pattern, str):
+        class_pattern = re.compile(class_pattern, re.I)
+    tag_names = set(tags)
+
+    strings: List[str] = []
+    pos = 0
+    # לכל מיכל מתאים: [תגית, התחלה, סוף, ההורה המתאים, קישורי המודעות שבתוכו, הקישור הראשון, האם הקישור שלו עצמו]
+    nodes: List[list] = []
+    open_matches: List[int] = []
+
+    stack = [(iter(soup.contents), False)]
+    while stack:
+        children, is_match = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if is_match:
+                index = open_matches.pop()
+                node = nodes[index]
+                node[2] = pos
+                if not node[4] and node[5]:
+                    # אין בתוכו מודעה אחרת - הקישור הראשון שלו הוא המודעה
+                    node[4] = {node[5]}
+                    node[6] = True
+                if open_matches:
+                    parent = nodes[open_matches[-1]]
+                    parent[4] |= node[4]
+                    parent[5] = parent[5] or node[5]
+            continue
+
+        if isinstance(child, Tag):
+            matched = child.name in tag_names and class_matches(child, class_pattern)
+            if matched:
+                parent = open_matches[-1] if open_matches else None
+                nodes.append([child, pos, pos, parent, set(), None, False])
+                open_matches.append(len(nodes) - 1)
+            if child.name == "a" and child.get("href") and open_matches and nodes[open_matches[-1]][5] is None:
+                nodes[open_matches[-1]][5] = child.get("href")
+            stack.append((iter(child.contents), matched))
+        elif type(child) in _TEXT_TYPES and child:
+            strings.append(child)
+            pos += len(child) + len(TEXT_SEPARATOR)
+
+    page_text = "".join(f"{string}{TEXT_SEPARATOR}" for string in strings)
+
+    cards = []
+    for tag, begin, end, parent, links, _, own in nodes:
+        if not links:
+            keep = parent is None
+        elif mode == "inner":
+            keep = own
+        else:
+            keep = len(links) == 1 and (parent is None or len(nodes[parent][4]) > 1)
+        if keep:
+            cards.append((tag, page_text[begin:end]))
+
+    return cards, page_text
@@ -19,6 +19,8 @@ SEARCH_TERMS = [
 # הגדרות Telegram
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "")
+# כתובת ה-Bot API (למשל שרת Bot API מקומי)
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
 
 # הגדרות Email
 EMAIL_ADDRESS = os.environ.get("EMAIL_ADDRESS", "")
@@ -34,5 +36,43 @@ SMTP_USE_SSL = os.environ.get("SMTP_USE_SSL", "true").lower() == "true"
 # הגדרות כלליות
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
 REQUEST_TIMEOUT = 30
+SCRAPE_WORKERS = int(os.environ.get("SCRAPE_WORKERS", "4"))
+MAX_REQUESTS_PER_HOST = int(os.environ.get("MAX_REQUESTS_PER_HOST", "2"))
+HOST_MAX_RETRIES = 2
+HOST_MAX_RETRY_WAIT = 60
+HTML_PARSER = os.environ.get("HTML_PARSER", "lxml")
+ENRICH_WORKERS = int(os.environ.get("ENRICH_WORKERS", "4"))
+ENRICH_DEADLINE = 60
+MAX_PAGES = 3
+STREAM_PARSE = os.environ.get("STREAM_PARSE", "") == "1"
+STREAM_MAX_BYTES = 8_000_000
+STREAM_CHUNK_SIZE = 64 * 1024
 SEEN_ITEMS_FILE = "seen_items.json"
+SEEN_DB_FILE = "seen_items.db"
+SEEN_EXPIRY_DAYS = 90
+SEEN_BLOOM_FILTER = True
+HTTP_CACHE_FILE = "http_cache.json"
+INNER_CACHE_FILE = "inner_cache.json"
+INNER_CACHE_TTL_DAYS = 7
+INNER_CACHE_MAX_ENTRIES = 2000
 NOTIFY_ON_NO_RESULTS = False
+STREAM_BATCH_SIZE = 5
+STREAM_BATCH_SECONDS = 10
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+EMAIL_DIGEST_SIZE = 50
+OUTBOX_FILE = "outbox.json"
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BACKOFF_SECONDS = 2
+OUTBOX_MAX_BACKOFF = 60
+OUTBOX_MAX_AGE_DAYS = 7
+PROFILES_FILE = "profiles.json"
+METRICS_HISTORY_FILE = "metrics.ndjson"
+METRICS_HISTORY_MAX_RUNS = 500
+METRICS_SUMMARY_RUNS = 20
+METRICS_PROMETHEUS_FILE = os.environ.get("METRICS_PROMETHEUS_FILE", "")
+DAEMON_DEFAULT_INTERVAL = 1800
+DAEMON_MIN_INTERVAL = 300
+DAEMON_MAX_INTERVAL = 6 * 3600
+DAEMON_TARGET_NEW = 1.0
+DAEMON_EWMA_ALPHA = 0.3
+DAEMON_JITTER = 0.2
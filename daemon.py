@@ -0,0 +1,93 @@
+# daemon.py - תזמון סריקות במצב daemon: מרווח נפרד לכל אתר לפי קצב המודעות החדשות שלו
+
+import random
+import signal
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from config import (
+    DAEMON_DEFAULT_INTERVAL,
+    DAEMON_MIN_INTERVAL,
+    DAEMON_MAX_INTERVAL,
+    DAEMON_TARGET_NEW,
+    DAEMON_EWMA_ALPHA,
+    DAEMON_JITTER,
+)
+
+# כשאתר לא מביא מודעות חדשות המרווח גדל בהדרגה עד המקסימום
+IDLE_BACKOFF = 1.5
+
+
+class PollSchedule:
+    """
+    מתי לבדוק כל אתר
+    לכל אתר נשמר קצב מודעות חדשות לשעה (ממוצע נע מעריכי), והמרווח נקבע כך שבכל בדיקה
+    צפויות בערך DAEMON_TARGET_NEW מודעות חדשות - אתר פעיל נבדק לעיתים קרובות, אתר שקט לעיתים רחוקות.
+    המצב נשמר ב-status.json, כך שהמרווחים שנלמדו נשמרים גם אחרי הפעלה מחדש.
+    """
+
+    def __init__(self, names: Iterable[str], saved: Optional[Dict] = None):
+        saved = saved or {}
+        now = time.time()
+        self.state: Dict[str, Dict] = {}
+        self.next_run: Dict[str, float] = {}
+        for index, name in enumerate(names):
+            state = dict(saved.get(name) or {})
+            state.setdefault("interval", DAEMON_DEFAULT_INTERVAL)
+            state.setdefault("rate", 0.0)
+            state.setdefault("last_run", None)
+            self.state[name] = state
+            if state["last_run"]:
+                # אחרי הפעלה מחדש ממשיכים מהלוח הקודם במקום לסרוק הכל מיד
+                self.next_run[name] = max(state["last_run"] + self._jittered(state["interval"]), now)
+            else:
+                # אתרים חדשים נבדקים מיד, בפיזור קטן כדי לא להתחיל את כולם באותה שנייה
+                self.next_run[name] = now + index * random.uniform(1, 3)
+
+    def _jittered(self, interval: float) -> float:
+        """מרווח עם פיזור אקראי - בדיקות לא מתיישרות לאותו רגע"""
+        return interval * random.uniform(1 - DAEMON_JITTER, 1 + DAEMON_JITTER)
+
+    def next_due(self) -> Tuple[str, float]:
+        """האתר הבא לבדיקה וכמה שניות עד אליו (0 אם הגיע זמנו)"""
+        name = min(self.next_run, key=self.next_run.get)
+        return name, max(self.next_run[name] - time.time(), 0.0)
+
+    def update(self, name: str, new_items: int) -> float:
+        """מעדכן את קצב האתר אחרי בדיקה, קובע את הבדיקה הבאה ומחזיר את המרווח החדש"""
+        now = time.time()
+        state = self.state[name]
+        hours = (now - state["last_run"]) / 3600 if state["last_run"] else state["interval"] / 3600
+        observed = new_items / max(hours, DAEMON_MIN_INTERVAL / 3600)
+        state["rate"] = DAEMON_EWMA_ALPHA * observed + (1 - DAEMON_EWMA_ALPHA) * state["rate"]
+        if new_items or state["rate"] > DAEMON_TARGET_NEW * 3600 / DAEMON_MAX_INTERVAL:
+            interval = DAEMON_TARGET_NEW / state["rate"] * 3600
+        else:
+            interval = state["interval"] * IDLE_BACKOFF
+        state["interval"] = round(min(max(interval, DAEMON_MIN_INTERVAL), DAEMON_MAX_INTERVAL), 1)
+        state["rate"] = round(state["rate"], 4)
+        state["last_run"] = round(now)
+        self.next_run[name] = now + self._jittered(state["interval"])
+        return state["interval"]
+
+    def to_dict(self) -> Dict:
+        """המצב לשמירה ב-status.json"""
+        return {name: dict(state) for name, state in self.state.items()}
+
+
+def install_stop_handlers() -> threading.Event:
+    """
+    SIGINT/SIGTERM מסמנים עצירה - הבדיקה הנוכחית מסתיימת והמצב נשמר
+    אות שני עוצר מיד (KeyboardInterrupt), והשמירה עדיין רצה ב-finally.
+    """
+    stop = threading.Event()
+
+    def handler(signum, frame):
+        if stop.is_set():
+            raise KeyboardInterrupt
+        print(f"\n🛑 התקבל אות {signal.Signals(signum).name} - עוצר אחרי הבדיקה הנוכחית...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+    return stop
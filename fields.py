@@ -0,0 +1,169 @@
+# fields.py - חילוץ שדות מכרטיס במעבר אחד: מחיר (מספר ומטבע), טלפון ומיקום
+
+import re
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+from bs4 import Tag
+from cards import class_matches
+
+NO_PRICE = "לא צוין"
+
+# סכום עם מפרידי אלפים (1,200 / 35,000)
+_AMOUNT = r"\d{1,3}(?:,\d{3})*"
+
+# ביטויי מחיר לפי סדר עדיפות - ביטוי מוקדם גובר גם אם ביטוי מאוחר מופיע קודם בטקסט
+PRICE_PATTERNS: List[Tuple[str, str]] = [
+    (rf"({_AMOUNT})\s*₪", "ILS"),
+    (rf"₪\s*({_AMOUNT})", "ILS"),
+    (rf"({_AMOUNT})\s*ש[״\']?ח", "ILS"),
+    (r"(\d{4,5})\s*(?:שקל|שח)", "ILS"),
+    (rf"מחיר[:\s]*({_AMOUNT})", "ILS"),
+    (rf"\$\s*({_AMOUNT})", "USD"),
+    (rf"({_AMOUNT})\s*\$", "USD"),
+    (rf"€\s*({_AMOUNT})", "EUR"),
+    (rf"({_AMOUNT})\s*€", "EUR"),
+]
+CURRENCY_SYMBOLS = {"ILS": "₪", "USD": "$", "EUR": "€"}
+
+# ביטויי טלפון לפי סדר עדיפות
+PHONE_PATTERNS = [
+    r"(0\d{1,2}[-\s]?\d{7})",
+    r"(05\d[-\s]?\d{7})",
+    r"(\d{3}[-\s]?\d{7})",
+]
+
+LOCATION_CLASS = re.compile(r"(location|city|area|address)", re.I)
+
+def _prioritized(patterns: Sequence[str], start: str) -> List[Optional[Pattern]]:
+    """
+    ביטויים מאוחדים לפי עדיפות: הביטוי במקום r מאחד את r הביטויים הראשונים (במקום 0 - None)
+    בכל מיקום החלופות נבדקות לפי הסדר, ו-lastindex של ההתאמה הוא מספר הביטוי שהתאים (לכל ביטוי קבוצה אחת).
+    start - איך ביטוי יכול להתחיל; נבדק קודם, כך שרוב המיקומים נפסלים בלי לנסות את כל החלופות.
+    """
+    # הביטוי הראשון לבד, בלי בדיקת התחלה - כך ה-re מזהה את התו הפותח שלו וסורק מהר
+    combined: List[Optional[Pattern]] = [None, re.compile(patterns[0])]
+    for rank in range(2, len(patterns) + 1):
+        alternation = "|".join(f"(?:{pattern})" for pattern in patterns[:rank])
+        combined.append(re.compile(f"(?={start})(?:{alternation})"))
+    return combined
+
+
+_PRICE = _prioritized([pattern for pattern, _ in PRICE_PATTERNS], r"[\d$₪€]|מחיר")
+_PHONE = _prioritized(PHONE_PATTERNS, r"\d")
+
+
+def normalize_phone(phone: str) -> str:
+    """טלפון בצורה אחידה: 050-1234567 לנייד, 03-1234567 לקווי"""
+    digits = re.sub(r"\D", "", phone)
+    if len(digits) == 10 and digits.startswith("0"):
+        return f"{digits[:3]}-{digits[3:]}"
+    if len(digits) == 9 and digits.startswith("0"):
+        return f"{digits[:2]}-{digits[2:]}"
+    return digits
+
+
+def _scan(patterns: List[Optional[Pattern]], text: str) -> Optional[Tuple[int, str]]:
+    """
+    (מספר הביטוי, הערך) של ההתאמה הטובה ביותר בטקסט, או None
+    הטובה ביותר: הביטוי בעדיפות הגבוהה ביותר, ובתוכו ההתאמה הראשונה בטקסט - כמו לנסות את הביטויים
+    אחד אחרי השני, אבל במעבר אחד: אחרי התאמה בעדיפות r ממשיכים רק עם הביטויים שלפניה.
+    """
+    # הביטוי הראשון גובר על כולם - אם הוא מופיע, ההתאמה הראשונה שלו היא התשובה
+    match = patterns[1].search(text)
+    if match is not None:
+        return 1, match.group(1)
+    best = None
+    pattern = patterns[-1]
+    position = 0
+    while pattern is not None:
+        match = pattern.search(text, position)
+        if match is None:
+            break
+        rank = match.lastindex
+        best = (rank, match.group(rank))
+        pattern = patterns[rank - 1]
+        position = match.start() + 1
+    return best
+
+
+def _price_fields(found: Optional[Tuple[int, str]]) -> Dict:
+    """שדות המחיר מהתאמה: תצוגה (כמו בטקסט המקורי), מספר שלם ומטבע"""
+    if found is None:
+        return {"price": NO_PRICE, "price_value": None, "currency": None}
+    rank, amount = found
+    currency = PRICE_PATTERNS[rank - 1][1]
+    return {
+        "price": f"{CURRENCY_SYMBOLS[currency]}{amount}",
+        "price_value": int(amount.replace(",", "")),
+        "currency": currency,
+    }
+
+
+def price_from_value(value: Optional[int], currency: str = "ILS") -> Dict:
+    """שדות המחיר ממספר שכבר פוענח (למשל מ-JSON מוטמע)"""
+    if not value:
+        return {"price": NO_PRICE, "price_value": None, "currency": None}
+    return {"price": f"{CURRENCY_SYMBOLS[currency]}{value:,}", "price_value": value, "currency": currency}
+
+
+class FieldExtractor:
+    """
+    מחלץ מחיר, טלפון ומיקום מכרטיסים - ביטוי מהודר אחד לכל שדה ומעבר אחד על העץ של כל כרטיס
+    price_class - מחלקת אלמנט המחיר של המתאם (המחיר שבו גובר על המחיר בשאר הכרטיס).
+    """
+
+    def __init__(self, price_class: Optional[Pattern] = None, location_class: Pattern = LOCATION_CLASS):
+        self.price_class = price_class
+        self.location_class = location_class
+        # לכל ערך class: (אלמנט מחיר?, אלמנט מיקום?) - אותן מחלקות חוזרות בכל הכרטיסים בדף
+        self._kinds: Dict[object, Tuple[bool, bool]] = {}
+
+    def _kind(self, element: Tag, classes) -> Tuple[bool, bool]:
+        key = classes if isinstance(classes, str) else tuple(classes)
+        kind = self._kinds.get(key)
+        if kind is None:
+            kind = (
+                bool(self.price_class) and class_matches(element, self.price_class),
+                class_matches(element, self.location_class),
+            )
+            self._kinds[key] = kind
+        return kind
+
+    def _elements(self, card: Optional[Tag]) -> Tuple[str, str]:
+        """מעבר אחד על הכרטיס: (טקסט אלמנט המחיר, טקסט אלמנט המיקום)"""
+        price_text = location_text = None
+        if card is None:
+            return "", ""
+        for element in card.descendants:
+            if not isinstance(element, Tag):
+                continue
+            classes = element.get("class")
+            if not classes:
+                continue
+            is_price, is_location = self._kind(element, classes)
+            if price_text is None and is_price:
+                price_text = element.get_text()
+            if location_text is None and is_location:
+                location_text = element.get_text()
+            if location_text is not None and (price_text is not None or not self.price_class):
+                break
+        return price_text or "", (location_text or "").strip()[:50]
+
+    def extract_many(self, cards: Sequence[Tuple[Optional[Tag], str]]) -> List[Dict]:
+        """
+        מחלץ את השדות של כל הכרטיסים בדף יחד - (כרטיס, טקסט) לכל כרטיס
+        כל שדה נסרק פעם אחת בכל כרטיס, במקום פעם לכל תבנית.
+        """
+        results = []
+        for card, text in cards:
+            price_text, location = self._elements(card)
+            text = text or ""
+            phone = _scan(_PHONE, text)
+            fields = _price_fields((price_text and _scan(_PRICE, price_text)) or _scan(_PRICE, text))
+            fields["phone"] = normalize_phone(phone[1]) if phone else ""
+            fields["location"] = location
+            results.append(fields)
+        return results
+
+    def extract(self, text: str, card: Optional[Tag] = None) -> Dict:
+        """השדות של כרטיס אחד"""
+        return self.extract_many([(card, text)])[0]
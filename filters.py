@@ -0,0 +1,237 @@
+# filters.py - שפת שאילתות קטנה לפרופילי מעקב, מהודרת לפרדיקט אחד על שדות המודעה
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from matcher import TermMatcher, normalize_text, term_key
+
+# מילות המפתח של השפה (לא תלויות באותיות גדולות/קטנות)
+KEYWORDS = {"terms", "price", "location", "exclude", "site", "and"}
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<string>"[^"]*"|'[^']*')
+      | (?P<number>\d{1,3}(?:,\d{3})+|\d+)(?![^\s"'(),<>=])
+      | (?P<op><=|>=|<|>|[(),])
+      | (?P<word>[^\s"'(),<>=]+)
+    )""",
+    re.X,
+)
+
+
+class FilterSyntaxError(ValueError):
+    """שאילתה שלא ניתן לפענח"""
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    """(סוג, ערך) לכל אסימון בשאילתה"""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise FilterSyntaxError(f"תו לא צפוי במיקום {position}: {text[position:position + 10]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = value[1:-1]
+        tokens.append((kind, value))
+        position = match.end()
+        while position < len(text) and text[position].isspace():
+            position += 1
+    return tokens
+
+
+class WatchQuery:
+    """
+    שאילתה מהודרת: מילות חיפוש ופרדיקט על מודעה
+    הבדיקות רצות מהזולה ליקרה (אתר, מחיר, מיקום, מילים מוחרגות). שדה שעוד לא ידוע (למשל מחיר
+    לפני העשרה) לא פוסל את המודעה - כך אפשר להריץ את אותו פרדיקט גם על הכרטיס וגם אחרי הדף הפנימי.
+    """
+
+    def __init__(self):
+        self.terms: List[str] = []
+        self.sites: List[str] = []
+        self.min_price: Optional[int] = None
+        self.max_price: Optional[int] = None
+        self.locations: List[str] = []
+        self.excluded: List[str] = []
+        self._checks: List[Callable[[Dict], bool]] = []
+
+    def compile(self) -> "WatchQuery":
+        """בונה את רשימת הבדיקות לפי הסדר - רק לסעיפים שהוגדרו"""
+        checks: List[Callable[[Dict], bool]] = []
+        if self.sites:
+            sites = {normalize_text(site) for site in self.sites}
+            checks.append(lambda item: normalize_text(item.get("site_name") or "") in sites
+                          or normalize_text(item.get("site") or "") in sites)
+        if self.min_price is not None or self.max_price is not None:
+            low = self.min_price if self.min_price is not None else float("-inf")
+            high = self.max_price if self.max_price is not None else float("inf")
+            checks.append(lambda item: item.get("price_value") is None or item.get("currency") not in (None, "ILS")
+                          or low <= item["price_value"] <= high)
+        if self.locations:
+            locations = [normalize_text(location) for location in self.locations]
+            checks.append(lambda item: not item.get("location")
+                          or any(location in normalize_text(item["location"]) for location in locations))
+        if self.excluded:
+            excluded = TermMatcher(self.excluded)
+            checks.append(lambda item: excluded.search(f"{item.get('title', '')} {item.get('description', '')}") is None)
+        self._checks = checks
+        return self
+
+    def __call__(self, item: Dict) -> bool:
+        return all(check(item) for check in self._checks)
+
+    def signature(self) -> Dict:
+        """הסעיפים של השאילתה בצורה קנונית - לזיהוי שינוי בהגדרות בין ריצות"""
+        return {
+            "terms": sorted(term_key(term) for term in self.terms),
+            "sites": sorted(normalize_text(site) for site in self.sites),
+            "price": [self.min_price, self.max_price],
+            "locations": sorted(normalize_text(location) for location in self.locations),
+            "exclude": sorted(term_key(term) for term in self.excluded),
+        }
+
+    def __bool__(self) -> bool:
+        """האם יש בשאילתה סינון כלשהו"""
+        return bool(self._checks)
+
+
+class _Parser:
+    """מפענח רקורסיבי פשוט לשאילתה - כל סעיף מתחיל במילת מפתח"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self, expected: str = "ערך") -> Tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise FilterSyntaxError(f"השאילתה נגמרה - חסר {expected}: {self.text!r}")
+        self.position += 1
+        return token
+
+    def _keyword(self, token: Optional[Tuple[str, str]]) -> Optional[str]:
+        if token and token[0] == "word" and token[1].lower() in KEYWORDS:
+            return token[1].lower()
+        return None
+
+    def _expect(self, word: str) -> None:
+        kind, value = self._next(f'"{word}"')
+        if kind != "word" or value.lower() != word:
+            raise FilterSyntaxError(f'צפוי "{word}" ולא "{value}"')
+
+    def _number(self) -> int:
+        kind, value = self._next("מספר")
+        if kind != "number":
+            raise FilterSyntaxError(f'צפוי מספר ולא "{value}"')
+        return int(value.replace(",", ""))
+
+    def _values(self) -> List[str]:
+        """
+        רשימת ערכים מופרדת בפסיקים, בסוגריים או בלי
+        ערך הוא מחרוזת במרכאות או כמה מילים ברצף; בלי סוגריים הרשימה נגמרת במילת המפתח הבאה.
+        """
+        token = self._peek()
+        grouped = bool(token and token == ("op", "("))
+        if grouped:
+            self.position += 1
+        values: List[str] = []
+        words: List[str] = []
+        while True:
+            token = self._peek()
+            if token is None:
+                if grouped:
+                    raise FilterSyntaxError(f"חסר ')': {self.text!r}")
+                break
+            kind, value = token
+            if kind == "op" and value == ")" and grouped:
+                self.position += 1
+                break
+            if kind == "op" and value == ",":
+                self.position += 1
+                if words:
+                    values.append(" ".join(words))
+                    words = []
+                continue
+            if kind == "op" or (not grouped and self._keyword(token)):
+                if grouped:
+                    raise FilterSyntaxError(f'"{value}" לא צפוי בתוך רשימה')
+                break
+            words.append(value)
+            self.position += 1
+        if words:
+            values.append(" ".join(words))
+        if not values:
+            raise FilterSyntaxError(f"רשימה ריקה: {self.text!r}")
+        return values
+
+    def _price(self, query: WatchQuery) -> None:
+        kind, value = self._next("תנאי מחיר")
+        if kind == "word" and value.lower() == "between":
+            low = self._number()
+            self._expect("and")
+            high = self._number()
+            query.min_price, query.max_price = min(low, high), max(low, high)
+        elif kind == "op" and value in ("<", "<="):
+            query.max_price = self._number() - (1 if value == "<" else 0)
+        elif kind == "op" and value in (">", ">="):
+            query.min_price = self._number() + (1 if value == ">" else 0)
+        else:
+            raise FilterSyntaxError(f'צפוי between, <, <=, > או >= אחרי price ולא "{value}"')
+
+    def parse(self) -> WatchQuery:
+        query = WatchQuery()
+        while self._peek() is not None:
+            keyword = self._keyword(self._peek())
+            if keyword == "and":
+                self.position += 1
+                continue
+            if keyword is None or keyword == "terms":
+                # סעיף בלי מילת מפתח בתחילת השאילתה הוא רשימת מילות חיפוש
+                if keyword == "terms":
+                    self.position += 1
+                query.terms.extend(self._values())
+                continue
+            self.position += 1
+            if keyword == "price":
+                self._price(query)
+            elif keyword == "location":
+                self._expect("in")
+                query.locations.extend(self._values())
+            elif keyword == "site":
+                self._expect("in")
+                query.sites.extend(self._values())
+            elif keyword == "exclude":
+                token = self._peek()
+                if token and token[0] == "word" and token[1].lower() in ("term", "terms"):
+                    self.position += 1
+                query.excluded.extend(self._values())
+        return query.compile()
+
+
+def parse_query(text: str) -> WatchQuery:
+    """
+    מהדר שאילתה, למשל:
+    "glock 19", "cz 75" and price between 2000 and 6000 and location in (תל אביב, חיפה)
+    and exclude term מחסנית, נרתיק and site in (Gun2, BlueGun)
+    זורק FilterSyntaxError בשאילתה לא תקינה.
+    """
+    return _Parser(text or "").parse()
+
+
+def query_from_filters(filters: Dict, terms: Iterable[str] = ()) -> WatchQuery:
+    """שאילתה מהסינון בצורת מילון (min_price / max_price / sites / locations / exclude)"""
+    query = WatchQuery()
+    query.terms = list(terms)
+    query.sites = list(filters.get("sites") or [])
+    query.min_price = filters.get("min_price")
+    query.max_price = filters.get("max_price")
+    query.locations = list(filters.get("locations") or [])
+    query.excluded = list(filters.get("exclude") or [])
+    return query.compile()
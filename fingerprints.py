@@ -0,0 +1,152 @@
+# fingerprints.py - קבוצת טביעות 64 ביט קומפקטית (מערך ממוין, mmap ומסנן Bloom)
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional, Tuple
+
+# כותרת הקובץ: חתימה, מספר טביעות, גודל מסנן ה-Bloom בבתים, מספר פונקציות גיבוב, חותמת מקור (2 מספרים)
+_MAGIC = b"YFP1"
+_HEADER = struct.Struct("<4sQIIdd")
+
+
+def fingerprint(key: str) -> int:
+    """טביעת 64 ביט למזהה (מחרוזת כלשהי)"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+class BloomFilter:
+    """מסנן Bloom על גבי טביעות 64 ביט - שלילי הוא ודאי, חיובי דורש בדיקה"""
+
+    def __init__(self, bits, k: int):
+        self.bits = bits
+        self.k = k
+        self.size = len(bits) * 8
+
+    @classmethod
+    def build(cls, fingerprints: Iterable[int], count: int, bits_per_item: int = 10) -> "BloomFilter":
+        """בונה מסנן בגודל מתאים למספר הטביעות (כ-1% חיוביים שגויים ב-10 ביט לפריט)"""
+        size_bytes = max((count * bits_per_item + 7) // 8, 8)
+        bloom = cls(bytearray(size_bytes), k=7)
+        for fp in fingerprints:
+            bloom.add(fp)
+        return bloom
+
+    def _positions(self, fp: int):
+        """מיקומי הביטים של טביעה - גיבוב כפול מתוך הטביעה עצמה, בלי לחשב גיבוב נוסף"""
+        h1 = fp & 0xFFFFFFFF
+        h2 = (fp >> 32) | 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, fp: int) -> None:
+        """מוסיף טביעה למסנן"""
+        for pos in self._positions(fp):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, fp: int) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(fp))
+
+
+class FingerprintSet:
+    """
+    קבוצת טביעות ממוינת - 8 בתים לפריט, חיפוש בינארי
+    נטענת מקובץ דרך mmap בלי העתקה, עם מסנן Bloom אופציונלי לפני החיפוש.
+    """
+
+    def __init__(self, values=None, bloom: Optional[BloomFilter] = None, stamp: Tuple[float, float] = (0, 0)):
+        self.values = values if values is not None else array("Q")
+        self.bloom = bloom
+        self.stamp = stamp
+        self._mmap = None
+        self._view = None
+
+    @classmethod
+    def from_keys(cls, keys: Iterable[str], **kwargs) -> "FingerprintSet":
+        """בונה קבוצה ממזהים (מחרוזות)"""
+        return cls.from_fingerprints((fingerprint(key) for key in keys), **kwargs)
+
+    @classmethod
+    def from_fingerprints(cls, fingerprints: Iterable[int], use_bloom: bool = True,
+                          stamp: Tuple[float, float] = (0, 0)) -> "FingerprintSet":
+        """בונה קבוצה ממוינת מטביעות, עם מסנן Bloom כברירת מחדל"""
+        values = array("Q", sorted(set(fingerprints)))
+        bloom = BloomFilter.build(values, len(values)) if use_bloom else None
+        return cls(values, bloom, stamp)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, fp: int) -> bool:
+        if self.bloom is not None and fp not in self.bloom:
+            return False
+        values = self.values
+        i = bisect_left(values, fp)
+        return i < len(values) and values[i] == fp
+
+    def save(self, path: str) -> None:
+        """כותב את הקבוצה לקובץ: כותרת, מסנן Bloom, ואז הטביעות מיושרות ל-8 בתים"""
+        bloom_bytes = bytes(self.bloom.bits) if self.bloom is not None else b""
+        k = self.bloom.k if self.bloom is not None else 0
+        header = _HEADER.pack(_MAGIC, len(self.values), len(bloom_bytes), k, *self.stamp)
+        padding = b"\0" * (-(len(header) + len(bloom_bytes)) % 8)
+        values = self.values
+        if sys.byteorder != "little":
+            values = array("Q", values)
+            values.byteswap()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header + bloom_bytes + padding)
+            f.write(values.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["FingerprintSet"]:
+        """טוען קבוצה מקובץ דרך mmap - הטביעות לא מועתקות לזיכרון. מחזיר None אם הקובץ חסר, קטוע או לא תקין"""
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, count, bloom_len, k, *stamp = _HEADER.unpack_from(mm, 0)
+        except struct.error:
+            mm.close()
+            return None
+        offset = _HEADER.size + bloom_len
+        offset += -offset % 8
+        # קובץ קטוע (למשל שחזור חלקי מה-cache) - המסנן והטביעות חייבים להיות כולם בתוך הקובץ
+        if magic != _MAGIC or len(mm) < offset + count * 8 or (bloom_len and not k):
+            mm.close()
+            return None
+        view = memoryview(mm)
+        bloom = BloomFilter(view[_HEADER.size:_HEADER.size + bloom_len], k) if bloom_len else None
+        if sys.byteorder == "little":
+            values = view[offset:offset + count * 8].cast("Q")
+        else:
+            values = array("Q", view[offset:offset + count * 8].tobytes())
+            values.byteswap()
+        fp_set = cls(values, bloom, tuple(stamp))
+        fp_set._mmap = mm
+        fp_set._view = view
+        return fp_set
+
+    def close(self) -> None:
+        """משחרר את ה-mmap (אם הקבוצה נטענה מקובץ)"""
+        if self._mmap is None:
+            return
+        if isinstance(self.values, memoryview):
+            self.values.release()
+        if self.bloom is not None and isinstance(self.bloom.bits, memoryview):
+            self.bloom.bits.release()
+        self._view.release()
+        self.values = array("Q")
+        self.bloom = None
+        self._mmap.close()
+        self._mmap = None
+        self._view = None
@@ -0,0 +1,308 @@
+# http_archive.py - הקלטה ושחזור של תעבורת HTTP לריצות דטרמיניסטיות בלי רשת
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+from typing import Deque, Dict, List, Optional, Tuple, Union
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# טוקן הבוט של טלגרם נמצא בכתובת - לא נשמר בהקלטה
+_BOT_TOKEN = re.compile(r"/bot[^/]+/")
+# כותרות שלא נשמרות בהקלטה, וכותרות שלא תקפות לגוף שכבר פוענח
+_SECRET_HEADERS = {"authorization", "cookie", "proxy-authorization"}
+_BODY_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+def redact_url(url: str) -> str:
+    """הכתובת בלי סודות - גם מפתח החיפוש בשחזור"""
+    return _BOT_TOKEN.sub("/bot<token>/", url)
+
+
+def _body_bytes(body) -> bytes:
+    """גוף הבקשה כבתים (requests שומר אותו כמחרוזת, בתים או None)"""
+    if body is None:
+        return b""
+    return body.encode("utf-8") if isinstance(body, str) else bytes(body)
+
+
+class HttpArchive:
+    """
+    ארכיון של בקשות ותגובות בתיקייה:
+    requests.ndjson - שורה לכל בקשה (כתובת, כותרות, סטטוס, זמן), נכתבת מיד כשהתגובה מגיעה
+    bodies/<sha1>.gz - גופי התגובות, דחוסים ומאוחדים לפי תוכן
+    state/ - קבצי המצב של הריצה בתחילת ההקלטה
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        self.index_path = os.path.join(self.directory, "requests.ndjson")
+        self.bodies_dir = os.path.join(self.directory, "bodies")
+        self.state_dir = os.path.join(self.directory, "state")
+        self._lock = threading.Lock()
+        self._seq = 0
+        # לשחזור: תגובות לפי (method, url) לפי סדר ההקלטה
+        self._exchanges: Dict[Tuple[str, str], Deque[Dict]] = defaultdict(deque)
+        self.served = 0
+        self.missed: List[str] = []
+
+    # ==========================================
+    # הקלטה
+    # ==========================================
+
+    def start_recording(self, state_files: List[str]) -> None:
+        """מתחיל הקלטה חדשה ושומר עותק של קבצי המצב הקיימים"""
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        os.makedirs(self.state_dir, exist_ok=True)
+        open(self.index_path, "w").close()
+        for path in state_files:
+            if os.path.exists(path):
+                shutil.copy2(path, os.path.join(self.state_dir, os.path.basename(path)))
+
+    def body_writer(self) -> "_BodyWriter":
+        """כותב גוף תגובה לארכיון בחלקים, תוך כדי שהוא נקרא מהרשת"""
+        return _BodyWriter(self.bodies_dir)
+
+    def _store_body(self, body: bytes) -> str:
+        """שומר גוף תגובה (פעם אחת לכל תוכן) ומחזיר את הגיבוב שלו"""
+        writer = self.body_writer()
+        writer.write(body)
+        return writer.finish()
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response,
+               digest: Optional[str] = None) -> None:
+        """מוסיף בקשה ותגובה לארכיון - digest הוא גוף שכבר נשמר דרך body_writer"""
+        if digest is None:
+            digest = self._store_body(response.content)
+        entry = {
+            "method": request.method,
+            "url": redact_url(request.url),
+            "request_headers": {k: v for k, v in request.headers.items() if k.lower() not in _SECRET_HEADERS},
+            "request_body_sha1": hashlib.sha1(_body_bytes(request.body)).hexdigest(),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() != "set-cookie"},
+            "body": digest,
+            "elapsed": response.elapsed.total_seconds(),
+        }
+        with self._lock:
+            self._seq += 1
+            entry["seq"] = self._seq
+            with open(self.index_path, "a") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    # ==========================================
+    # שחזור
+    # ==========================================
+
+    def load(self) -> None:
+        """טוען את ההקלטה לשחזור"""
+        with open(self.index_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._exchanges[(entry["method"], entry["url"])].append(entry)
+        self._seq = sum(len(entries) for entries in self._exchanges.values())
+
+    def restore_state(self) -> str:
+        """מעתיק את קבצי המצב מההקלטה לתיקייה זמנית ומחזיר אותה - המצב האמיתי לא נוגע"""
+        workdir = tempfile.mkdtemp(prefix="yad2-replay-")
+        if os.path.isdir(self.state_dir):
+            for name in os.listdir(self.state_dir):
+                shutil.copy2(os.path.join(self.state_dir, name), os.path.join(workdir, name))
+        return workdir
+
+    def next_exchange(self, method: str, url: str) -> Optional[Dict]:
+        """התגובה הבאה לבקשה - לפי סדר ההקלטה; אחרי האחרונה חוזרת האחרונה"""
+        with self._lock:
+            entries = self._exchanges.get((method, redact_url(url)))
+            if not entries:
+                self.missed.append(f"{method} {redact_url(url)}")
+                return None
+            self.served += 1
+            if len(entries) > 1:
+                return entries.popleft()
+            return entries[0]
+
+    def read_body(self, digest: str) -> bytes:
+        """גוף תגובה מהארכיון"""
+        with gzip.open(os.path.join(self.bodies_dir, f"{digest}.gz"), "rb") as f:
+            return f.read()
+
+    def summary(self) -> str:
+        """שורת סיכום להדפסה בסוף הריצה"""
+        if self.served or self.missed:
+            return f"📼 שוחזרו {self.served} תגובות, {len(self.missed)} בקשות לא נמצאו בהקלטה"
+        return f"📼 הוקלטו {self._seq} בקשות ל-{self.directory}"
+
+
+class _BodyWriter:
+    """גוף תגובה שנכתב בחלקים לקובץ זמני דחוס, ומקבל את שמו לפי הגיבוב כשהוא נגמר"""
+
+    def __init__(self, bodies_dir: str):
+        self.bodies_dir = bodies_dir
+        self._sha1 = hashlib.sha1()
+        self._tmp_path = os.path.join(bodies_dir, f"body.{threading.get_ident()}.{id(self)}.tmp")
+        self._file = gzip.open(self._tmp_path, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._sha1.update(chunk)
+        self._file.write(chunk)
+
+    def finish(self) -> str:
+        """סוגר את הקובץ ומחזיר את הגיבוב של הגוף (גוף שכבר קיים בארכיון לא נשמר פעמיים)"""
+        self._file.close()
+        digest = self._sha1.hexdigest()
+        path = os.path.join(self.bodies_dir, f"{digest}.gz")
+        if os.path.exists(path):
+            os.remove(self._tmp_path)
+        else:
+            os.replace(self._tmp_path, path)
+        return digest
+
+
+class _TeeBody:
+    """
+    עוטף את ה-raw של urllib3 ומעתיק לארכיון כל חלק שנקרא ממנו - הגוף לא נאגר בזיכרון,
+    והבקשה נרשמת כשהגוף נגמר. תגובה שנסגרה לפני הסוף (הסורק הזורם עוצר ב-end_marker
+    או בתקרת הבתים) נקראת עד הסוף בסגירה, כך שההקלטה מכילה את הדף המלא.
+    """
+
+    def __init__(self, raw, writer: _BodyWriter, on_done):
+        self._raw = raw
+        self._writer = writer
+        self._on_done = on_done
+        self._done = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def _finish(self) -> None:
+        if not self._done:
+            self._done = True
+            self._on_done(self._writer.finish())
+
+    def stream(self, amt: int = 2 ** 16, decode_content=None):
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            self._writer.write(chunk)
+            yield chunk
+        self._finish()
+
+    def read(self, amt=None, *args, **kwargs):
+        data = self._raw.read(amt, *args, **kwargs)
+        self._writer.write(data)
+        if amt is None or not data:
+            self._finish()
+        return data
+
+    def close(self):
+        if not self._done:
+            try:
+                for chunk in self._raw.stream(2 ** 16, decode_content=True):
+                    self._writer.write(chunk)
+            except Exception as e:
+                print(f"Error recording the rest of a response: {e}")
+            self._finish()
+        self._raw.close()
+
+
+class RecordingAdapter(BaseAdapter):
+    """
+    עוטף את ה-adapter הקיים של ה-session ומקליט כל בקשה שעוברת בו
+    הגוף מועתק לארכיון תוך כדי הקריאה, כך שבקשות stream=True נשארות זורמות גם בהקלטה.
+    """
+
+    def __init__(self, inner: BaseAdapter, archive: HttpArchive):
+        super().__init__()
+        self.inner = inner
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        response = self.inner.send(request, **kwargs)
+
+        def on_done(digest: str) -> None:
+            try:
+                self.archive.record(request, response, digest)
+            except Exception as e:
+                print(f"Error recording {redact_url(request.url)}: {e}")
+
+        if response.raw is None:
+            on_done(self.archive._store_body(response.content or b""))
+            return response
+        try:
+            response.raw = _TeeBody(response.raw, self.archive.body_writer(), on_done)
+        except Exception as e:
+            print(f"Error recording {redact_url(request.url)}: {e}")
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    מגיש תגובות מההקלטה במקום הרשת, עם השהיה אופציונלית
+    latency: שניות לכל תגובה, או "recorded" - הזמן שנמדד בהקלטה.
+    בקשת GET שלא הוקלטה נכשלת כמו שרת שלא זמין; בקשת POST שלא הוקלטה (למשל הודעת טלגרם חדשה)
+    מקבלת 200 עם {"ok": true}, כך שהתראות חדשות לא יוצאות לשום מקום.
+    """
+
+    def __init__(self, archive: HttpArchive, latency: Union[float, str, None] = None):
+        super().__init__()
+        self.archive = archive
+        self.latency = latency
+
+    def _build(self, request, status: int, headers: Dict, body: bytes, reason: str = "", elapsed: float = 0.0):
+        """בונה אובייקט Response כאילו הגיע מהרשת"""
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict({k: v for k, v in headers.items() if k.lower() not in _BODY_HEADERS})
+        response._content = body
+        response._content_consumed = True
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=elapsed)
+        return response
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        entry = self.archive.next_exchange(request.method, request.url)
+        if entry is None and request.method != "POST":
+            raise requests.ConnectionError(f"Not in recording: {redact_url(request.url)}")
+
+        delay = self.latency
+        if delay == "recorded":
+            delay = entry["elapsed"] if entry else 0.0
+        if delay:
+            time.sleep(float(delay))
+
+        if entry is None:
+            return self._build(request, 200, {"Content-Type": "application/json"}, b'{"ok": true}',
+                               "OK", time.perf_counter() - started)
+        return self._build(request, entry["status"], entry["headers"], self.archive.read_body(entry["body"]),
+                           entry.get("reason") or "", time.perf_counter() - started)
+
+    def close(self):
+        pass
+
+
+def attach(session: requests.Session, archive: HttpArchive, replay: bool = False,
+           latency: Union[float, str, None] = None) -> None:
+    """מחבר את הארכיון ל-session - הקלטה סביב ה-adapters הקיימים, או שחזור במקומם"""
+    for prefix in ("http://", "https://"):
+        if replay:
+            session.mount(prefix, ReplayAdapter(archive, latency))
+        else:
+            session.mount(prefix, RecordingAdapter(session.get_adapter(prefix + "x"), archive))
@@ -1,47 +1,50 @@
 #!/usr/bin/env python3
 # main.py - הסקריפט הראשי
 
+import argparse
 import json
 import os
 import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Set
+from typing import List, Dict, Container, Iterable, Iterator, Optional, Tuple
 from scraper import GunScraper
-from notifier import Notifier
-from config import SEEN_ITEMS_FILE
+from profiles import DEFAULT_PROFILE, WatchProfile, ProfileIndex, ProfileNotifier, load_profiles
+from seen_store import SeenStore
+from outbox import Outbox
+from metrics import RunMetrics, summarize_history
+from http_archive import HttpArchive, attach
+from daemon import PollSchedule, install_stop_handlers
+from config import (
+    SEEN_ITEMS_FILE,
+    SEEN_DB_FILE,
+    HTTP_CACHE_FILE,
+    INNER_CACHE_FILE,
+    OUTBOX_FILE,
+    PROFILES_FILE,
+    DAEMON_MIN_INTERVAL,
+)
 
 # קבצים
 STATUS_FILE = "status.json"
 
 
-def generate_item_id(item: Dict) -> str:
-    """יוצר מזהה ייחודי לפריט"""
-    unique_string = f"{item['site']}:{item['url']}:{item['title']}"
-    return hashlib.md5(unique_string.encode()).hexdigest()
+def state_files() -> List[str]:
+    """קבצי המצב של הריצה - נשמרים עם ההקלטה כדי שהשחזור יתחיל מאותו מצב"""
+    base = os.path.splitext(SEEN_DB_FILE)[0]
+    return [STATUS_FILE, SEEN_ITEMS_FILE, SEEN_DB_FILE, f"{base}.items.fp", f"{base}.listings.fp",
+            HTTP_CACHE_FILE, INNER_CACHE_FILE, OUTBOX_FILE, PROFILES_FILE]
 
 
-def load_seen_items() -> Set[str]:
-    """טוען פריטים שכבר נראו"""
-    try:
-        if os.path.exists(SEEN_ITEMS_FILE):
-            with open(SEEN_ITEMS_FILE, "r") as f:
-                data = json.load(f)
-                return set(data.get("items", []))
-    except Exception as e:
-        print(f"Error loading seen items: {e}")
-    return set()
+def _latency(value: str):
+    """ערך --latency: שניות, או recorded לזמנים מההקלטה"""
+    return value if value == "recorded" else float(value)
 
 
-def save_seen_items(items: Set[str]) -> None:
-    """שומר פריטים שנראו"""
-    try:
-        with open(SEEN_ITEMS_FILE, "w") as f:
-            json.dump({
-                "items": list(items),
-                "last_updated": datetime.now().isoformat()
-            }, f, indent=2)
-    except Exception as e:
-        print(f"Error saving seen items: {e}")
+def generate_item_id(item: Dict) -> str:
+    """יוצר מזהה ייחודי לפריט"""
+    unique_string = f"{item['site']}:{item['url']}:{item['title']}"
+    return hashlib.md5(unique_string.encode()).hexdigest()
 
 
 def load_status() -> Dict:
@@ -80,14 +83,182 @@ def should_send_daily_status() -> bool:
     return 20 <= now_israel.hour < 21
 
 
-def filter_new_items(results: List[Dict], seen_items: Set[str]) -> List[Dict]:
-    """מסנן רק פריטים חדשים"""
-    new_items = []
+def profile_keys(item: Dict, index: ProfileIndex) -> List[Tuple[WatchProfile, str]]:
+    """(פרופיל, מזהה במאגר הפריטים שנראו) לכל פרופיל שהפריט מנותב אליו"""
+    item_id = generate_item_id(item)
+    return [(profile, profile.seen_key(item_id)) for profile in index.route(item)]
+
+
+def seen_keys(items: Iterable[Dict], index: ProfileIndex) -> Iterator[str]:
+    """המזהים במאגר של כל הפריטים, לכל הפרופילים שלהם - לעדכון זמן "נראה לאחרונה" """
+    for item in items:
+        for _, key in profile_keys(item, index):
+            yield key
+
+
+def iter_new_items(results: Iterable[Optional[Dict]], seen_items: Container[str],
+                   index: ProfileIndex) -> Iterator[Optional[Dict]]:
+    """מסנן זורם - מעביר רק פריטים שחדשים לפחות לפרופיל אחד (ופעימות None כמו שהן)"""
     for item in results:
+        if item is None or any(key not in seen_items for _, key in profile_keys(item, index)):
+            yield item
+
+
+def filter_new_items(results: List[Dict], seen_items: Container[str], index: ProfileIndex) -> List[Dict]:
+    """מסנן רק פריטים חדשים"""
+    return list(iter_new_items(results, seen_items, index))
+
+
+def deliver_new_items(items: List[Dict], seen_items, notifier: ProfileNotifier, outbox: Outbox,
+                      index: ProfileIndex) -> Tuple[int, bool]:
+    """
+    רושם פריטים חדשים בתיבת היוצאים, מסמן אותם כנראו ושולח
+    כל פריט נרשם בערוצים של הפרופילים שהוא מנותב אליהם ושעוד לא ראו אותו.
+    מרגע שהפריט בתיבת היוצאים השליחה לא תלויה יותר בסריקה - מה שלא נשלח ממשיך בריצה הבאה.
+    מחזיר (פריטים שנשלחו, האם הפריטים נרשמו)
+    """
+    if not notifier.channels():
+        print("⚠️ לא הוגדר אף ערוץ התראות")
+        return 0, False
+    # פריטים לפי קבוצת הערוצים - רישום אחד בתיבת היוצאים לכל קבוצה
+    groups: Dict[Tuple[str, ...], List[Tuple[str, Dict]]] = {}
+    keys = []
+    silent = set()
+    for item in items:
         item_id = generate_item_id(item)
-        if item_id not in seen_items:
-            new_items.append(item)
-    return new_items
+        for profile, key in profile_keys(item, index):
+            if key in seen_items:
+                continue
+            channels = notifier.channels_for(profile)
+            if not channels:
+                silent.add(profile.name)
+                continue
+            groups.setdefault(tuple(channels), []).append((item_id, item))
+            keys.append(key)
+    for name in sorted(silent):
+        print(f"⚠️ לפרופיל {name} לא הוגדר ערוץ התראות")
+    for channels, entries in groups.items():
+        outbox.add(entries, list(channels))
+    seen_items.add(keys)
+    sent, pending = outbox.dispatch(notifier)
+    if pending:
+        print(f"📤 {pending} פריטים ממתינים בתיבת היוצאים")
+    return sent, True
+
+
+def run_streaming(scraper: GunScraper, notifier: ProfileNotifier, seen_items, outbox: Outbox,
+                  index: ProfileIndex) -> Tuple[int, int, bool]:
+    """
+    מצב זורם: סריקה, סינון ושליחה בצינור אחד - מנות נשלחות ברגע שאתר מסתיים
+    מחזיר (תוצאות, פריטים שנשלחו, האם היו פריטים שלא נרשמו לשליחה)
+    """
+    results = []
+    
+    def collect():
+        for item in scraper.iter_results(heartbeat=1.0):
+            if item is not None:
+                results.append(item)
+            yield item
+    
+    sent = 0
+    failed = False
+    
+    def send(batch: List[Dict]) -> bool:
+        nonlocal sent
+        batch_sent, queued = deliver_new_items(batch, seen_items, notifier, outbox, index)
+        sent += batch_sent
+        return queued
+    
+    for batch, queued in notifier.notify_stream(iter_new_items(collect(), seen_items, index), send=send):
+        if not queued:
+            failed = True
+    
+    # מעדכן "נראה לאחרונה" לפריטים שעדיין מופיעים
+    seen_items.touch(seen_keys(results, index))
+    return len(results), sent, failed
+
+
+def save_state(status: Dict, scraper: GunScraper, seen_store: SeenStore, delivery_failed: bool = False) -> None:
+    """שומר סטטוס, מטמונים ומודעות שנסרקו - בסוף ריצה ואחרי כל בדיקה במצב daemon"""
+    save_status(status)
+    # פריטים מדפים שלא השתנו עדיין מופיעים באתר - כדי שלא יפוגו ויישלחו שוב
+    seen_store.items.touch(scraper.unchanged_items)
+    scraper.unchanged_items.clear()
+    if not delivery_failed:
+        scraper.response_cache.save()
+        # מודעות שנסרקו נשמרות כדי שהעימוד ייעצר בהן בריצה הבאה
+        seen_store.listings.add(scraper.crawled_listings)
+        scraper.crawled_listings.clear()
+    scraper.inner_cache.save()
+
+
+def run_daemon(scraper: GunScraper, notifier: ProfileNotifier, seen_store: SeenStore, outbox: Outbox,
+               status: Dict, ui_url: str, index: ProfileIndex) -> None:
+    """
+    מצב daemon: תהליך אחד שרץ ברציפות עם הסשנים, המתאמים והמצב בזיכרון
+    כל אתר נבדק לפי המרווח שלו (PollSchedule), ואחרי כל בדיקה המצב והמדדים נשמרים.
+    SIGINT/SIGTERM עוצרים אחרי הבדיקה הנוכחית.
+    """
+    if not notifier.channels():
+        print("❌ מצב daemon דורש ערוץ התראות (טלגרם או מייל)")
+        return
+    seen_items = seen_store.items
+    schedule = PollSchedule(scraper.sites, status.get("daemon"))
+    stop = install_stop_handlers()
+    last_outbox_retry = time.time()
+    print(f"🔁 מצב daemon: {len(scraper.sites)} אתרים, Ctrl+C לעצירה")
+    
+    try:
+        while not stop.is_set():
+            name, delay = schedule.next_due()
+            if delay > 0:
+                stop.wait(min(delay, 60))
+                # בזמן ההמתנה: התראות שנתקעו בתיבת היוצאים והודעת הסטטוס היומית
+                if len(outbox) and time.time() - last_outbox_retry >= DAEMON_MIN_INTERVAL:
+                    last_outbox_retry = time.time()
+                    outbox.dispatch(notifier)
+                today = datetime.now().date().isoformat()
+                if should_send_daily_status() and status.get("last_daily_status") != today:
+                    print("📅 שולח הודעת סטטוס יומית...")
+                    notifier.send_daily_status(ui_url)
+                    status["last_daily_status"] = today
+                    expired = seen_store.expire()
+                    if expired:
+                        print(f"🧹 {expired} פריטים ישנים הוסרו מהמאגר")
+                    save_status(status)
+                continue
+            
+            # שינויים שנעשו ב-status.json (למשל השבתה דרך ה-UI) נקלטים בכל בדיקה
+            status.update(load_status())
+            if not status.get("enabled", True):
+                print("⏸️ הסורק מושבת - בודק שוב מאוחר יותר")
+                schedule.next_run[name] = time.time() + DAEMON_MIN_INTERVAL
+                continue
+            
+            # מדדים נפרדים לכל בדיקה - שורה בהיסטוריה לכל אתר שנבדק
+            metrics = RunMetrics()
+            scraper.metrics = outbox.metrics = metrics
+            print(f"\n⏰ {datetime.now().strftime('%H:%M:%S')} בודק את {name}")
+            results = scraper._run_scraper(scraper.sites[name])
+            new_items = filter_new_items(results, seen_items, index)
+            seen_items.touch(seen_keys(results, index))
+            if new_items:
+                print(f"🆕 פריטים חדשים: {len(new_items)}")
+                sent, _ = deliver_new_items(new_items, seen_items, notifier, outbox, index)
+                if sent:
+                    status["last_weekly_notification"] = datetime.now().isoformat()
+            interval = schedule.update(name, len(new_items))
+            print(f"  ⏱️ {name}: בדיקה הבאה בעוד כ-{interval / 60:.0f} דקות")
+            
+            metrics.write_history()
+            metrics.write_prometheus()
+            status["metrics"] = summarize_history()
+            status["daemon"] = schedule.to_dict()
+            save_state(status, scraper, seen_store)
+    finally:
+        status["daemon"] = schedule.to_dict()
+        save_state(status, scraper, seen_store)
+        print("💾 המצב נשמר")
 
 
 def get_notification_settings(status: Dict) -> Dict:
@@ -99,8 +270,34 @@ def get_notification_settings(status: Dict) -> Dict:
     return settings
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """הפונקציה הראשית"""
+    parser = argparse.ArgumentParser(description="YAD2 Scraper")
+    parser.add_argument("--stream", action="store_true",
+                        help="שליחת התראות במנות ברגע שכל אתר מסתיים")
+    parser.add_argument("--daemon", action="store_true",
+                        help="ריצה רציפה - כל אתר נבדק לפי מרווח שמותאם לקצב המודעות החדשות בו")
+    archive_mode = parser.add_mutually_exclusive_group()
+    archive_mode.add_argument("--record", metavar="DIR",
+                              help="הקלטת כל בקשות ה-HTTP (סורק וטלגרם) ומצב הריצה לתיקייה")
+    archive_mode.add_argument("--replay", metavar="DIR",
+                              help="ריצה מהקלטה, בלי רשת, על עותק זמני של המצב המוקלט")
+    parser.add_argument("--latency", type=_latency, default=None,
+                        help="השהיה לכל תגובה בשחזור: שניות, או recorded")
+    args = parser.parse_args(argv)
+    
+    # הקלטה/שחזור - בשחזור הריצה עוברת לתיקייה זמנית, כך שקבצי המצב האמיתיים לא משתנים
+    archive = None
+    if args.record:
+        archive = HttpArchive(args.record)
+        archive.start_recording(state_files())
+    elif args.replay:
+        archive = HttpArchive(args.replay)
+        archive.load()
+        workdir = archive.restore_state()
+        os.chdir(workdir)
+        print(f"📼 שחזור מ-{archive.directory} (תיקיית עבודה: {workdir})")
+    
     print("=" * 50)
     print(f"🔫 YAD2 Scraper")
     print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -118,52 +315,115 @@ def main():
         print("⏸️ הסורק מושבת. הפעל אותו דרך ה-UI.")
         return
     
-    # טוען פריטים שכבר נראו
-    seen_items = load_seen_items()
+    # פותח את מאגר הפריטים שכבר נראו
+    seen_store = SeenStore()
+    seen_items = seen_store.items
     print(f"📋 {len(seen_items)} פריטים שכבר נראו")
     
-    # סורק את כל האתרים
-    scraper = GunScraper()
-    all_results = scraper.scrape_all()
+    # פרופילי המעקב - ברירת המחדל מההגדרות ומ-SEARCH_TERMS, ועוד מנויים מ-PROFILES_FILE
+    profiles = load_profiles(notification_settings)
+    
+    # notifier לכל פרופיל, עם הגדרות מותאמות
+    notifier = ProfileNotifier(profiles)
+    # מנוי בלי אף ערוץ לא נסרק בשבילו (פרופיל ברירת המחדל נשאר - כמו קודם, עם אזהרה בשליחה)
+    for profile in profiles:
+        if profile.name != DEFAULT_PROFILE and not notifier.channels_for(profile):
+            print(f"⚠️ לפרופיל {profile.name} לא הוגדר ערוץ התראות - מדולג")
+    profiles = [profile for profile in profiles if profile.name == DEFAULT_PROFILE or notifier.channels_for(profile)]
+    index = ProfileIndex(profiles)
+    if len(profiles) > 1:
+        print(f"👥 {len(profiles)} פרופילי מעקב: {', '.join(profile.name for profile in profiles)}")
+    if archive:
+        for profile_notifier in notifier.notifiers.values():
+            attach(profile_notifier.session, archive, replay=bool(args.replay), latency=args.latency)
+            if args.replay:
+                # SMTP לא מוקלט - בשחזור לא שולחים מיילים
+                profile_notifier.notify_email = None
+    
+    # קודם כל שולח התראות שנשארו מריצות קודמות - בלי לסרוק שוב
+    metrics = RunMetrics()
+    outbox = Outbox(metrics=metrics)
+    expired = outbox.expire()
+    if expired:
+        print(f"🧹 {expired} התראות ישנות הוסרו מתיבת היוצאים")
+    if len(outbox):
+        print(f"📤 {len(outbox)} התראות ממתינות מריצה קודמת")
+        resumed, _ = outbox.dispatch(notifier)
+        if resumed:
+            status["last_weekly_notification"] = datetime.now().isoformat()
     
-    print(f"\n📊 סה\"כ נמצאו: {len(all_results)} תוצאות")
+    # סריקה אחת לכל האתרים - הכרטיסים מותאמים מול המילים של כל הפרופילים יחד
+    scraper = GunScraper(known_listings=seen_store.listings, metrics=metrics, terms=index.terms)
+    scraper.listing_filter = index.accepts
+    # דפים שלא השתנו נסרקים שוב כשהגדרות הפרופילים השתנו, ומזהי המודעות שלהם נשמרים במטמון
+    scraper.response_cache.fingerprint = index.fingerprint()
+    scraper.item_keys = lambda item: [key for _, key in profile_keys(item, index)]
+    if archive:
+        attach(scraper.session, archive, replay=bool(args.replay), latency=args.latency)
     
-    # יוצר notifier עם הגדרות מותאמות
-    notifier = Notifier(
-        telegram_chat_id=notification_settings.get("telegram_chat_id"),
-        notify_email=notification_settings.get("notify_email")
-    )
+    # מטמון הבקשות נשמר רק אם כל הפריטים החדשים נרשמו לשליחה - אחרת הדפים יידלגו בריצה הבאה
+    delivery_failed = False
     
-    if all_results:
-        # מסנן רק פריטים חדשים
-        new_items = filter_new_items(all_results, seen_items)
-        print(f"🆕 פריטים חדשים: {len(new_items)}")
+    if args.daemon:
+        run_daemon(scraper, notifier, seen_store, outbox, status, ui_url, index)
+    elif args.stream:
+        # צינור זורם - מנות נשלחות ברגע שכל אתר מסתיים
+        total, sent, delivery_failed = run_streaming(scraper, notifier, seen_items, outbox, index)
+        print(f"\n📊 סה\"כ נמצאו: {total} תוצאות, 🆕 נשלחו {sent} פריטים חדשים")
+        if sent:
+            status["last_weekly_notification"] = datetime.now().isoformat()
+        elif not total:
+            print("❌ לא נמצאו תוצאות")
+    else:
+        # סורק את כל האתרים
+        all_results = scraper.scrape_all()
+        print(f"\n📊 סה\"כ נמצאו: {len(all_results)} תוצאות")
         
-        if new_items:
-            # שולח התראות
-            success = notifier.notify(new_items)
+        if all_results:
+            # מסנן רק פריטים חדשים, ומעדכן "נראה לאחרונה" לפריטים שעדיין מופיעים
+            new_items = filter_new_items(all_results, seen_items, index)
+            print(f"🆕 פריטים חדשים: {len(new_items)}")
+            seen_items.touch(seen_keys(all_results, index))
             
-            if success:
-                # מעדכן את רשימת הפריטים שנראו
-                for item in new_items:
-                    seen_items.add(generate_item_id(item))
-                save_seen_items(seen_items)
-                print("✅ התראות נשלחו בהצלחה!")
+            if new_items:
+                # רושם בתיבת היוצאים ושולח התראות
+                sent, queued = deliver_new_items(new_items, seen_items, notifier, outbox, index)
                 
-                # מאפס את ההודעה השבועית כי שלחנו הודעה
-                status["last_weekly_notification"] = datetime.now().isoformat()
-            else:
-                print("⚠️ בעיה בשליחת ההתראות")
-    else:
-        print("❌ לא נמצאו תוצאות")
+                if sent:
+                    print("✅ התראות נשלחו בהצלחה!")
+                    
+                    # מאפס את ההודעה השבועית כי שלחנו הודעה
+                    status["last_weekly_notification"] = datetime.now().isoformat()
+                if not queued:
+                    delivery_failed = True
+                    print("⚠️ בעיה בשליחת ההתראות")
+        else:
+            print("❌ לא נמצאו תוצאות")
     
-    # בודק אם צריך לשלוח הודעת סטטוס יומית (רק בסריקת 20:00)
-    if should_send_daily_status():
-        print("📅 שולח הודעת סטטוס יומית...")
-        notifier.send_daily_status(ui_url)
+    if scraper.inner_cache.hits:
+        print(f"💾 {scraper.inner_cache.hits} דפים פנימיים נטענו מהמטמון")
     
-    # שומר סטטוס
-    save_status(status)
+    if not args.daemon:
+        # בודק אם צריך לשלוח הודעת סטטוס יומית (רק בסריקת 20:00)
+        if should_send_daily_status():
+            print("📅 שולח הודעת סטטוס יומית...")
+            notifier.send_daily_status(ui_url)
+        
+        # שומר את מדדי הריצה וסיכום מתגלגל של הריצות האחרונות (ב-daemon הם נשמרים אחרי כל בדיקה)
+        metrics.write_history()
+        metrics.write_prometheus()
+        status["metrics"] = summarize_history()
+        
+        # שומר סטטוס ומטמונים
+        save_state(status, scraper, seen_store, delivery_failed)
+    notifier.close()
+    
+    expired = seen_store.expire()
+    if expired:
+        print(f"🧹 {expired} פריטים ישנים הוסרו מהמאגר")
+    seen_store.close()
+    if archive:
+        print(archive.summary())
     
     print("\n" + "=" * 50)
     print("✅ הסריקה הסתיימה")
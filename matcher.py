@@ -0,0 +1,119 @@
+# matcher.py - התאמת מילות חיפוש עם נרמול עברית
+
+import hashlib
+import re
+from typing import Dict, Iterable, Optional, Pattern, Set
+
+# סימנים שנמחקים בתוך מילה: ניקוד וטעמים (בלי מקף עברי), גרש/גרשיים ומרכאות (צה"ל, ש״ח)
+_IN_WORD = re.compile(r"[\u0591-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7\u05f3\u05f4'\"`]+")
+# כל מה שאינו אות או ספרה: רווחים, פיסוק ומקף - כל רצף הופך לרווח אחד
+_NON_WORD = re.compile(r"[\W_]+")
+# אות (לא ספרה) - מעבר בין אותיות לספרות הוא גבול מילה: "glock19" נקרא כמו "glock 19"
+_LETTER = r"[^\W\d_]"
+# אותיות השימוש (ו, ה, ש, ב, כ, ל, מ) - עד שתיים לפני מילה עברית: "הגלוק", "לגלוק", "והגלוק"
+_HEBREW_PREFIX = "[הולבמשכ]"
+# סיומות ריבוי ונקבה אחרי מילה עברית: "מוסים", "מחסניות", "גלוקה"
+_HEBREW_SUFFIX = "(?:ים|ות|ה)"
+
+
+def _fold(text: str) -> str:
+    """אותיות קטנות ובלי סימנים בתוך מילים - הטקסט שמולו רץ המתאם (הפיסוק נשאר במקומו)"""
+    return _IN_WORD.sub("", text.lower())
+
+
+def normalize_text(text: str) -> str:
+    """מנרמל טקסט להשוואה - אותיות קטנות, בלי ניקוד ופיסוק, ורווח יחיד בין מילים"""
+    if not text:
+        return ""
+    return _NON_WORD.sub(" ", _fold(text)).strip()
+
+
+def term_key(term: str) -> str:
+    """הצורה הקנונית של מילת חיפוש - בלי רווחים, כך ש-"glock 19" ו-"glock19" הן אותה מילה"""
+    return normalize_text(term).replace(" ", "")
+
+
+def _is_hebrew(char: str) -> bool:
+    return "\u05d0" <= char <= "\u05ea"
+
+
+def _term_pattern(key: str) -> str:
+    """
+    ביטוי למילה קנונית בטקסט אחרי _fold: בין כל שתי אותיות מותרים רווחים ופיסוק,
+    וההתאמה מתחילה ונגמרת בגבול מילה - "45 mos" לא נמצא בתוך "45, Most"
+    בקצה עברי הגבול מתיר אותיות שימוש לפני המילה וסיומת אחריה ("הגלוק", "45 מוסים"),
+    והן נבדקות ב-lookaround כך שההתאמה עצמה היא תמיד המילה בלבד.
+    האות הראשונה באה לפני בדיקת הגבול, כך שהמנוע מדלג מהר על מיקומים שלא מתחילים באף מילה.
+    """
+    first, last = key[0], key[-1]
+    if first.isdigit():
+        start = r"(?<!\d.)"
+    elif _is_hebrew(first):
+        start = (f"(?:(?<!{_LETTER}.)|(?<=(?<!{_LETTER}){_HEBREW_PREFIX}.)"
+                 f"|(?<=(?<!{_LETTER}){_HEBREW_PREFIX}{{2}}.))")
+    else:
+        start = f"(?<!{_LETTER}.)"
+    if last.isdigit():
+        end = r"(?!\d)"
+    elif _is_hebrew(last):
+        end = f"(?={_HEBREW_SUFFIX}?(?!{_LETTER}))"
+    else:
+        end = f"(?!{_LETTER})"
+    rest = "".join(r"[\W_]*" + re.escape(char) for char in key[1:])
+    return f"{re.escape(first)}{start}{rest}{end}"
+
+
+class TermMatcher:
+    """
+    מתאם מילות חיפוש מהודר - נבנה פעם אחת לכל ריצה
+    כל מילה מנורמלת לצורה קנונית, כך ש-"גלוק 45 מ.ו.ס" ו-"גלוק45 מוס" הן אותה מילה.
+    כל המילים מאוחדות לביטוי אחד שסורק את הטקסט במעבר יחיד, על גבולות מילים בלבד.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        # צורה קנונית -> המילה המקורית הראשונה שהוגדרה (לייחוס התוצאה)
+        self.terms: Dict[str, str] = {}
+        for term in terms:
+            key = term_key(term)
+            if key and key not in self.terms:
+                self.terms[key] = term
+
+        # הארוכה קודם - כך שההתאמה מיוחסת למילה הספציפית ביותר
+        keys = sorted(self.terms, key=len, reverse=True)
+        alternation = "|".join(f"(?:{_term_pattern(key)})" for key in keys)
+        self._pattern = re.compile(alternation) if keys else None
+        # מילים שעשויות להיות מוכלות בתוך מילה אחרת ("45mos" בתוך "glock45mos") - נבדקות על ההתאמה עצמה
+        self._contained: Dict[str, Set[str]] = {
+            key: {other for other in keys if other in key and other != key} for key in keys
+        }
+        self._single: Dict[str, Pattern] = {key: re.compile(_term_pattern(key)) for key in keys}
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def fingerprint(self) -> str:
+        """טביעה של המילים הקנוניות - משתנה רק כשקבוצת המילים משתנה"""
+        return hashlib.sha1("\n".join(sorted(self.terms)).encode()).hexdigest()
+
+    def search(self, text: str) -> Optional[str]:
+        """מחזיר את המילה המקורית של ההתאמה הראשונה, או None"""
+        if not self._pattern or not text:
+            return None
+        match = self._pattern.search(_fold(text))
+        return self.terms[_NON_WORD.sub("", match.group())] if match else None
+
+    def find_all(self, text: str) -> Set[str]:
+        """מחזיר את כל המילים המקוריות שמופיעות בטקסט (כולל חופפות)"""
+        if not self._pattern or not text:
+            return set()
+        text = _fold(text)
+        found: Set[str] = set()
+        # חיפוש מכל מיקום שאחרי תחילת ההתאמה הקודמת - כך נמצאות גם התאמות חופפות
+        match = self._pattern.search(text)
+        while match:
+            matched = match.group()
+            key = _NON_WORD.sub("", matched)
+            found.add(key)
+            found |= {other for other in self._contained[key] if self._single[other].search(matched)}
+            match = self._pattern.search(text, match.start() + 1)
+        return {self.terms[key] for key in found}
@@ -0,0 +1,217 @@
+# metrics.py - מדדים לכל שלב ולכל אתר בריצה, היסטוריית ריצות וקובץ Prometheus
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+import requests
+from config import METRICS_HISTORY_FILE, METRICS_HISTORY_MAX_RUNS, METRICS_SUMMARY_RUNS, METRICS_PROMETHEUS_FILE
+
+# שדות מספריים של אתר - כולם מצטברים לאורך הריצה
+SITE_FIELDS = (
+    "requests",       # בקשות HTTP (דפי רשימה ודפים פנימיים)
+    "bytes",          # גודל התגובות
+    "queue_s",        # המתנה במתזמן השרת (מקביליות, קצב ו-Retry-After)
+    "ttfb_s",         # משליחת הבקשה ועד קבלת הכותרות (response.elapsed)
+    "download_s",     # קריאת גוף התגובה אחרי הכותרות
+    "parse_s",        # פענוח HTML
+    "pages",          # עמודי רשימה שנסרקו
+    "unchanged",      # עמודים שלא השתנו מהריצה הקודמת
+    "prefiltered",    # עמודים שדולגו בלי DOM כי אף מילה לא הופיעה בטקסט שלהם
+    "cards",          # כרטיסים (או רשומות JSON) שנבדקו
+    "matches",        # כרטיסים שהתאימו למילות החיפוש
+    "filtered",       # מודעות שנפסלו בסינון הפרופילים לפני ההעשרה
+    "enrich_calls",   # דפים פנימיים שנטענו מהרשת
+    "enrich_cached",  # דפים פנימיים שנטענו מהמטמון
+    "errors",         # שגיאות סריקה
+    "duration_s",     # זמן הסריקה הכולל של האתר
+    "results",        # תוצאות שהוחזרו
+)
+NOTIFY_FIELDS = ("messages", "items", "failures", "send_s", "max_send_s")
+
+
+class RunMetrics:
+    """מדדי ריצה אחת - לכל אתר ולכל ערוץ התראות. בטוח לשימוש מכמה threads"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.sites: Dict[str, Dict] = {}
+        self.notify: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _site(self, name: str) -> Dict:
+        """הרשומה של האתר - נוצרת בפעם הראשונה (בתוך המנעול)"""
+        if name not in self.sites:
+            self.sites[name] = dict.fromkeys(SITE_FIELDS, 0)
+            self.sites[name]["status"] = Counter()
+        return self.sites[name]
+
+    def add(self, site_name: str, **values: float) -> None:
+        """מוסיף ערכים לשדות של אתר"""
+        with self._lock:
+            site = self._site(site_name)
+            for field, value in values.items():
+                site[field] += value
+
+    def get(self, site_name: str, field: str) -> float:
+        """ערך נוכחי של שדה באתר"""
+        with self._lock:
+            return self.sites.get(site_name, {}).get(field, 0)
+
+    def record_response(self, site_name: str, response: requests.Response, queue_s: float, total_s: float,
+                        size: Optional[int] = None) -> None:
+        """
+        רושם בקשה: המתנה במתזמן, TTFB, הורדה, גודל וקוד סטטוס
+        ההמתנה במתזמן כלולה ב-response.elapsed ולכן מנוכה ממנו.
+        requests לא חושף זמני DNS וחיבור בנפרד - הם כלולים ב-TTFB.
+        size - בתים שנקראו, לתגובה זורמת שהגוף שלה לא נטען במלואו
+        """
+        elapsed = response.elapsed.total_seconds()
+        with self._lock:
+            site = self._site(site_name)
+            site["requests"] += 1
+            site["bytes"] += len(response.content) if size is None else size
+            site["queue_s"] += queue_s
+            site["ttfb_s"] += max(elapsed - queue_s, 0.0)
+            site["download_s"] += max(total_s - elapsed, 0.0)
+            site["status"][str(response.status_code)] += 1
+
+    def record_notify(self, channel: str, items: int, seconds: float, ok: bool) -> None:
+        """רושם שליחת הודעה אחת בערוץ - משך, מספר פריטים והאם הצליחה"""
+        with self._lock:
+            stats = self.notify.setdefault(channel, dict.fromkeys(NOTIFY_FIELDS, 0))
+            stats["messages"] += 1
+            stats["send_s"] += seconds
+            stats["max_send_s"] = max(stats["max_send_s"], seconds)
+            if ok:
+                stats["items"] += items
+                # כמה זמן מתחילת הריצה עד שההתראה הראשונה יצאה
+                stats.setdefault("first_sent_after_s", round(time.time() - self.started, 3))
+            else:
+                stats["failures"] += 1
+
+    def to_record(self) -> Dict:
+        """רשומת הריצה להיסטוריה"""
+        with self._lock:
+            sites = {name: _rounded(site) for name, site in self.sites.items()}
+            for site in sites.values():
+                site["status"] = dict(site["status"])
+            notify = {channel: _rounded(stats) for channel, stats in self.notify.items()}
+        return {
+            "run_at": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "duration_s": round(time.time() - self.started, 3),
+            "sites": sites,
+            "notify": notify,
+        }
+
+    def write_history(self, path: str = METRICS_HISTORY_FILE, max_runs: int = METRICS_HISTORY_MAX_RUNS) -> Dict:
+        """מוסיף את הריצה לקובץ ההיסטוריה (שורת JSON לכל ריצה) ושומר רק את הריצות האחרונות"""
+        record = self.to_record()
+        try:
+            lines = _read_lines(path)
+            lines.append(json.dumps(record, ensure_ascii=False))
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write("\n".join(lines[-max_runs:]) + "\n")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error writing metrics history: {e}")
+        return record
+
+    def write_prometheus(self, path: str = METRICS_PROMETHEUS_FILE) -> None:
+        """כותב קובץ טקסט בפורמט Prometheus (ל-textfile collector של node_exporter)"""
+        if not path:
+            return
+        record = self.to_record()
+        lines = [
+            "# HELP yad2_scraper_run_duration_seconds Duration of the last scraper run",
+            "# TYPE yad2_scraper_run_duration_seconds gauge",
+            f"yad2_scraper_run_duration_seconds {record['duration_s']}",
+            f"yad2_scraper_last_run_timestamp_seconds {self.started:.0f}",
+        ]
+        for field in SITE_FIELDS:
+            metric = f"yad2_scraper_site_{field}"
+            lines.append(f"# TYPE {metric} gauge")
+            for name, site in record["sites"].items():
+                lines.append(f'{metric}{{site="{_label(name)}"}} {site[field]}')
+        lines.append("# TYPE yad2_scraper_site_responses gauge")
+        for name, site in record["sites"].items():
+            for code, count in site["status"].items():
+                lines.append(f'yad2_scraper_site_responses{{site="{_label(name)}",code="{code}"}} {count}')
+        for field in NOTIFY_FIELDS:
+            metric = f"yad2_scraper_notify_{field}"
+            lines.append(f"# TYPE {metric} gauge")
+            for channel, stats in record["notify"].items():
+                lines.append(f'{metric}{{channel="{channel}"}} {stats[field]}')
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error writing Prometheus metrics: {e}")
+
+
+def _rounded(values: Dict) -> Dict:
+    """עותק של השדות עם זמנים מעוגלים"""
+    return {field: round(value, 4) if isinstance(value, float) else value for field, value in values.items()}
+
+
+def _label(value: str) -> str:
+    """מסמן תווים מיוחדים (escape) בערך של תווית Prometheus"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _read_lines(path: str) -> List[str]:
+    """שורות לא ריקות מקובץ ההיסטוריה"""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return [line for line in f.read().splitlines() if line.strip()]
+
+
+def load_history(path: str = METRICS_HISTORY_FILE, runs: Optional[int] = None) -> List[Dict]:
+    """טוען את הריצות האחרונות מההיסטוריה (שורות פגומות מדולגות)"""
+    records = []
+    for line in _read_lines(path)[-runs if runs else 0:]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def summarize_history(path: str = METRICS_HISTORY_FILE, runs: int = METRICS_SUMMARY_RUNS) -> Dict:
+    """
+    סיכום מתגלגל של הריצות האחרונות לכל אתר - ממוצעים מול הריצה האחרונה
+    כך שאתר שהאט או הפסיק להחזיר התאמות בולט ב-status.json.
+    """
+    history = load_history(path, runs)
+    summary = {"runs": len(history), "sites": {}}
+    if not history:
+        return summary
+    summary["avg_duration_s"] = round(sum(r["duration_s"] for r in history) / len(history), 3)
+
+    names = {name for record in history for name in record.get("sites", {})}
+    for name in sorted(names):
+        rows = [record["sites"][name] for record in history if name in record.get("sites", {})]
+        last = rows[-1]
+
+        def avg(field: str) -> float:
+            return round(sum(row.get(field, 0) for row in rows) / len(rows), 3)
+
+        summary["sites"][name] = {
+            "avg_duration_s": avg("duration_s"),
+            "avg_ttfb_s": avg("ttfb_s"),
+            "avg_parse_s": avg("parse_s"),
+            "avg_bytes": avg("bytes"),
+            "avg_matches": avg("matches"),
+            "last_duration_s": last.get("duration_s", 0),
+            "last_matches": last.get("matches", 0),
+            "last_status": last.get("status", {}),
+            "error_runs": sum(1 for row in rows if row.get("errors")),
+        }
+    return summary
@@ -3,34 +3,111 @@
 import smtplib
 import ssl
 import os
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 from config import (
     TELEGRAM_BOT_TOKEN,
     TELEGRAM_CHAT_ID,
+    TELEGRAM_API_URL,
     EMAIL_ADDRESS,
     EMAIL_PASSWORD,
     NOTIFY_EMAIL,
     SMTP_SERVER,
     SMTP_PORT,
     SMTP_USE_SSL,
+    REQUEST_TIMEOUT,
+    STREAM_BATCH_SIZE,
+    STREAM_BATCH_SECONDS,
+    TELEGRAM_MAX_MESSAGE_LENGTH,
+    EMAIL_DIGEST_SIZE,
 )
 
+# קו מפריד בין כותרת ההודעה לגוף
+TELEGRAM_RULE = "━━━━━━━━━━━━━━━━━━━━\n"
+TELEGRAM_FOOTER = TELEGRAM_RULE + "🤖 YAD2 Scraper - סריקה אוטומטית"
+
+
+class DeliveryError(Exception):
+    """שליחה שנכשלה - retryable מציין אם יש טעם לנסות שוב, retry_after הוא ההמתנה שהשרת ביקש (בשניות)"""
+
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def _message_length(text: str) -> int:
+    """אורך הודעה כפי שטלגרם סופר אותו (יחידות UTF-16 - אמוג'י נספר כ-2)"""
+    return len(text.encode("utf-16-le")) // 2
+
 
 class Notifier:
     """שולח התראות מפורטות בטלגרם ובמייל"""
     
-    def __init__(self, telegram_chat_id: Optional[str] = None, notify_email: Optional[str] = None):
+    def __init__(self, telegram_chat_id: Optional[str] = None, notify_email: Optional[str] = None,
+                 use_config: bool = True):
         """
         אתחול עם הגדרות מותאמות אישית
         telegram_chat_id: Chat ID מותאם (אם לא ניתן, משתמש ב-config)
         notify_email: Email מותאם (אם לא ניתן, משתמש ב-config)
+        use_config: False - בלי ברירות המחדל מ-config (מנוי שאינו הראשי מקבל רק את הערוצים שלו)
         """
-        self.telegram_chat_id = telegram_chat_id or TELEGRAM_CHAT_ID
-        self.notify_email = notify_email or NOTIFY_EMAIL
+        self.telegram_chat_id = telegram_chat_id or (TELEGRAM_CHAT_ID if use_config else None)
+        self.notify_email = notify_email or (NOTIFY_EMAIL if use_config else None)
+        # חיבורים שנשמרים לכל אורך הריצה - HTTP לטלגרם ו-SMTP למייל
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def close(self) -> None:
+        """סוגר את החיבורים שנפתחו במהלך הריצה"""
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+        self.session.close()
+
+    def channels(self) -> List[str]:
+        """הערוצים שמוגדרים כרגע"""
+        channels = []
+        if TELEGRAM_BOT_TOKEN and self.telegram_chat_id:
+            channels.append("telegram")
+        if EMAIL_ADDRESS and EMAIL_PASSWORD and self.notify_email:
+            channels.append("email")
+        return channels
+
+    def _post_telegram(self, message: str) -> None:
+        """שולח הודעה לטלגרם - זורק DeliveryError בכישלון"""
+        url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+        payload = {
+            "chat_id": self.telegram_chat_id,
+            "text": message,
+            "parse_mode": "HTML",
+            "disable_web_page_preview": False,
+        }
+        try:
+            response = self.session.post(url, json=payload, timeout=10)
+        except requests.RequestException as e:
+            raise DeliveryError(str(e))
+        
+        if response.status_code == 429 or response.status_code >= 500:
+            # בהגבלת קצב טלגרם מחזיר כמה שניות לחכות ב-parameters.retry_after
+            retry_after = response.headers.get("Retry-After")
+            try:
+                retry_after = response.json().get("parameters", {}).get("retry_after", retry_after)
+            except ValueError:
+                pass
+            raise DeliveryError(f"HTTP {response.status_code}",
+                                retry_after=float(retry_after) if retry_after else None)
+        if response.status_code >= 400:
+            raise DeliveryError(f"HTTP {response.status_code}: {response.text[:200]}", retryable=False)
 
     def send_telegram(self, message: str) -> bool:
         """שולח הודעה לטלגרם"""
@@ -39,15 +116,7 @@ class Notifier:
             return False
 
         try:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-            payload = {
-                "chat_id": self.telegram_chat_id,
-                "text": message,
-                "parse_mode": "HTML",
-                "disable_web_page_preview": False,
-            }
-            response = requests.post(url, json=payload, timeout=10)
-            response.raise_for_status()
+            self._post_telegram(message)
             print(f"✅ Telegram message sent successfully to {self.telegram_chat_id}")
             return True
         except Exception as e:
@@ -61,129 +130,156 @@ class Notifier:
             return False
 
         try:
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = EMAIL_ADDRESS
-            msg["To"] = self.notify_email
-
-            # גרסת טקסט פשוט
-            text_content = self._html_to_text(body)
-            text_part = MIMEText(text_content, "plain", "utf-8")
-            
-            # גרסת HTML
-            html_body = f"""
-            <!DOCTYPE html>
-            <html dir="rtl" lang="he">
-            <head>
-                <meta charset="utf-8">
-                <style>
-                    body {{ 
-                        font-family: Arial, sans-serif; 
-                        direction: rtl; 
-                        background: #f5f5f5;
-                        padding: 20px;
-                    }}
-                    .container {{
-                        max-width: 600px;
-                        margin: 0 auto;
-                        background: white;
-                        border-radius: 10px;
-                        padding: 20px;
-                        box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                    }}
-                    h2 {{
-                        color: #333;
-                        border-bottom: 2px solid #007bff;
-                        padding-bottom: 10px;
-                    }}
-                    .result {{ 
-                        border: 1px solid #e0e0e0; 
-                        padding: 15px; 
-                        margin: 15px 0; 
-                        border-radius: 8px;
-                        background: #fafafa;
-                        transition: all 0.3s;
-                    }}
-                    .result:hover {{
-                        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                    }}
-                    .site {{ 
-                        color: #007bff; 
-                        font-size: 12px; 
-                        font-weight: bold;
-                        text-transform: uppercase;
-                        letter-spacing: 1px;
-                    }}
-                    .title {{ 
-                        font-size: 18px; 
-                        font-weight: bold; 
-                        margin: 10px 0;
-                        color: #333;
-                    }}
-                    .price {{ 
-                        color: #28a745; 
-                        font-size: 20px;
-                        font-weight: bold;
-                        margin: 10px 0;
-                    }}
-                    .description {{
-                        color: #666;
-                        font-size: 14px;
-                        margin: 10px 0;
-                        line-height: 1.5;
-                    }}
-                    .link {{
-                        display: inline-block;
-                        background: #007bff;
-                        color: white !important;
-                        padding: 10px 20px;
-                        border-radius: 5px;
-                        text-decoration: none;
-                        margin-top: 10px;
-                    }}
-                    .link:hover {{
-                        background: #0056b3;
-                    }}
-                    .footer {{
-                        color: #888;
-                        font-size: 12px;
-                        margin-top: 20px;
-                        padding-top: 15px;
-                        border-top: 1px solid #eee;
-                        text-align: center;
-                    }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    {body}
-                </div>
-            </body>
-            </html>
-            """
-            html_part = MIMEText(html_body, "html", "utf-8")
-            
-            msg.attach(text_part)
-            msg.attach(html_part)
-
-            # שליחה - תומך ב-SSL וב-TLS
-            if SMTP_USE_SSL:
-                context = ssl.create_default_context()
-                with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context) as server:
-                    server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-                    server.sendmail(EMAIL_ADDRESS, self.notify_email, msg.as_string())
-            else:
-                with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                    server.starttls()
-                    server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-                    server.sendmail(EMAIL_ADDRESS, self.notify_email, msg.as_string())
-            
+            self._smtp_send(self._build_email(subject, body))
             print(f"✅ Email sent successfully to {self.notify_email}")
             return True
         except Exception as e:
             print(f"❌ Error sending email: {e}")
             return False
 
+    def _deliver_email(self, subject: str, body: str) -> None:
+        """שולח מייל - זורק DeliveryError בכישלון (קודי 5xx של השרת הם כישלון קבוע)"""
+        try:
+            self._smtp_send(self._build_email(subject, body))
+        except smtplib.SMTPResponseException as e:
+            self._smtp = None
+            raise DeliveryError(f"SMTP {e.smtp_code}: {e.smtp_error!r}", retryable=e.smtp_code < 500)
+        except (smtplib.SMTPException, OSError) as e:
+            self._smtp = None
+            raise DeliveryError(str(e))
+
+    def _build_email(self, subject: str, body: str) -> str:
+        """בונה את המייל - גרסת טקסט וגרסת HTML"""
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = EMAIL_ADDRESS
+        msg["To"] = self.notify_email
+
+        # גרסת טקסט פשוט
+        text_content = self._html_to_text(body)
+        text_part = MIMEText(text_content, "plain", "utf-8")
+        
+        # גרסת HTML
+        html_body = f"""
+        <!DOCTYPE html>
+        <html dir="rtl" lang="he">
+        <head>
+            <meta charset="utf-8">
+            <style>
+                body {{ 
+                    font-family: Arial, sans-serif; 
+                    direction: rtl; 
+                    background: #f5f5f5;
+                    padding: 20px;
+                }}
+                .container {{
+                    max-width: 600px;
+                    margin: 0 auto;
+                    background: white;
+                    border-radius: 10px;
+                    padding: 20px;
+                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+                }}
+                h2 {{
+                    color: #333;
+                    border-bottom: 2px solid #007bff;
+                    padding-bottom: 10px;
+                }}
+                .result {{ 
+                    border: 1px solid #e0e0e0; 
+                    padding: 15px; 
+                    margin: 15px 0; 
+                    border-radius: 8px;
+                    background: #fafafa;
+                    transition: all 0.3s;
+                }}
+                .result:hover {{
+                    box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+                }}
+                .site {{ 
+                    color: #007bff; 
+                    font-size: 12px; 
+                    font-weight: bold;
+                    text-transform: uppercase;
+                    letter-spacing: 1px;
+                }}
+                .title {{ 
+                    font-size: 18px; 
+                    font-weight: bold; 
+                    margin: 10px 0;
+                    color: #333;
+                }}
+                .price {{ 
+                    color: #28a745; 
+                    font-size: 20px;
+                    font-weight: bold;
+                    margin: 10px 0;
+                }}
+                .description {{
+                    color: #666;
+                    font-size: 14px;
+                    margin: 10px 0;
+                    line-height: 1.5;
+                }}
+                .link {{
+                    display: inline-block;
+                    background: #007bff;
+                    color: white !important;
+                    padding: 10px 20px;
+                    border-radius: 5px;
+                    text-decoration: none;
+                    margin-top: 10px;
+                }}
+                .link:hover {{
+                    background: #0056b3;
+                }}
+                .footer {{
+                    color: #888;
+                    font-size: 12px;
+                    margin-top: 20px;
+                    padding-top: 15px;
+                    border-top: 1px solid #eee;
+                    text-align: center;
+                }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                {body}
+            </div>
+        </body>
+        </html>
+        """
+        html_part = MIMEText(html_body, "html", "utf-8")
+        
+        msg.attach(text_part)
+        msg.attach(html_part)
+        return msg.as_string()
+
+    def _smtp_connect(self) -> smtplib.SMTP:
+        """פותח חיבור SMTP ומתחבר לחשבון - תומך ב-SSL וב-TLS"""
+        if SMTP_USE_SSL:
+            context = ssl.create_default_context()
+            server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context, timeout=REQUEST_TIMEOUT)
+        else:
+            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=REQUEST_TIMEOUT)
+            server.starttls()
+        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+        return server
+
+    def _smtp_send(self, message: str) -> None:
+        """שולח דרך החיבור הפתוח, ומתחבר מחדש פעם אחת אם השרת סגר אותו"""
+        for attempt in range(2):
+            if self._smtp is None:
+                self._smtp = self._smtp_connect()
+            try:
+                self._smtp.sendmail(EMAIL_ADDRESS, self.notify_email, message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = None
+                if attempt:
+                    raise
+
     def _html_to_text(self, html: str) -> str:
         """ממיר HTML לטקסט פשוט"""
         import re
@@ -192,99 +288,174 @@ class Notifier:
         text = re.sub(r'\n\s*\n', '\n\n', text)
         return text.strip()
 
-    def format_results(self, results: List[Dict]) -> tuple:
-        """מעצב את התוצאות להודעה מפורטת עם כל פרטי המודעה"""
-        if not results:
-            return "", ""
-
-        now = datetime.now().strftime("%d/%m/%Y %H:%M")
+    def _telegram_item(self, i: int, r: Dict) -> str:
+        """בלוק טלגרם של מודעה אחת"""
+        title = r['title'][:300]
+        msg = f"<b>📍 [{i}] {r['site']}</b>\n"
+        msg += f"━━━━━━━━━━━━━━\n"
+        msg += f"📦 <b>{title}</b>\n"
         
-        # ==========================================
-        # הודעת Telegram - מפורטת עם לינק
-        # ==========================================
-        telegram_msg = f"🔔 <b>התראה: נמצאו {len(results)} תוצאות!</b>\n"
-        telegram_msg += f"⏰ {now}\n"
-        telegram_msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+        if r.get('price') and r['price'] != "לא ידוע":
+            msg += f"💰 <b>{r['price']}</b>\n"
         
-        for i, r in enumerate(results, 1):
-            telegram_msg += f"<b>📍 [{i}] {r['site']}</b>\n"
-            telegram_msg += f"━━━━━━━━━━━━━━\n"
-            telegram_msg += f"📦 <b>{r['title']}</b>\n"
-            
-            if r.get('price') and r['price'] != "לא ידוע":
-                telegram_msg += f"💰 <b>{r['price']}</b>\n"
-            
-            if r.get('description'):
-                desc = r['description'][:150] + "..." if len(r.get('description', '')) > 150 else r.get('description', '')
-                telegram_msg += f"📝 {desc}\n"
-            
-            if r.get('location'):
-                telegram_msg += f"📍 {r['location']}\n"
-            
-            if r.get('phone'):
-                telegram_msg += f"📞 {r['phone']}\n"
-            
-            telegram_msg += f"\n🔗 <a href=\"{r['url']}\">לצפייה במודעה</a>\n\n"
+        if r.get('description'):
+            desc = r['description'][:150] + "..." if len(r.get('description', '')) > 150 else r.get('description', '')
+            msg += f"📝 {desc}\n"
+        
+        if r.get('location'):
+            msg += f"📍 {r['location']}\n"
+        
+        if r.get('phone'):
+            msg += f"📞 {r['phone']}\n"
+        
+        if r.get('matched_term'):
+            msg += f"🔎 {r['matched_term']}\n"
+        
+        msg += f"\n🔗 <a href=\"{r['url']}\">לצפייה במודעה</a>\n\n"
+        return msg
 
-        telegram_msg += "━━━━━━━━━━━━━━━━━━━━\n"
-        telegram_msg += "🤖 YAD2 Scraper - סריקה אוטומטית"
+    def _telegram_header(self, count: int, now: str, part: int = 1, parts: int = 1) -> str:
+        """כותרת הודעת טלגרם - עם מספר חלק כשהתוצאות מפוצלות"""
+        suffix = f" ({part}/{parts})" if parts > 1 else ""
+        return f"🔔 <b>התראה: נמצאו {count} תוצאות!</b>{suffix}\n⏰ {now}\n" + TELEGRAM_RULE + "\n"
 
-        # ==========================================
-        # הודעת Email - מעוצבת עם כל הפרטים
-        # ==========================================
-        email_body = f"<h2>🔔 התראה: נמצאו {len(results)} תוצאות!</h2>"
-        email_body += f"<p style='color: #666;'>⏰ {now}</p>"
+    def format_telegram_messages(self, results: List[Dict], now: str) -> List[Tuple[List[Dict], str]]:
+        """
+        מחלק את התוצאות להודעות טלגרם מתחת למגבלת האורך - מחזיר (המודעות, ההודעה) לכל הודעה
+        כל מודעה נשארת שלמה בתוך הודעה אחת, והמודעות נארזות ברצף עד שההודעה מתמלאת.
+        """
+        # שומר מקום לכותרת עם מספר חלק ולסיומת
+        reserve = _message_length(self._telegram_header(len(results), now, 999, 999)) + _message_length(TELEGRAM_FOOTER)
+        limit = TELEGRAM_MAX_MESSAGE_LENGTH - reserve
+        
+        chunks: List[Tuple[List[Dict], List[str]]] = []
+        size = limit
+        for i, r in enumerate(results, 1):
+            block = self._telegram_item(i, r)
+            length = _message_length(block)
+            if size + length > limit:
+                chunks.append(([], []))
+                size = 0
+            chunks[-1][0].append(r)
+            chunks[-1][1].append(block)
+            size += length
         
-        for r in results:
-            email_body += f"""
+        return [
+            (items, self._telegram_header(len(results), now, part, len(chunks)) + "".join(blocks) + TELEGRAM_FOOTER)
+            for part, (items, blocks) in enumerate(chunks, 1)
+        ]
+
+    def _email_item(self, r: Dict) -> str:
+        """בלוק HTML של מודעה אחת במייל"""
+        body = f"""
             <div class="result">
                 <div class="site">📍 {r['site']}</div>
                 <div class="title">📦 {r['title']}</div>
             """
-            
-            if r.get('price') and r['price'] != "לא ידוע":
-                email_body += f'<div class="price">💰 {r["price"]}</div>'
-            
-            if r.get('description'):
-                desc = r['description'][:300] + "..." if len(r.get('description', '')) > 300 else r.get('description', '')
-                email_body += f'<div class="description">📝 {desc}</div>'
-            
-            if r.get('location'):
-                email_body += f'<div class="description">📍 מיקום: {r["location"]}</div>'
-            
-            if r.get('phone'):
-                email_body += f'<div class="description">📞 טלפון: {r["phone"]}</div>'
-            
-            email_body += f"""
+        
+        if r.get('price') and r['price'] != "לא ידוע":
+            body += f'<div class="price">💰 {r["price"]}</div>'
+        
+        if r.get('description'):
+            desc = r['description'][:300] + "..." if len(r.get('description', '')) > 300 else r.get('description', '')
+            body += f'<div class="description">📝 {desc}</div>'
+        
+        if r.get('location'):
+            body += f'<div class="description">📍 מיקום: {r["location"]}</div>'
+        
+        if r.get('phone'):
+            body += f'<div class="description">📞 טלפון: {r["phone"]}</div>'
+        
+        if r.get('matched_term'):
+            body += f'<div class="description">🔎 מילת חיפוש: {r["matched_term"]}</div>'
+        
+        body += f"""
                 <a href="{r['url']}" class="link" target="_blank">🔗 לצפייה במודעה</a>
             </div>
             """
+        return body
 
-        email_body += """
+    def format_email_digests(self, results: List[Dict], now: str) -> List[Tuple[List[Dict], Tuple[str, str]]]:
+        """מחלק את התוצאות למיילים מרוכזים של עד EMAIL_DIGEST_SIZE מודעות - מחזיר (המודעות, (נושא, גוף)) לכל מייל"""
+        size = max(EMAIL_DIGEST_SIZE, 1)
+        parts = (len(results) + size - 1) // size
+        digests = []
+        for part in range(parts):
+            batch = results[part * size:(part + 1) * size]
+            suffix = f" ({part + 1}/{parts})" if parts > 1 else ""
+            
+            body = f"<h2>🔔 התראה: נמצאו {len(results)} תוצאות!{suffix}</h2>"
+            body += f"<p style='color: #666;'>⏰ {now}</p>"
+            body += "".join(self._email_item(r) for r in batch)
+            body += """
         <div class="footer">
             🤖 YAD2 Scraper - סריקה אוטומטית<br>
             לשינוי הגדרות, ערוך את קובץ config.py
         </div>
         """
+            subject = f"🔔 YAD2 Scraper: נמצאו {len(results)} תוצאות חדשות!{suffix}"
+            digests.append((batch, (subject, body)))
+        return digests
+
+    def format_results(self, results: List[Dict]) -> Tuple[List, List]:
+        """מעצב את התוצאות - הודעות טלגרם בגבולות האורך ומיילים מרוכזים, עם כל פרטי המודעה"""
+        if not results:
+            return [], []
 
-        return telegram_msg, email_body
+        now = datetime.now().strftime("%d/%m/%Y %H:%M")
+        return self.format_telegram_messages(results, now), self.format_email_digests(results, now)
 
     def notify(self, results: List[Dict]) -> bool:
-        """שולח התראות בכל הערוצים"""
+        """שולח התראות בכל הערוצים - כל התוצאות נשלחות, מפוצלות לפי הצורך"""
         if not results:
             print("ℹ️ No results to notify")
             return False
 
-        telegram_msg, email_body = self.format_results(results)
+        telegram_messages, email_digests = self.format_results(results)
         
-        telegram_success = self.send_telegram(telegram_msg)
-        email_success = self.send_email(
-            subject=f"🔔 YAD2 Scraper: נמצאו {len(results)} תוצאות חדשות!",
-            body=email_body
-        )
+        # ערוץ נחשב מוצלח רק אם כל ההודעות שלו נשלחו (עוצר בכישלון הראשון)
+        telegram_success = all(self.send_telegram(message) for _, message in telegram_messages)
+        email_success = all(self.send_email(subject=subject, body=body) for _, (subject, body) in email_digests)
 
         return telegram_success or email_success
 
+    def channel_parts(self, channel: str, results: List[Dict]) -> List[Tuple[List[Dict], object]]:
+        """ההודעות של ערוץ אחד - (המודעות שבהודעה, תוכן ההודעה) - לשליחה דרך send_part"""
+        now = datetime.now().strftime("%d/%m/%Y %H:%M")
+        if channel == "telegram":
+            return self.format_telegram_messages(results, now)
+        return self.format_email_digests(results, now)
+
+    def send_part(self, channel: str, payload) -> None:
+        """שולח הודעה אחת בערוץ - זורק DeliveryError בכישלון"""
+        if channel == "telegram":
+            self._post_telegram(payload)
+        else:
+            self._deliver_email(*payload)
+
+    def notify_stream(self, items: Iterable[Optional[Dict]], batch_size: int = STREAM_BATCH_SIZE,
+                      window: float = STREAM_BATCH_SECONDS,
+                      send: Optional[Callable[[List[Dict]], bool]] = None) -> Iterator[Tuple[List[Dict], bool]]:
+        """
+        שלב התראות זורם: אוסף פריטים למנות קטנות ושולח מנה כשהיא מלאה או כשעבר חלון הזמן
+        None בקלט הוא פעימה - כך שמנה חלקית נשלחת בזמן גם כשלא מגיעים פריטים חדשים.
+        send מחליף את notify (למשל שליחה דרך תיבת היוצאים). מחזיר (מנה, הצלחה) לכל מנה שנשלחה.
+        """
+        send = send or self.notify
+        batch: List[Dict] = []
+        started = 0.0
+        for item in items:
+            now = time.monotonic()
+            if item is not None:
+                if not batch:
+                    started = now
+                batch.append(item)
+            if batch and (len(batch) >= batch_size or now - started >= window):
+                yield batch, send(batch)
+                batch = []
+        if batch:
+            yield batch, send(batch)
+
     def send_test_notification(self) -> bool:
         """שולח התראת בדיקה"""
         test_results = [
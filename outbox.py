@@ -0,0 +1,170 @@
+# outbox.py - תיבת יוצאים מתמידה: כל התראה נרשמת לפני השליחה ונשלחת עד שהיא מגיעה
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from config import (
+    OUTBOX_FILE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_BACKOFF_SECONDS,
+    OUTBOX_MAX_BACKOFF,
+    OUTBOX_MAX_AGE_DAYS,
+)
+from notifier import Notifier, DeliveryError
+from metrics import RunMetrics
+
+
+class Outbox:
+    """
+    רשומה לכל פריט שממתין להתראה, עם מצב נפרד לכל ערוץ (pending / sent / failed)
+    הקובץ נכתב אחרי כל הודעה שנשלחה, כך שריצה שנקטעה ממשיכה מאותה נקודה בריצה הבאה.
+    """
+
+    def __init__(self, path: str = OUTBOX_FILE, metrics: Optional[RunMetrics] = None):
+        self.path = path
+        self.metrics = metrics
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """טוען את תיבת היוצאים מהדיסק"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f).get("entries", {})
+        except Exception as e:
+            print(f"Error loading outbox: {e}")
+
+    def save(self) -> None:
+        """שומר את תיבת היוצאים - כתיבה לקובץ זמני והחלפה, כדי שקריסה לא תשאיר קובץ חלקי"""
+        try:
+            with self._lock:
+                data = {"entries": self.entries, "last_updated": datetime.now().isoformat()}
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving outbox: {e}")
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, items: List[Tuple[str, Dict]], channels: List[str]) -> None:
+        """מוסיף פריטים (מזהה, פריט) לשליחה בערוצים הנתונים ושומר מיד"""
+        now = time.time()
+        with self._lock:
+            for item_id, item in items:
+                entry = self.entries.setdefault(item_id, {"item": item, "created": now, "channels": {}})
+                for channel in channels:
+                    entry["channels"].setdefault(channel, {"status": "pending", "attempts": 0})
+        self.save()
+
+    def pending(self, channel: str) -> List[Tuple[str, Dict]]:
+        """הפריטים שעדיין ממתינים בערוץ, לפי סדר ההוספה"""
+        with self._lock:
+            return [
+                (item_id, entry["item"])
+                for item_id, entry in self.entries.items()
+                if entry["channels"].get(channel, {}).get("status") == "pending"
+            ]
+
+    def _mark(self, ids: List[str], channel: str, status: str, error: Optional[str] = None) -> None:
+        """מעדכן את מצב הערוץ לפריטים, ומסיר פריטים שכל הערוצים שלהם הסתיימו"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            for item_id in ids:
+                entry = self.entries.get(item_id)
+                if entry is None:
+                    continue
+                state = entry["channels"][channel]
+                state["status"] = status
+                state["attempts"] = state.get("attempts", 0) + 1
+                state["updated_at"] = now
+                if error:
+                    state["last_error"] = error
+                if all(s["status"] != "pending" for s in entry["channels"].values()):
+                    del self.entries[item_id]
+        self.save()
+
+    def expire(self, max_age_days: float = OUTBOX_MAX_AGE_DAYS) -> int:
+        """מסיר פריטים שממתינים יותר מדי זמן (למשל ערוץ שהוסר מההגדרות)"""
+        cutoff = time.time() - max_age_days * 24 * 3600
+        with self._lock:
+            stale = [item_id for item_id, entry in self.entries.items() if entry["created"] < cutoff]
+            for item_id in stale:
+                del self.entries[item_id]
+        if stale:
+            self.save()
+        return len(stale)
+
+    def _send_with_retry(self, notifier: Notifier, channel: str, payload) -> Optional[DeliveryError]:
+        """
+        שולח הודעה אחת עם backoff מעריכי - מחזיר None בהצלחה או את השגיאה האחרונה
+        כשהשרת מבקש להמתין (retry_after של טלגרם) ממתינים בדיוק את הזמן שביקש.
+        """
+        error = None
+        for attempt in range(max(OUTBOX_MAX_ATTEMPTS, 1)):
+            try:
+                notifier.send_part(channel, payload)
+                return None
+            except DeliveryError as e:
+                error = e
+            if not error.retryable or attempt == OUTBOX_MAX_ATTEMPTS - 1:
+                break
+            if error.retry_after is not None:
+                delay = error.retry_after
+            else:
+                delay = OUTBOX_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5)
+            if delay > OUTBOX_MAX_BACKOFF:
+                # המתנה ארוכה מדי לריצה הזו - הפריטים יישלחו בריצה הבאה
+                break
+            print(f"  ⏳ {channel}: {error} - ניסיון חוזר בעוד {delay:.1f} שניות")
+            time.sleep(delay)
+        return error
+
+    def _dispatch_channel(self, notifier: Notifier, channel: str) -> int:
+        """שולח את כל הפריטים הממתינים בערוץ אחד ומחזיר כמה נשלחו"""
+        pending = self.pending(channel)
+        if not pending:
+            return 0
+        ids = {id(item): item_id for item_id, item in pending}
+        sent = 0
+        for items, payload in notifier.channel_parts(channel, [item for _, item in pending]):
+            part_ids = [ids[id(item)] for item in items]
+            started = time.perf_counter()
+            error = self._send_with_retry(notifier, channel, payload)
+            if self.metrics is not None:
+                self.metrics.record_notify(channel, len(part_ids), time.perf_counter() - started, error is None)
+            if error is None:
+                self._mark(part_ids, channel, "sent")
+                sent += len(part_ids)
+                print(f"✅ {channel}: נשלחו {len(part_ids)} פריטים")
+            elif not error.retryable:
+                # כישלון קבוע (למשל הודעה שנדחתה) - לא ננסה אותה שוב
+                self._mark(part_ids, channel, "failed", str(error))
+                print(f"❌ {channel}: {error}")
+            else:
+                # ההודעה הזו ושאר ההודעות בערוץ נשארות ממתינות לריצה הבאה
+                self._mark(part_ids, channel, "pending", str(error))
+                print(f"⚠️ {channel}: {error} - {len(self.pending(channel))} פריטים ממתינים לריצה הבאה")
+                break
+        return sent
+
+    def dispatch(self, notifier: Notifier) -> Tuple[int, int]:
+        """
+        שולח את כל הממתינים - כל ערוץ ב-thread משלו, כך שערוץ איטי או תקול לא מעכב את האחר
+        מחזיר (הודעות פריט שנשלחו, פריטים שעדיין ממתינים).
+        """
+        channels = [channel for channel in notifier.channels() if self.pending(channel)]
+        sent = 0
+        if channels:
+            with ThreadPoolExecutor(max_workers=len(channels)) as pool:
+                sent = sum(pool.map(lambda channel: self._dispatch_channel(notifier, channel), channels))
+        return sent, len(self.entries)
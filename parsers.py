@@ -0,0 +1,36 @@
+# parsers.py - בחירת מנוע פענוח HTML עם נפילה אוטומטית
+
+from typing import Dict, Optional
+from bs4 import BeautifulSoup, FeatureNotFound
+
+# סדר הנפילה: מהמהיר לאיטי. html.parser מובנה בפייתון ותמיד זמין
+FALLBACK_ORDER = ["lxml", "html5lib", "html.parser"]
+
+# זיכרון של מנועים שלא מותקנים - כדי לא לנסות אותם שוב בכל דף
+_unavailable: Dict[str, bool] = {}
+
+
+def resolve_backend(backend: Optional[str]) -> str:
+    """מחזיר את המנוע הזמין הראשון החל מהמנוע המבוקש"""
+    order = list(FALLBACK_ORDER)
+    if backend in order:
+        order = order[order.index(backend):]
+    elif backend:
+        order.insert(0, backend)
+    for name in order:
+        if not _unavailable.get(name):
+            return name
+    return "html.parser"
+
+
+def parse_html(markup: str, backend: Optional[str] = None) -> BeautifulSoup:
+    """מפענח HTML עם המנוע המבוקש, ונופל למנוע הבא אם הוא לא מותקן"""
+    while True:
+        name = resolve_backend(backend)
+        try:
+            return BeautifulSoup(markup, name)
+        except FeatureNotFound:
+            if name == "html.parser":
+                raise
+            print(f"⚠️ HTML parser '{name}' is not installed, falling back")
+            _unavailable[name] = True
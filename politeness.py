@@ -0,0 +1,192 @@
+# politeness.py - מתזמן בקשות לכל שרת: דלי אסימונים, כיבוד Retry-After והאטה/האצה אוטומטית
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from config import MAX_REQUESTS_PER_HOST, HOST_MAX_RETRIES, HOST_MAX_RETRY_WAIT
+from sites import get_host_limits
+
+# קודים שמשמעותם "לאט יותר"
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """ערך Retry-After בשניות - מספר שניות או תאריך HTTP"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class HostBucket:
+    """
+    דלי אסימונים של שרת אחד - קצב (בקשות לשנייה), פרץ ומקביליות
+    הקצב מותאם אוטומטית: יורד בחצי אחרי 429/503 ועולה בהדרגה אחרי הצלחות (AIMD).
+    """
+
+    def __init__(self, host: str, limits: Dict):
+        self.host = host
+        self.rate = float(limits["rate"])
+        self.min_rate = float(limits.get("min_rate", self.rate))
+        self.max_rate = float(limits.get("max_rate", self.rate))
+        self.increase = float(limits.get("increase", 0.0))
+        self.burst = max(float(limits.get("burst", 1)), 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.slots = threading.Semaphore(max(int(limits.get("concurrency", MAX_REQUESTS_PER_HOST)), 1))
+        self.lock = threading.Lock()
+        self.throttled = 0
+
+    def take_token(self) -> None:
+        """ממתין לאסימון פנוי (ולסוף חסימת Retry-After, אם יש)"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def feedback(self, status: int, retry_after: Optional[float]) -> None:
+        """מעדכן את הקצב לפי התגובה"""
+        with self.lock:
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.tokens = 0.0
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            elif status < 400:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+class _SlotBody:
+    """
+    עוטף את ה-raw של urllib3 ומשחרר את המקום של הבקשה בשרת כשהגוף נקרא עד הסוף או כשהתגובה נסגרת
+    כך מגבלת המקביליות חלה על כל הבקשה - גם על קריאה זורמת של הגוף אחרי ש-send חזר.
+    """
+
+    def __init__(self, raw, slots: threading.Semaphore):
+        self._raw = raw
+        self._slots = slots
+        self._held = True
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def release(self) -> None:
+        """משחרר את המקום (פעם אחת בלבד)"""
+        with self._lock:
+            if not self._held:
+                return
+            self._held = False
+        self._slots.release()
+
+    def stream(self, *args, **kwargs):
+        try:
+            yield from self._raw.stream(*args, **kwargs)
+        except GeneratorExit:
+            # הצרכן הפסיק לקרוא (break) - החיבור עדיין פתוח, והמקום משתחרר בסגירת התגובה
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.release()
+
+    def read(self, amt=None, *args, **kwargs):
+        try:
+            data = self._raw.read(amt, *args, **kwargs)
+        except Exception:
+            self.release()
+            raise
+        if amt is None or not data:
+            self.release()
+        return data
+
+    def close(self):
+        try:
+            self._raw.close()
+        finally:
+            self.release()
+
+    def __del__(self):
+        # תגובה שנזנחה בלי קריאה ובלי סגירה לא תופסת את המקום לתמיד
+        self.release()
+
+
+class PoliteAdapter(HTTPAdapter):
+    """
+    HTTPAdapter שכל בקשה בו עוברת דרך הדלי של השרת
+    המקום בתור של השרת (concurrency) נתפס עד שגוף התגובה נקרא או שהתגובה נסגרת.
+    על 429/503 הבקשה נשלחת שוב (עד HOST_MAX_RETRIES) אחרי ההמתנה שהשרת ביקש,
+    כך שהאטה רגעית לא מפילה את כל האתר בריצה.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._buckets: Dict[str, HostBucket] = {}
+        self._buckets_lock = threading.Lock()
+        # זמן ההמתנה של הבקשה האחרונה בכל thread - למדדים
+        self._local = threading.local()
+
+    def bucket(self, url: str) -> HostBucket:
+        """הדלי של השרת - נוצר בפעם הראשונה לפי HOST_LIMITS"""
+        host = urlparse(url).hostname or ""
+        with self._buckets_lock:
+            if host not in self._buckets:
+                self._buckets[host] = HostBucket(host, get_host_limits(host))
+            return self._buckets[host]
+
+    def take_wait(self) -> float:
+        """כמה זמן הבקשה האחרונה של ה-thread חיכתה לתור ולקצב (ומאפס)"""
+        waited = getattr(self._local, "waited", 0.0)
+        self._local.waited = 0.0
+        return waited
+
+    def send(self, request, **kwargs):
+        bucket = self.bucket(request.url)
+        waited = 0.0
+        for attempt in range(max(HOST_MAX_RETRIES, 0) + 1):
+            queued = time.perf_counter()
+            bucket.slots.acquire()
+            try:
+                bucket.take_token()
+                waited += time.perf_counter() - queued
+                response = super().send(request, **kwargs)
+            except BaseException:
+                bucket.slots.release()
+                raise
+            # המקום משתחרר עם הגוף (ראו _SlotBody), לא כש-send חוזר
+            if response.raw is None:
+                bucket.slots.release()
+            else:
+                response.raw = _SlotBody(response.raw, bucket.slots)
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            bucket.feedback(response.status_code, retry_after)
+            if response.status_code not in THROTTLE_STATUSES or attempt == HOST_MAX_RETRIES:
+                break
+            if retry_after is not None and retry_after > HOST_MAX_RETRY_WAIT:
+                break
+            print(f"  🐢 {bucket.host}: {response.status_code} - מאט ל-{bucket.rate:.2f} בקשות לשנייה ומנסה שוב")
+            response.close()
+        self._local.waited = waited
+        return response
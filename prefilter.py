@@ -0,0 +1,164 @@
+# prefilter.py - סינון מוקדם של דפים לפי הטקסט הגולמי, לפני בניית עץ DOM
+
+import html
+import re
+from typing import Dict, FrozenSet, List, Pattern, Set, Tuple
+from matcher import TermMatcher
+
+# בלוקים שהטקסט שלהם לא נכלל ב-get_text() - סקריפטים, סגנונות, תבניות והערות
+_HIDDEN_BLOCKS = re.compile(
+    r"<(script|style|template)\b[^>]*>.*?</\1\s*>|<!--.*?-->",
+    re.S | re.I,
+)
+# תגית פותחת/סוגרת/הצהרה - "<" שאחריו רווח או ספרה הוא טקסט ולא תגית
+_TAG = re.compile(r"<[a-zA-Z/!?][^>]*>")
+# פתיחה של בלוק מוסתר וסגירה שלו - לחיתוך דף שמגיע בחלקים
+_HIDDEN_OPEN = re.compile(r"<(script|style|template)\b|<!--", re.I)
+_HIDDEN_CLOSE = {
+    "script": re.compile(r"</script\s*>", re.I),
+    "style": re.compile(r"</style\s*>", re.I),
+    "template": re.compile(r"</template\s*>", re.I),
+    None: re.compile(r"-->"),
+}
+_HREF = re.compile(r"""<a\b[^>]*?\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.I)
+# כמה תווים מכל צד של ההתאמה נכנסים לקטע הטקסט
+SNIPPET_RADIUS = 80
+
+
+def visible_text(markup: str) -> str:
+    """הטקסט של הדף כמו ש-get_text() מחזיר אותו - בלי תגיות, סקריפטים והערות, עם ישויות מפוענחות"""
+    return html.unescape(_TAG.sub(" ", _HIDDEN_BLOCKS.sub(" ", markup)))
+
+
+def link_hrefs(markup: str) -> Set[str]:
+    """כל ערכי ה-href של קישורים בדף, בלי לבנות DOM"""
+    return {html.unescape(next(g for g in match.groups() if g is not None)) for match in _HREF.finditer(markup)}
+
+
+def _complete_prefix(markup: str) -> int:
+    """
+    עד איזה מיקום חלק של דף אפשר לסנן כבר עכשיו
+    לא חותכים באמצע תגית, ישות או בלוק מוסתר שעוד לא נסגר - השארית מחכה לחלק הבא.
+    """
+    cut = len(markup)
+    pos = 0
+    while True:
+        opener = _HIDDEN_OPEN.search(markup, pos)
+        if not opener:
+            break
+        closer = _HIDDEN_CLOSE[opener.group(1) and opener.group(1).lower()].search(markup, opener.end())
+        if not closer:
+            cut = opener.start()
+            break
+        pos = closer.end()
+    lt = markup.rfind("<", 0, cut)
+    if lt != -1 and markup.find(">", lt, cut) == -1:
+        cut = lt
+    amp = markup.rfind("&", max(cut - 12, 0), cut)
+    if amp != -1 and markup.find(";", amp, cut) == -1:
+        cut = amp
+    return cut
+
+
+class PageScan:
+    """
+    תוצאת הסינון המוקדם של דף אחד
+    terms - מילות החיפוש שמופיעות בטקסט הדף; hits - (מיקום בטקסט, מילה) לכל התאמה.
+    """
+
+    def __init__(self, text: str, hits: List[Tuple[int, str]]):
+        self.text = text
+        self.hits = hits
+        self.terms: FrozenSet[str] = frozenset(term for _, term in hits)
+
+    def __bool__(self) -> bool:
+        return bool(self.hits)
+
+    def snippet(self, radius: int = SNIPPET_RADIUS) -> str:
+        """קטע הטקסט סביב ההתאמה הראשונה - לתיאור כשאין כרטיס מתאים"""
+        if not self.hits:
+            return ""
+        offset = self.hits[0][0]
+        return " ".join(self.text[max(offset - radius, 0):offset + radius].split())
+
+
+class Prefilter:
+    """
+    בודק את הטקסט הגולמי של הדף מול מילות החיפוש לפני שבונים DOM
+    הנרמול זהה ל-TermMatcher (אותיות קטנות, בלי ניקוד ופיסוק, התאמה על גבולות מילים), כך שדף שלא עובר כאן
+    לא היה מחזיר אף כרטיס מתאים ולא "התאמה בדף". מתאמים מצומצמים למילים שנמצאו נשמרים לשימוש חוזר.
+    """
+
+    def __init__(self, matcher: TermMatcher):
+        self.matcher = matcher
+        self._narrowed: Dict[FrozenSet[str], TermMatcher] = {}
+        # לכל מילה מנורמלת: ביטוי שמוצא אותה בטקסט המקורי, עם רווחים, פיסוק וניקוד בין האותיות
+        self._locators: Dict[str, Pattern] = {
+            key: re.compile(r"[\W_]*".join(re.escape(char) for char in key), re.I) for key in matcher.terms
+        }
+
+    def scan(self, markup: str) -> PageScan:
+        """מחזיר את ההתאמות בטקסט הדף (ריק אם אין אף התאמה)"""
+        return self.scan_text(visible_text(markup))
+
+    def scan_text(self, text: str) -> PageScan:
+        """כמו scan, לטקסט שכבר נוקה מתגיות"""
+        # מעבר זול קודם: רוב הדפים לא מכילים אף מילה
+        if not self.matcher.search(text):
+            return PageScan(text, [])
+
+        found = self.matcher.find_all(text)
+        hits = [
+            (match.start(), term)
+            for key, term in self.matcher.terms.items() if term in found
+            for match in self._locators[key].finditer(text)
+        ]
+        if not hits:
+            # המילה נמצאה אחרי נרמול אבל לא אותרה בטקסט (מקרה קצה של אותיות גדולות/קטנות) - בלי מיקום
+            hits = [(0, term) for term in found]
+        hits.sort()
+        return PageScan(text, hits)
+
+    def narrowed(self, scan: PageScan) -> TermMatcher:
+        """מתאם רק למילים שנמצאו בדף - בודק כל כרטיס מול פחות חלופות"""
+        if scan.terms == frozenset(self.matcher.terms.values()):
+            return self.matcher
+        if scan.terms not in self._narrowed:
+            self._narrowed[scan.terms] = TermMatcher(scan.terms)
+        return self._narrowed[scan.terms]
+
+
+class StreamScan:
+    """
+    סינון מוקדם לדף שמגיע בחלקים - מוצא את ההתאמה הראשונה בלי להחזיק את כל הדף
+    סוף הטקסט של כל חלק נשמר, כך שגם מילה שנחתכה בין שני חלקים נמצאת.
+    """
+
+    def __init__(self, prefilter: Prefilter, overlap: int = SNIPPET_RADIUS * 2):
+        self.prefilter = prefilter
+        self.overlap = overlap
+        self.snippet = ""
+        self._pending = ""
+        self._tail = ""
+
+    def _scan(self, markup: str) -> None:
+        text = self._tail + visible_text(markup)
+        scan = self.prefilter.scan_text(text)
+        if scan:
+            self.snippet = scan.snippet()
+        self._tail = text[-self.overlap:]
+
+    def feed(self, data: str) -> None:
+        """מוסיף חלק מהדף (אחרי ההתאמה הראשונה כבר לא סורקים)"""
+        if self.snippet:
+            return
+        markup = self._pending + data
+        cut = _complete_prefix(markup)
+        self._pending = markup[cut:]
+        self._scan(markup[:cut])
+
+    def close(self) -> None:
+        """סורק את מה שנשאר בסוף הדף"""
+        if not self.snippet and self._pending:
+            self._scan(self._pending)
+        self._pending = ""
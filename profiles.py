@@ -0,0 +1,193 @@
+# profiles.py - פרופילי מעקב: כמה מנויים, כל אחד עם ערוצים, מילות חיפוש וסינון משלו, בסריקה אחת
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Union
+from config import SEARCH_TERMS, PROFILES_FILE
+from filters import FilterSyntaxError, parse_query, query_from_filters
+from matcher import normalize_text, term_key
+from notifier import Notifier
+
+# שם פרופיל ברירת המחדל - ההגדרות מ-status.json ו-SEARCH_TERMS, והמזהים שלו זהים לאלה שלפני הפרופילים
+DEFAULT_PROFILE = "default"
+
+
+class WatchProfile:
+    """
+    פרופיל מעקב של מנוי אחד
+    filters - שאילתה (filters.py, למשל "price between 2000 and 6000 and site in Gun2") או מילון
+    (min_price / max_price / sites / locations / exclude). מילות חיפוש בשאילתה מצטרפות ל-terms.
+    """
+
+    def __init__(self, name: str, terms: Iterable[str], telegram_chat_id: Optional[str] = None,
+                 notify_email: Optional[str] = None, filters: Union[str, Dict, None] = None):
+        self.name = name
+        if isinstance(filters, str):
+            self.query = parse_query(filters)
+        else:
+            self.query = query_from_filters(filters or {})
+        self.terms = [term for term in [*terms, *self.query.terms] if normalize_text(term)]
+        self.telegram_chat_id = telegram_chat_id
+        self.notify_email = notify_email
+
+    def seen_key(self, item_id: str) -> str:
+        """המזהה של פריט במאגר הפריטים שנראו - נפרד לכל פרופיל"""
+        if self.name == DEFAULT_PROFILE:
+            return item_id
+        return hashlib.md5(f"{self.name}:{item_id}".encode()).hexdigest()
+
+    def accepts(self, item: Dict) -> bool:
+        """בודק אם המודעה עוברת את הסינון של הפרופיל (שדה שעוד לא ידוע לא פוסל)"""
+        return self.query(item)
+
+
+def load_profiles(settings: Dict, path: str = PROFILES_FILE) -> List[WatchProfile]:
+    """
+    טוען את פרופילי המעקב
+    פרופיל ברירת המחדל נבנה מהגדרות ההתראות (status.json / environment) ומ-SEARCH_TERMS,
+    אלא אם קובץ הפרופילים מגדיר פרופיל בשם "default". פרופילים עם "enabled": false מדולגים.
+    "query" הוא שם נוסף ל-"filters"; פרופיל עם שאילתה לא תקינה מדולג עם הודעה.
+    """
+    profiles: Dict[str, WatchProfile] = {
+        DEFAULT_PROFILE: WatchProfile(
+            DEFAULT_PROFILE,
+            SEARCH_TERMS,
+            telegram_chat_id=settings.get("telegram_chat_id"),
+            notify_email=settings.get("notify_email"),
+        )
+    }
+    specs = []
+    try:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                specs = json.load(f).get("profiles", [])
+    except Exception as e:
+        print(f"Error loading profiles: {e}")
+    for spec in specs:
+        if not spec.get("enabled", True):
+            continue
+        name = spec["name"]
+        # פרופיל ברירת המחדל שמוגדר בקובץ יורש את הערוצים ואת מילות החיפוש הכלליות
+        inherited = settings if name == DEFAULT_PROFILE else {}
+        try:
+            profiles[name] = WatchProfile(
+                name,
+                spec.get("terms") or (SEARCH_TERMS if name == DEFAULT_PROFILE and not spec.get("query") else []),
+                telegram_chat_id=spec.get("telegram_chat_id") or inherited.get("telegram_chat_id"),
+                notify_email=spec.get("notify_email") or inherited.get("notify_email"),
+                filters=spec.get("query", spec.get("filters")),
+            )
+        except FilterSyntaxError as e:
+            print(f"⚠️ פרופיל {name}: שאילתה לא תקינה - {e}")
+    return [profile for profile in profiles.values() if profile.terms]
+
+
+class ProfileIndex:
+    """
+    אינדקס הפוך ממילת חיפוש (מנורמלת) לפרופילים שמחפשים אותה
+    הסורק מתאים כל כרטיס פעם אחת מול איחוד המילים של כל הפרופילים, והמודעה מנותבת
+    לפרופילים לפי המילים שנמצאו בה - כך העלות תלויה במספר האתרים ולא במספר המנויים.
+    """
+
+    def __init__(self, profiles: List[WatchProfile]):
+        self.profiles = profiles
+        self._by_term: Dict[str, List[WatchProfile]] = {}
+        for profile in profiles:
+            for term in profile.terms:
+                listeners = self._by_term.setdefault(term_key(term), [])
+                if profile not in listeners:
+                    listeners.append(profile)
+
+    @property
+    def terms(self) -> List[str]:
+        """כל מילות החיפוש של כל הפרופילים - למתאם של הסורק"""
+        return [term for profile in self.profiles for term in profile.terms]
+
+    def fingerprint(self) -> str:
+        """
+        טביעה של הגדרות ההתאמה של כל הפרופילים (שם, מילים ושאילתה)
+        נשמרת במטמון הבקשות - דף שלא השתנה נסרק שוב אם ההגדרות השתנו מאז הסריקה הקודמת שלו
+        """
+        spec = [
+            [profile.name, sorted({term_key(term) for term in profile.terms}), profile.query.signature()]
+            for profile in sorted(self.profiles, key=lambda profile: profile.name)
+        ]
+        return hashlib.sha1(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+    def accepts(self, item: Dict) -> bool:
+        """האם יש פרופיל אחד לפחות שהמודעה מתאימה לו - לסינון לפני ההעשרה"""
+        return bool(self.route(item))
+
+    def route(self, item: Dict) -> List[WatchProfile]:
+        """הפרופילים שהמודעה מתאימה להם - לפי המילים שנמצאו בה ולפי הסינון של כל פרופיל"""
+        terms = item.get("matched_terms") or [item.get("matched_term")]
+        routed: List[WatchProfile] = []
+        for term in terms:
+            for profile in self._by_term.get(term_key(term or ""), []):
+                if profile not in routed and profile.accepts(item):
+                    routed.append(profile)
+        if not routed and not item.get("matched_terms") and not item.get("matched_term"):
+            # פריט בלי מילה מזוהה (למשל "התאמה בדף" ישנה) - לכל הפרופילים
+            routed = [profile for profile in self.profiles if profile.accepts(item)]
+        return routed
+
+
+class ProfileNotifier:
+    """
+    Notifier לכל פרופיל מאחורי אותו ממשק של Notifier אחד
+    הערוצים של פרופיל שאינו ברירת המחדל נקראים "<ערוץ>:<פרופיל>" (למשל telegram:alice),
+    כך שתיבת היוצאים שומרת מצב נפרד לכל מנוי בלי שינוי, ורשומות קיימות ממשיכות לפרופיל ברירת המחדל.
+    """
+
+    def __init__(self, profiles: List[WatchProfile]):
+        self.notifiers: Dict[str, Notifier] = {}
+        for profile in profiles:
+            # רק פרופיל ברירת המחדל משתמש בערוצים מ-config כשלא הוגדרו לו ערוצים
+            self.notifiers[profile.name] = Notifier(
+                telegram_chat_id=profile.telegram_chat_id,
+                notify_email=profile.notify_email,
+                use_config=profile.name == DEFAULT_PROFILE,
+            )
+
+    def _split(self, channel: str):
+        """(Notifier, הערוץ שלו) לפי שם ערוץ"""
+        base, _, name = channel.partition(":")
+        return self.notifiers[name or DEFAULT_PROFILE], base
+
+    def channels_for(self, profile: WatchProfile) -> List[str]:
+        """הערוצים של פרופיל אחד"""
+        notifier = self.notifiers.get(profile.name)
+        if notifier is None:
+            return []
+        suffix = "" if profile.name == DEFAULT_PROFILE else f":{profile.name}"
+        return [f"{channel}{suffix}" for channel in notifier.channels()]
+
+    def channels(self) -> List[str]:
+        """כל הערוצים של כל הפרופילים"""
+        channels = []
+        for name, notifier in self.notifiers.items():
+            suffix = "" if name == DEFAULT_PROFILE else f":{name}"
+            channels.extend(f"{channel}{suffix}" for channel in notifier.channels())
+        return channels
+
+    def channel_parts(self, channel: str, results: List[Dict]):
+        notifier, base = self._split(channel)
+        return notifier.channel_parts(base, results)
+
+    def send_part(self, channel: str, payload) -> None:
+        notifier, base = self._split(channel)
+        notifier.send_part(base, payload)
+
+    def notify_stream(self, items, **kwargs):
+        """מנות זורמות - הניתוב לפרופילים נעשה בפונקציית השליחה"""
+        return next(iter(self.notifiers.values())).notify_stream(items, **kwargs)
+
+    def send_daily_status(self, ui_url: str) -> bool:
+        """הודעת הסטטוס היומית לכל מנוי"""
+        results = [notifier.send_daily_status(ui_url) for notifier in self.notifiers.values() if notifier.channels()]
+        return any(results)
+
+    def close(self) -> None:
+        for notifier in self.notifiers.values():
+            notifier.close()
@@ -1,74 +1,136 @@
 # scraper.py - מודול סריקת האתרים
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 import re
+import codecs
 import json
-from typing import List, Dict, Optional
-from config import SEARCH_TERMS, USER_AGENT, REQUEST_TIMEOUT
-from sites import get_enabled_sites
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import hashlib
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Set, Tuple
+from config import (
+    SEARCH_TERMS,
+    USER_AGENT,
+    REQUEST_TIMEOUT,
+    SCRAPE_WORKERS,
+    HTML_PARSER,
+    ENRICH_WORKERS,
+    ENRICH_DEADLINE,
+    MAX_PAGES,
+    STREAM_PARSE,
+    STREAM_MAX_BYTES,
+    STREAM_CHUNK_SIZE,
+)
+from sites import get_enabled_sites, get_adapter_name
+from adapters import SiteAdapter, compile_adapters
+from matcher import TermMatcher
+from prefilter import Prefilter, StreamScan, link_hrefs
+from streaming import CardStream, first_href, to_html
+from cards import extract_cards
+from structured import decode_next_data_listings, decode_listings
+from fields import FieldExtractor, NO_PRICE, price_from_value
+from parsers import parse_html
+from cache import ResponseCache, InnerPageCache
+from metrics import RunMetrics
+from politeness import PoliteAdapter
+
+# חילוץ שדות מדפים פנימיים - כל הדף הוא כרטיס אחד
+INNER_FIELDS = FieldExtractor(
+    re.compile(r"(price|cost|מחיר)", re.I),
+    re.compile(r"(location|city|area|address|עיר|מיקום)", re.I),
+)
+
+
+def listing_key(url: str) -> str:
+    """מפתח של מודעה לצורך עימוד - לפי ה-URL בלבד, בנפרד ממזהי ההתראות"""
+    return hashlib.md5(f"listing:{url}".encode()).hexdigest()
 
 
 class GunScraper:
     """סורק אתרי יד שניה - מחלץ פרטי מודעה מלאים"""
 
-    def __init__(self):
+    def __init__(self, known_listings: Optional[Set[str]] = None, metrics: Optional[RunMetrics] = None,
+                 terms: Optional[List[str]] = None):
+        """
+        known_listings: מפתחות מודעות שכבר נסרקו בריצות קודמות (לעצירת העימוד)
+        metrics: מדדי הריצה (אם לא ניתן, נוצר חדש)
+        terms: מילות החיפוש (ברירת מחדל SEARCH_TERMS) - למשל האיחוד של כל פרופילי המעקב
+        """
         self.session = requests.Session()
         self.session.headers.update({
             "User-Agent": USER_AGENT,
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
             "Accept-Language": "he-IL,he;q=0.9,en-US;q=0.8,en;q=0.7",
         })
+        # מתזמן לכל שרת (קצב, פרץ, מקביליות ו-Retry-After לפי HOST_LIMITS), עם מאגר חיבורים לכל ה-workers
+        self.scheduler = PoliteAdapter(pool_connections=16, pool_maxsize=max(SCRAPE_WORKERS, 10))
+        self.session.mount("http://", self.scheduler)
+        self.session.mount("https://", self.scheduler)
+        # מתאם מילות החיפוש נבנה פעם אחת לכל ריצה
+        self.matcher = TermMatcher(terms if terms is not None else SEARCH_TERMS)
+        # סינון מוקדם של דפים לפי הטקסט הגולמי - דף בלי אף התאמה לא מפוענח ל-DOM
+        self.prefilter = Prefilter(self.matcher)
+        # מדדים לכל אתר: זמני רשת ופענוח, גדלים, כרטיסים, התאמות והעשרה
+        self.metrics = metrics or RunMetrics()
+        self._stats_lock = threading.Lock()
+        # שורות הפלט של אתרים שנסרקים במקביל - מודפסות מה-thread הראשי, כל אתר כבלוק אחד
+        self._site_output: Dict[str, List[str]] = {}
+        self._output_lock = threading.Lock()
+        # מטמון בקשות מותנות - דפים שלא השתנו (עם אותן מילים) לא מפוענחים שוב
+        self.response_cache = ResponseCache(fingerprint=self.matcher.fingerprint())
+        # מטמון שדות מדפים פנימיים - מודעות מוכרות לא נטענות שוב
+        self.inner_cache = InnerPageCache()
+        # מתאמי האתרים מהודרים פעם אחת; האתרים הפעילים לפי שם
+        self.adapters = compile_adapters()
+        self.sites: Dict[str, Dict] = {site["name"]: site for site in get_enabled_sites()}
+        # מודעות מוכרות מריצות קודמות, ומודעות שנסרקו בריצה הנוכחית
+        self.known_listings: Set[str] = known_listings if known_listings is not None else set()
+        self.crawled_listings: Set[str] = set()
+        # סינון מודעות לפי השדות שכבר חולצו מהכרטיס - לפני ההעשרה (למשל ProfileIndex.accepts)
+        self.listing_filter: Optional[Callable[[Dict], bool]] = None
+        # מזהי המודעה במאגר הפריטים שנראו (לכל פרופיל) - נשמרים לכל דף במטמון הבקשות
+        self.item_keys: Optional[Callable[[Dict], Iterable[str]]] = None
+        # מזהי פריטים מדפים שלא השתנו - "נראה לאחרונה" שלהם מתעדכן בלי לסרוק את הדף
+        self.unchanged_items: Set[str] = set()
+
+    def _get(self, url: str, headers: Optional[Dict] = None, site: Optional[Dict] = None) -> requests.Response:
+        """בקשת GET דרך המתזמן של השרת - נמדדת במדדי האתר אם ניתן"""
+        started = time.perf_counter()
+        response = self.session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        waited = self.scheduler.take_wait()
+        if site:
+            self.metrics.record_response(site["name"], response, waited, time.perf_counter() - started)
+        return response
+
+    def _fetch_page(self, url: str, site: Dict) -> Optional[requests.Response]:
+        """מוריד דף רשימה בבקשה מותנית - מחזיר None אם הדף לא השתנה מהריצה הקודמת"""
+        response = self._get(url, self.response_cache.conditional_headers(url), site)
+        if response.status_code != 304:
+            response.raise_for_status()
+        if self.response_cache.is_unchanged(url, response):
+            self.metrics.add(site["name"], unchanged=1)
+            return None
+        return response
+
+    def _parse(self, markup: str, site: Optional[Dict] = None) -> BeautifulSoup:
+        """מפענח HTML עם המנוע שהוגדר לאתר ומודד את זמן הפענוח"""
+        started = time.perf_counter()
+        soup = parse_html(markup, (site or {}).get("parser", HTML_PARSER))
+        elapsed = time.perf_counter() - started
+        if site:
+            self.metrics.add(site["name"], parse_s=elapsed)
+        return soup
 
     def search_in_text(self, text: str) -> bool:
         """בודק אם הטקסט מכיל אחת ממילות החיפוש"""
-        if not text:
-            return False
-        text_lower = text.lower()
-        for term in SEARCH_TERMS:
-            if term.lower() in text_lower:
-                return True
-        return False
-
-    def _extract_price(self, text: str) -> str:
-        """מנסה לחלץ מחיר מטקסט"""
-        if not text:
-            return "לא צוין"
-        patterns = [
-            r"(\d{1,3}(?:,\d{3})*)\s*₪",
-            r"₪\s*(\d{1,3}(?:,\d{3})*)",
-            r"(\d{1,3}(?:,\d{3})*)\s*ש[״\']?ח",
-            r"(\d{4,5})\s*(?:שקל|שח)",
-            r"מחיר[:\s]*(\d{1,3}(?:,\d{3})*)",
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                return f"₪{match.group(1)}"
-        return "לא צוין"
-
-    def _extract_phone(self, text: str) -> str:
-        """מנסה לחלץ מספר טלפון מטקסט"""
-        if not text:
-            return ""
-        patterns = [
-            r"(0\d{1,2}[-\s]?\d{7})",
-            r"(05\d[-\s]?\d{7})",
-            r"(\d{3}[-\s]?\d{7})",
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                return match.group(1)
-        return ""
-
-    def _extract_location(self, text: str, soup: BeautifulSoup = None) -> str:
-        """מנסה לחלץ מיקום"""
-        if soup:
-            location_elem = soup.find(class_=re.compile(r"(location|city|area|address)", re.I))
-            if location_elem:
-                return location_elem.get_text().strip()[:50]
-        return ""
+        return self.matcher.search(text) is not None
+
+    def match_term(self, text: str) -> Optional[str]:
+        """מחזיר את מילת החיפוש שהתאימה לטקסט, או None"""
+        return self.matcher.search(text)
 
     def _clean_text(self, text: str, max_length: int = 200) -> str:
         """מנקה טקסט מתווים מיותרים"""
@@ -79,359 +141,478 @@ class GunScraper:
             text = text[:max_length] + "..."
         return text
 
-    def scrape_bluegun(self) -> List[Dict]:
-        """סורק את אתר BlueGun"""
-        results = []
-        sites = get_enabled_sites()
-        site = next((s for s in sites if s["name"] == "BlueGun"), None)
-        if not site:
-            return results
+    def _build_listing(self, adapter: SiteAdapter, site: Dict, card: Tag, card_text: str,
+                       matched_term: str, page_url: str, fields: Optional[Dict] = None) -> Dict:
+        """
+        בונה רשומת מודעה מכרטיס לפי הבוררים של המתאם
+        fields - מחיר, טלפון ומיקום שכבר חולצו (adapter.fields.extract_many); אם לא ניתנו, מחולצים כאן.
+        """
+        link = adapter.find_link(card)
+        title_elem = adapter.find_title(card)
+        desc_elem = adapter.find_description(card)
+        if fields is None:
+            fields = adapter.fields.extract(card_text, card)
         
-        try:
-            response = self.session.get(site["search_url"], timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # מחפש כרטיסי מודעות
-            cards = soup.find_all(["article", "div", "a"], class_=re.compile(r"(card|listing|item|product)", re.I))
-            
-            for card in cards:
-                card_text = card.get_text()
-                if self.search_in_text(card_text):
-                    link = card.find("a", href=True) if card.name != "a" else card
-                    title_elem = card.find(["h2", "h3", "h4", "span"], class_=re.compile(r"(title|name)", re.I))
-                    desc_elem = card.find(["p", "div"], class_=re.compile(r"(desc|content|text)", re.I))
-                    
-                    href = link.get("href", "") if link else ""
-                    full_url = href if href.startswith("http") else site["base_url"] + href
-                    
-                    results.append({
-                        "site": "BlueGun",
-                        "title": self._clean_text(title_elem.get_text() if title_elem else card_text[:80]),
-                        "url": full_url or site["url"],
-                        "price": self._extract_price(card_text),
-                        "description": self._clean_text(desc_elem.get_text() if desc_elem else "", 300),
-                        "phone": self._extract_phone(card_text),
-                        "location": self._extract_location(card_text, card),
-                    })
-            
-            # בדיקה כללית של הדף
-            if not results and self.search_in_text(soup.get_text()):
-                results.append({
-                    "site": "BlueGun",
-                    "title": "נמצאה התאמה באתר - בדוק ידנית",
-                    "url": site["url"],
-                    "price": "לא צוין",
-                    "description": "נמצאה התאמה למילות החיפוש בדף. מומלץ לבדוק את האתר.",
-                    "phone": "",
-                    "location": "",
-                })
-                    
-        except Exception as e:
-            print(f"❌ Error scraping BlueGun: {e}")
+        href = link.get("href", "") if link else ""
+        full_url = href if href.startswith("http") else site["base_url"] + href
         
-        return results
-
-    def scrape_gun2(self) -> List[Dict]:
-        """סורק את אתר Gun2 - מחלץ פרטים מלאים"""
-        results = []
-        sites = get_enabled_sites()
-        site = next((s for s in sites if s["name"] == "Gun2"), None)
-        if not site:
-            return results
+        if title_elem:
+            title = title_elem.get_text()
+        else:
+            title = adapter.title_fallback or card_text[:80]
         
-        try:
-            urls_to_check = [site["url"], site.get("glock_page", "")]
-            
-            for url in urls_to_check:
-                if not url:
-                    continue
-                    
-                response = self.session.get(url, timeout=REQUEST_TIMEOUT)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, "html.parser")
-                
-                # Gun2 משתמש במבנה ספציפי לכרטיסים
-                cards = soup.find_all(["article", "div"], class_=re.compile(r"(card|listing|product|weapon|jet-listing)", re.I))
-                
-                for card in cards:
-                    card_text = card.get_text()
-                    if self.search_in_text(card_text):
-                        link = card.find("a", href=True)
-                        title_elem = card.find(["h2", "h3", "h4", "a"])
-                        
-                        # חילוץ פרטים ספציפיים מ-Gun2
-                        price_elem = card.find(string=re.compile(r"מחיר"))
-                        phone_elem = card.find(string=re.compile(r"טלפון|נייד"))
-                        city_elem = card.find(string=re.compile(r"עיר"))
-                        
-                        href = link.get("href", "") if link else ""
-                        full_url = href if href.startswith("http") else site["base_url"] + href
-                        
-                        results.append({
-                            "site": "Gun2",
-                            "title": self._clean_text(title_elem.get_text() if title_elem else "Glock 45 MOS"),
-                            "url": full_url or url,
-                            "price": self._extract_price(card_text),
-                            "description": self._clean_text(card_text, 300),
-                            "phone": self._extract_phone(card_text),
-                            "location": self._extract_location(card_text, card),
-                        })
-                
-                if not results and self.search_in_text(soup.get_text()):
-                    results.append({
-                        "site": "Gun2",
-                        "title": "נמצאה התאמה באתר - בדוק ידנית",
-                        "url": url,
-                        "price": "לא צוין",
-                        "description": "נמצאה התאמה למילות החיפוש.",
-                        "phone": "",
-                        "location": "",
-                    })
-                    
-        except Exception as e:
-            print(f"❌ Error scraping Gun2: {e}")
+        if adapter.desc_tags:
+            description = self._clean_text(desc_elem.get_text() if desc_elem else "", 300)
+        else:
+            description = self._clean_text(card_text, 300)
         
+        return {
+            "site": adapter.site_label(site),
+            "title": self._clean_text(title),
+            "url": full_url or page_url,
+            "price": fields["price"],
+            "description": description,
+            "phone": fields["phone"],
+            "location": fields["location"],
+            "matched_term": matched_term,
+            "matched_terms": sorted(self.matcher.find_all(card_text)),
+            "site_name": site["name"],
+            "price_value": fields["price_value"],
+            "currency": fields["currency"],
+        }
+
+    def _structured_results(self, adapter: SiteAdapter, site: Dict, listings: List[Dict]) -> List[Dict]:
+        """בונה תוצאות ממודעות שפוענחו מ-JSON מוטמע"""
+        results = []
+        for listing in listings:
+            matched_term = self.match_term(listing["text"])
+            if not matched_term:
+                continue
+            price = price_from_value(listing["price"])
+            results.append({
+                "site": adapter.site_label(site),
+                "title": self._clean_text(listing["title"] or adapter.title_fallback or listing["text"][:80]),
+                "url": listing["url"],
+                "price": price["price"],
+                "description": self._clean_text(listing["description"], 300),
+                "phone": "",
+                "location": self._clean_text(listing["location"], 50),
+                "matched_term": matched_term,
+                "matched_terms": sorted(self.matcher.find_all(listing["text"])),
+                "site_name": site["name"],
+                "listing_id": listing["listing_id"],
+                "price_value": price["price_value"],
+                "currency": price["currency"],
+            })
         return results
 
-    def scrape_guntrade(self) -> List[Dict]:
-        """סורק את אתר GunTrade"""
+    def _page_url(self, url: str, page_param: Optional[str], page: int) -> str:
+        """כתובת של עמוד מסוים ברשימה - העמוד הראשון הוא הכתובת המקורית"""
+        if page == 1 or not page_param:
+            return url
+        parts = urlparse(url)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != page_param]
+        query.append((page_param, str(page)))
+        return urlunparse(parts._replace(query=urlencode(query)))
+
+    def _listing_keys(self, site: Dict, hrefs: Iterable[str]) -> Set[str]:
+        """מפתחות עימוד לקישורים (יחסיים או מלאים)"""
+        return {listing_key(href if href.startswith("http") else site["base_url"] + href) for href in hrefs}
+
+    def _scrape_page(self, adapter: SiteAdapter, site: Dict, url: str) -> Optional[Tuple[List[Dict], Set[str], str, bool]]:
+        """
+        סורק עמוד רשימה אחד
+        מחזיר (תוצאות, מפתחות כל המודעות בעמוד, קטע טקסט סביב התאמה בדף או "", האם התוצאות מה-DOM)
+        או None אם העמוד לא השתנה מהריצה הקודמת
+        """
+        self.metrics.add(site["name"], pages=1)
+        if site.get("stream_parse", STREAM_PARSE):
+            return self._stream_page(adapter, site, url)
+        response = self._fetch_page(url, site)
+        if response is None:
+            return None
+        
+        # מסלול מהיר: מודעות מתוך ה-JSON המוטמע, בלי לבנות DOM ובלי דפים פנימיים
+        if adapter.structured == "next_data":
+            listings = decode_next_data_listings(response.text, site["base_url"])
+            if listings is not None:
+                keys = {listing_key(listing["url"]) for listing in listings}
+                results = self._structured_results(adapter, site, listings)
+                self.metrics.add(site["name"], cards=len(listings), matches=len(results))
+                return results, keys, "", False
+        
+        # סינון מוקדם: אם אף מילה לא מופיעה בטקסט הדף, אין טעם לבנות DOM
+        markup = response.text
+        scan = self.prefilter.scan(markup)
+        if not scan:
+            self.metrics.add(site["name"], prefiltered=1)
+            # לעימוד מספיקים הקישורים בדף - נאספים מהטקסט הגולמי
+            keys = self._listing_keys(site, link_hrefs(markup)) if adapter.page_param else set()
+            return [], keys, "", True
+        
+        soup = self._parse(markup, site)
+        cards, _ = extract_cards(soup, adapter.container_tags, adapter.container_class)
+        # הכרטיסים נבדקים רק מול המילים שנמצאו בדף
+        matcher = self.prefilter.narrowed(scan)
+        
+        matched = []
+        keys = set()
+        for card, card_text in cards:
+            matched_term = matcher.search(card_text)
+            if matched_term:
+                matched.append((card, card_text, matched_term))
+            elif adapter.page_param:
+                link = adapter.find_link(card)
+                if link:
+                    keys |= self._listing_keys(site, [link.get("href", "")])
+        
+        # השדות של כל הכרטיסים המתאימים בדף מחולצים יחד
+        page_fields = adapter.fields.extract_many([(card, card_text) for card, card_text, _ in matched])
         results = []
-        sites = get_enabled_sites()
-        site = next((s for s in sites if s["name"] == "GunTrade"), None)
-        if not site:
-            return results
+        for (card, card_text, matched_term), fields in zip(matched, page_fields):
+            listing = self._build_listing(adapter, site, card, card_text, matched_term, url, fields)
+            keys.add(listing_key(listing["url"]))
+            results.append(listing)
+        
+        self.metrics.add(site["name"], cards=len(cards), matches=len(results))
+        return results, keys, scan.snippet(), True
+
+    def _card_tag(self, markup: str, tag: str, site: Dict) -> Tag:
+        """ממיר כרטיס lxml שהתאים (כ-HTML) ל-Tag של BeautifulSoup, כדי לבנות אותו עם בוררי המתאם"""
+        soup = parse_html(markup, site.get("parser", HTML_PARSER))
+        return soup.find(tag) or soup
+
+    def _stream_page(self, adapter: SiteAdapter, site: Dict, url: str) -> Optional[Tuple[List[Dict], Set[str], str, bool]]:
+        """
+        סורק עמוד רשימה בפענוח זורם - כמו _scrape_page, בלי להחזיק את הדף או את העץ בזיכרון
+        התגובה נקראת בחלקים ומוזנת למפענח של lxml; כל כרטיס נבדק ומשוחרר ברגע שהוא נסגר.
+        הקריאה נעצרת בתקרת הבתים של האתר ("max_bytes", ברירת מחדל STREAM_MAX_BYTES),
+        ב-end_marker של המתאם, או כשנמצא ה-JSON המוטמע של מתאם עם structured.
+        304 או ETag זהה עוצרים לפני קריאת הגוף. הגוף מגובב תוך כדי קריאה, ובזמן הקריאה
+        נשמרים רק הכרטיסים שהתאימו - המודעות נבנות מהם רק אחרי שהגיבוב הראה שהדף השתנה.
+        """
+        started = time.perf_counter()
+        response = self.session.get(url, headers=self.response_cache.conditional_headers(url),
+                                    timeout=REQUEST_TIMEOUT, stream=True)
+        waited = self.scheduler.take_wait()
+        matched: List[Tuple[str, str, str, str]] = []
+        keys: Set[str] = set()
+        listings = None
+        size = 0
+        parse_s = 0.0
+        
+        def on_card(card, card_text: str) -> None:
+            matched_term = self.match_term(card_text)
+            if matched_term:
+                matched.append((to_html(card), card.tag, card_text, matched_term))
+            elif adapter.page_param:
+                href = first_href(card, adapter.link_class)
+                if href:
+                    keys.update(self._listing_keys(site, [href]))
         
         try:
-            response = self.session.get(site["search_url"], timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
+            if response.status_code != 304:
+                response.raise_for_status()
+            if self.response_cache.same_version(url, response):
+                self.metrics.add(site["name"], unchanged=1)
+                return None
             
-            listings = soup.find_all(["article", "div", "li"], class_=re.compile(r"(post|listing|item|card|product)", re.I))
+            capture_id = "__NEXT_DATA__" if adapter.structured == "next_data" else None
+            cards = CardStream(adapter.container_tags, adapter.container_class, on_card, capture_id=capture_id)
+            scan = StreamScan(self.prefilter)
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+            digest = hashlib.sha1()
+            max_bytes = int(site.get("max_bytes", STREAM_MAX_BYTES))
+            previous = ""
             
-            for listing in listings:
-                listing_text = listing.get_text()
-                if self.search_in_text(listing_text):
-                    link = listing.find("a", href=True)
-                    title_elem = listing.find(["h2", "h3", "h4", "a"])
-                    
-                    href = link.get("href", "") if link else ""
-                    full_url = href if href.startswith("http") else site["base_url"] + href
-                    
-                    results.append({
-                        "site": "GunTrade",
-                        "title": self._clean_text(title_elem.get_text() if title_elem else "Glock 45 MOS"),
-                        "url": full_url or site["url"],
-                        "price": self._extract_price(listing_text),
-                        "description": self._clean_text(listing_text, 300),
-                        "phone": self._extract_phone(listing_text),
-                        "location": self._extract_location(listing_text, listing),
-                    })
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                size += len(chunk)
+                digest.update(chunk)
+                text = decoder.decode(chunk)
+                parse_started = time.perf_counter()
+                cards.feed(text)
+                scan.feed(text)
+                parse_s += time.perf_counter() - parse_started
+                
+                if cards.captured is not None:
+                    # ה-JSON המוטמע נמצא - אם יש בו מודעות אין צורך בשאר הדף
+                    try:
+                        listings = decode_listings(json.loads(cards.captured), site["base_url"])
+                    except ValueError:
+                        listings = None
+                    cards.capture_id, cards.captured = None, None
+                    if listings is not None:
+                        break
+                if adapter.end_marker and adapter.end_marker.search(previous + text):
+                    break
+                previous = text[-200:]
+                if size >= max_bytes:
+                    self._log(site["name"], f"  ✂️ {site['name']}: הדף נקטע אחרי {size / 1e6:.1f}MB")
+                    break
+            else:
+                text = decoder.decode(b"", final=True)
+                cards.feed(text)
+                scan.feed(text)
             
-            if not results and self.search_in_text(soup.get_text()):
-                results.append({
-                    "site": "GunTrade",
-                    "title": "נמצאה התאמה באתר - בדוק ידנית",
-                    "url": site["url"],
-                    "price": "לא צוין",
-                    "description": "נמצאה התאמה למילות החיפוש.",
-                    "phone": "",
-                    "location": "",
-                })
-                    
-        except Exception as e:
-            print(f"❌ Error scraping GunTrade: {e}")
+            parse_started = time.perf_counter()
+            cards.close()
+            scan.close()
+            parse_s += time.perf_counter() - parse_started
+            
+            if self.response_cache.is_unchanged(url, response, digest.hexdigest()):
+                self.metrics.add(site["name"], unchanged=1)
+                return None
+        finally:
+            response.close()
+            total_s = time.perf_counter() - started
+            self.metrics.add(site["name"], parse_s=parse_s)
+            self.metrics.record_response(site["name"], response, waited, total_s - parse_s, size=size)
         
-        return results
+        if listings is not None:
+            keys = {listing_key(listing["url"]) for listing in listings}
+            results = self._structured_results(adapter, site, listings)
+            self.metrics.add(site["name"], cards=len(listings), matches=len(results))
+            return results, keys, "", False
+        
+        results = []
+        for markup, tag, card_text, matched_term in matched:
+            listing = self._build_listing(adapter, site, self._card_tag(markup, tag, site), card_text, matched_term, url)
+            keys.add(listing_key(listing["url"]))
+            results.append(listing)
+        self.metrics.add(site["name"], cards=cards.cards, matches=len(results))
+        return results, keys, scan.snippet, True
 
-    def scrape_yad2(self) -> List[Dict]:
-        """סורק את אתר Yad2 - כולל כניסה לדפים פנימיים"""
+    def scrape_site(self, site: Dict) -> List[Dict]:
+        """
+        סורק אתר אחד לפי המתאם שלו - מנוע אחד לכל האתרים
+        באתרים עם עימוד עוברים על העמודים מהחדש לישן, ועוצרים בעמוד הראשון שכל המודעות בו כבר מוכרות
+        """
         results = []
-        sites = get_enabled_sites()
-        site = next((s for s in sites if s["name"] == "Yad2 נשק"), None)
-        if not site:
-            return results
+        dom_results = []
+        adapter = self.adapters[get_adapter_name(site)]
+        url = site.get("search_url") or site["url"]
+        max_pages = int(site.get("max_pages", MAX_PAGES)) if adapter.page_param else 1
+        site_keys: Set[str] = set()
+        unchanged_items: Set[str] = set()
+        # (כתובת העמוד, המודעות שנשארו בו, מפתחות כל המודעות בו) - לשמירה במטמון הבקשות
+        pages: List[Tuple[str, List[Dict], Set[str]]] = []
+        page_snippet = ""
+        filtered = 0
+        started = time.perf_counter()
         
         try:
-            response = self.session.get(site["url"], timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
+            for page in range(1, max(max_pages, 1) + 1):
+                page_url = self._page_url(url, adapter.page_param, page)
+                page_data = self._scrape_page(adapter, site, page_url)
+                if page_data is None:
+                    # העמוד לא השתנה - המודעות שהיו בו ובעמודים שאחריו עדיין באתר
+                    for later in range(page, max(max_pages, 1) + 1):
+                        items, listings = self.response_cache.page_keys(self._page_url(url, adapter.page_param, later))
+                        unchanged_items.update(items)
+                        site_keys.update(listings)
+                    break
+                page_results, keys, snippet, from_dom = page_data
+                if self.listing_filter:
+                    # מודעות שאף פרופיל לא ירצה לא נכנסות לדפים הפנימיים ולא להתראות
+                    kept = [listing for listing in page_results if self.listing_filter(listing)]
+                    filtered += len(page_results) - len(kept)
+                    page_results = kept
+                results.extend(page_results)
+                pages.append((page_url, page_results, keys))
+                if from_dom:
+                    dom_results.extend(page_results)
+                page_snippet = page_snippet or snippet
+                
+                # עוצרים כשאין בעמוד אף מודעה שלא ראינו (בריצות קודמות או בעמוד קודם)
+                fresh = {key for key in keys if key not in self.known_listings and key not in site_keys}
+                site_keys |= keys
+                if not fresh:
+                    break
             
-            # Yad2 יכול להיות דינמי, מחפשים כרטיסי מוצר
-            cards = soup.find_all(["div", "article"], class_=re.compile(r"(feed-item|product|card|item)", re.I))
+            # אם חסר מידע, נכנסים לדפים הפנימיים - כולם במקביל
+            if adapter.enrich:
+                self.enrich_listings(dom_results, site)
             
-            for card in cards:
-                card_text = card.get_text()
-                if self.search_in_text(card_text):
-                    link = card.find("a", href=True)
-                    title_elem = card.find(["h2", "h3", "span"], class_=re.compile(r"(title|name)", re.I))
-                    
-                    href = link.get("href", "") if link else ""
-                    full_url = href if href.startswith("http") else site["base_url"] + href
-                    
-                    # מנסה לחלץ מחיר וטלפון מהכרטיס
-                    price = self._extract_price(card_text)
-                    phone = self._extract_phone(card_text)
-                    location = self._extract_location(card_text, card)
-                    description = self._clean_text(card_text, 300)
-                    
-                    # אם חסר מידע, ננסה להיכנס לדף הפנימי
-                    if full_url and (price == "לא צוין" or not phone):
-                        try:
-                            inner_data = self._fetch_inner_page(full_url)
-                            if inner_data:
-                                if price == "לא צוין" and inner_data.get("price"):
-                                    price = inner_data["price"]
-                                if not phone and inner_data.get("phone"):
-                                    phone = inner_data["phone"]
-                                if not location and inner_data.get("location"):
-                                    location = inner_data["location"]
-                                if inner_data.get("description"):
-                                    description = inner_data["description"]
-                        except:
-                            pass
-                    
-                    results.append({
-                        "site": "Yad2",
-                        "title": self._clean_text(title_elem.get_text() if title_elem else "Glock 45 MOS"),
-                        "url": full_url or site["url"],
-                        "price": price,
-                        "description": description,
-                        "phone": phone,
-                        "location": location,
-                    })
+            # המזהים נשמרים אחרי ההעשרה - הניתוב לפרופילים תלוי גם בשדות מהדף הפנימי
+            for page_url, page_results, keys in pages:
+                items = [key for listing in page_results for key in self.item_keys(listing)] if self.item_keys else []
+                self.response_cache.remember(page_url, items, keys)
             
-            if not results and self.search_in_text(soup.get_text()):
+            # בדיקה כללית של הדף (רק אם אף כרטיס לא התאים - גם לא כרטיס שסונן)
+            if not results and not filtered and page_snippet:
                 results.append({
-                    "site": "Yad2",
+                    "site": adapter.site_label(site),
                     "title": "נמצאה התאמה באתר - בדוק ידנית",
-                    "url": site["url"],
-                    "price": "לא צוין",
-                    "description": "נמצאה התאמה למילות החיפוש.",
+                    "url": url,
+                    "price": NO_PRICE,
+                    "description": f"נמצאה התאמה למילות החיפוש בדף: \"{page_snippet}\". מומלץ לבדוק את האתר.",
                     "phone": "",
                     "location": "",
+                    "matched_terms": sorted(self.matcher.find_all(page_snippet)),
+                    "site_name": site["name"],
                 })
-                
+        
         except Exception as e:
-            print(f"❌ Error scraping Yad2: {e}")
+            self.metrics.add(site["name"], errors=1)
+            self._log(site["name"], f"❌ Error scraping {site['name']}: {e}")
         
+        self.metrics.add(site["name"], duration_s=time.perf_counter() - started, results=len(results), filtered=filtered)
+        with self._stats_lock:
+            self.crawled_listings |= site_keys
+            self.unchanged_items |= unchanged_items
         return results
 
-    def _fetch_inner_page(self, url: str) -> Optional[Dict]:
+    def _needs_enrichment(self, listing: Dict) -> bool:
+        """בודק אם חסרים למודעה מחיר או טלפון"""
+        return bool(listing.get("url")) and (listing.get("price") == NO_PRICE or not listing.get("phone"))
+
+    def _merge_inner_data(self, listing: Dict, inner_data: Dict) -> None:
+        """ממזג שדות מהדף הפנימי לתוך רשומת המודעה"""
+        if listing.get("price") == NO_PRICE and inner_data.get("price"):
+            listing["price"] = inner_data["price"]
+            listing["price_value"] = inner_data.get("price_value")
+            listing["currency"] = inner_data.get("currency")
+        if not listing.get("phone") and inner_data.get("phone"):
+            listing["phone"] = inner_data["phone"]
+        if not listing.get("location") and inner_data.get("location"):
+            listing["location"] = inner_data["location"]
+        if inner_data.get("description"):
+            listing["description"] = inner_data["description"]
+
+    def enrich_listings(self, listings: List[Dict], site: Dict) -> None:
+        """
+        שלב העשרה: משלים שדות חסרים מהדפים הפנימיים של המודעות
+        כל הדפים נטענים במקביל (עד ENRICH_WORKERS), וכל השלב מוגבל ל-ENRICH_DEADLINE שניות.
+        מודעות שלא הספיקו נשארות עם השדות שחולצו מהכרטיס.
+        """
+        pending = [listing for listing in listings if self._needs_enrichment(listing)]
+        if not pending:
+            return
+        
+        pool = ThreadPoolExecutor(max_workers=max(ENRICH_WORKERS, 1))
+        futures = {pool.submit(self._fetch_inner_page, listing["url"], site): listing for listing in pending}
+        done, not_done = wait(futures, timeout=ENRICH_DEADLINE)
+        pool.shutdown(wait=False, cancel_futures=True)
+        
+        for future in done:
+            try:
+                inner_data = future.result()
+            except Exception:
+                continue
+            if inner_data:
+                self._merge_inner_data(futures[future], inner_data)
+        
+        if not_done:
+            self._log(site["name"], f"⏱️ {site['name']}: {len(not_done)} דפים פנימיים לא הושלמו תוך {ENRICH_DEADLINE} שניות")
+
+    def _fetch_inner_page(self, url: str, site: Optional[Dict] = None) -> Optional[Dict]:
         """נכנס לדף פנימי של מודעה ומחלץ פרטים נוספים"""
+        site_name = site["name"] if site else None
+        cached = self.inner_cache.get(url)
+        if cached is not None:
+            if site_name:
+                self.metrics.add(site_name, enrich_cached=1)
+            return cached
+        
+        if site_name:
+            self.metrics.add(site_name, enrich_calls=1)
         try:
-            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+            response = self._get(url, site=site)
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            page_text = soup.get_text()
+            soup = self._parse(response.text, site)
             
-            result = {}
-            
-            # חילוץ מחיר
-            price_elem = soup.find(class_=re.compile(r"(price|cost|מחיר)", re.I))
-            if price_elem:
-                result["price"] = self._extract_price(price_elem.get_text())
-            else:
-                result["price"] = self._extract_price(page_text)
-            
-            # חילוץ טלפון - מחפש בכל הדף
-            result["phone"] = self._extract_phone(page_text)
-            
-            # חילוץ מיקום
-            location_elem = soup.find(class_=re.compile(r"(location|city|area|address|עיר|מיקום)", re.I))
-            if location_elem:
-                result["location"] = self._clean_text(location_elem.get_text(), 50)
+            # מחיר, טלפון ומיקום במעבר אחד - הטלפון נחפש בכל הדף
+            fields = INNER_FIELDS.extract(soup.get_text(), soup)
+            result = {
+                "price": fields["price"],
+                "price_value": fields["price_value"],
+                "currency": fields["currency"],
+                "phone": fields["phone"],
+            }
+            if fields["location"]:
+                result["location"] = self._clean_text(fields["location"], 50)
             
             # חילוץ תיאור מפורט
             desc_elem = soup.find(class_=re.compile(r"(description|content|details|תיאור|פרטים)", re.I))
             if desc_elem:
                 result["description"] = self._clean_text(desc_elem.get_text(), 500)
             
+            self.inner_cache.put(url, result)
             return result
             
         except Exception as e:
-            print(f"⚠️ Could not fetch inner page {url}: {e}")
+            if site_name:
+                self.metrics.add(site_name, errors=1)
+            self._log(site_name, f"⚠️ Could not fetch inner page {url}: {e}")
             return None
 
-    def scrape_yad2_market(self) -> List[Dict]:
-        """סורק את אתר Yad2 Market"""
-        results = []
-        sites = get_enabled_sites()
-        site = next((s for s in sites if s["name"] == "Yad2 Market נשק"), None)
-        if not site:
-            return results
-        
+    def _run_scraper(self, site: Dict) -> List[Dict]:
+        """מריץ סריקה של אתר בודד ומדפיס סיכום"""
+        site_name = site["name"]
         try:
-            response = self.session.get(site["search_url"], timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            products = soup.find_all(["div", "article"], class_=re.compile(r"(product|item|card)", re.I))
-            
-            for product in products:
-                product_text = product.get_text()
-                if self.search_in_text(product_text):
-                    link = product.find("a", href=True)
-                    title_elem = product.find(["h2", "h3", "span"])
-                    
-                    href = link.get("href", "") if link else ""
-                    full_url = href if href.startswith("http") else site["base_url"] + href
-                    
-                    results.append({
-                        "site": "Yad2 Market",
-                        "title": self._clean_text(title_elem.get_text() if title_elem else "Glock 45 MOS"),
-                        "url": full_url or site["url"],
-                        "price": self._extract_price(product_text),
-                        "description": self._clean_text(product_text, 300),
-                        "phone": self._extract_phone(product_text),
-                        "location": self._extract_location(product_text, product),
-                    })
-            
-            if not results and self.search_in_text(soup.get_text()):
-                results.append({
-                    "site": "Yad2 Market",
-                    "title": "נמצאה התאמה באתר - בדוק ידנית",
-                    "url": site["url"],
-                    "price": "לא צוין",
-                    "description": "נמצאה התאמה למילות החיפוש.",
-                    "phone": "",
-                    "location": "",
-                })
-                    
+            results = self.scrape_site(site)
         except Exception as e:
-            print(f"❌ Error scraping Yad2 Market: {e}")
-        
+            self._log(site_name, f"  ❌ {site_name}: שגיאה: {e}")
+            return []
+        parse_time = f" (פענוח {self.metrics.get(site_name, 'parse_s'):.2f}s)"
+        unchanged = self.metrics.get(site_name, "unchanged")
+        if unchanged:
+            parse_time += f" ⏸️ {unchanged} דפים ללא שינוי"
+        prefiltered = self.metrics.get(site_name, "prefiltered")
+        if prefiltered:
+            parse_time += f" ⏩ {prefiltered} דפים ללא התאמה דולגו"
+        filtered = self.metrics.get(site_name, "filtered")
+        if filtered:
+            parse_time += f" 🚫 {filtered} מודעות סוננו"
+        if results:
+            self._log(site_name, f"  ✅ {site_name}: נמצאו {len(results)} תוצאות{parse_time}")
+        else:
+            self._log(site_name, f"  ⚪ {site_name}: לא נמצאו תוצאות{parse_time}")
         return results
 
+    def _log(self, site_name: Optional[str], message: str) -> None:
+        """מדפיס שורת פלט של אתר - או שומר אותה, אם האתר נסרק כרגע במקביל לאתרים אחרים"""
+        with self._output_lock:
+            lines = self._site_output.get(site_name)
+            if lines is None:
+                print(message)
+            else:
+                lines.append(message)
+
+    def _run_quietly(self, site: Dict) -> Tuple[List[Dict], List[str]]:
+        """מריץ סריקה של אתר ב-worker ומחזיר (תוצאות, שורות הפלט שלו) - ההדפסה נשארת ל-thread הראשי"""
+        with self._output_lock:
+            self._site_output[site["name"]] = []
+        try:
+            results = self._run_scraper(site)
+        finally:
+            with self._output_lock:
+                lines = self._site_output.pop(site["name"])
+        return results, lines
+
     def scrape_all(self) -> List[Dict]:
         """סורק את כל האתרים הפעילים ומחזיר תוצאות"""
         all_results = []
-        enabled_sites = get_enabled_sites()
+        enabled_sites = list(self.sites.values())
         
         print(f"📡 סורק {len(enabled_sites)} אתרים...")
         
-        # מפה בין שמות אתרים לפונקציות סריקה
-        scraper_map = {
-            "BlueGun": self.scrape_bluegun,
-            "Gun2": self.scrape_gun2,
-            "GunTrade": self.scrape_guntrade,
-            "Yad2 נשק": self.scrape_yad2,
-            "Yad2 Market נשק": self.scrape_yad2_market,
-        }
+        if SCRAPE_WORKERS <= 1:
+            # מצב סדרתי
+            site_results = [self._run_scraper(site) for site in enabled_sites]
+        else:
+            # מצב מקבילי - התוצאות והפלט נאספים לפי סדר האתרים (גם כדי לשמור על סמנטיקת הכפילויות)
+            with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as pool:
+                futures = [pool.submit(self._run_quietly, site) for site in enabled_sites]
+                site_results = []
+                for future in futures:
+                    results, lines = future.result()
+                    for line in lines:
+                        print(line)
+                    site_results.append(results)
         
-        for site in enabled_sites:
-            site_name = site["name"]
-            if site_name in scraper_map:
-                print(f"  🔍 סורק {site_name}...")
-                try:
-                    results = scraper_map[site_name]()
-                    all_results.extend(results)
-                    if results:
-                        print(f"     ✅ נמצאו {len(results)} תוצאות")
-                    else:
-                        print(f"     ⚪ לא נמצאו תוצאות")
-                except Exception as e:
-                    print(f"     ❌ שגיאה: {e}")
+        for results in site_results:
+            all_results.extend(results)
         
         # מסיר כפילויות לפי URL
         seen_urls = set()
@@ -443,6 +624,32 @@ class GunScraper:
         
         return unique_results
 
+    def iter_results(self, heartbeat: Optional[float] = None) -> Iterator[Optional[Dict]]:
+        """
+        מצב זורם: מחזיר את התוצאות של כל אתר ברגע שהוא מסתיים, בלי לחכות לאתר האיטי ביותר
+        כפילויות לפי URL מוסרות בדרך. אם heartbeat מוגדר, מוחזר None כל heartbeat שניות
+        שבהן אף אתר לא הסתיים - כדי ששלבים בהמשך יוכלו לפעול לפי זמן.
+        """
+        enabled_sites = list(self.sites.values())
+        print(f"📡 סורק {len(enabled_sites)} אתרים (מצב זורם)...")
+        
+        seen_urls = set()
+        with ThreadPoolExecutor(max_workers=max(SCRAPE_WORKERS, 1)) as pool:
+            pending = {pool.submit(self._run_quietly, site) for site in enabled_sites}
+            while pending:
+                done, pending = wait(pending, timeout=heartbeat, return_when=FIRST_COMPLETED)
+                if not done:
+                    yield None
+                    continue
+                for future in done:
+                    results, lines = future.result()
+                    for line in lines:
+                        print(line)
+                    for result in results:
+                        if result["url"] not in seen_urls:
+                            seen_urls.add(result["url"])
+                            yield result
+
 
 if __name__ == "__main__":
     scraper = GunScraper()
@@ -0,0 +1,157 @@
+# seen_store.py - מאגר פריטים שנראו על גבי SQLite (חיפוש באינדקס, הוספה בלי כתיבה מחדש, תפוגה)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional, Set, Tuple
+from config import SEEN_ITEMS_FILE, SEEN_DB_FILE, SEEN_EXPIRY_DAYS, SEEN_BLOOM_FILTER
+from fingerprints import FingerprintSet, fingerprint
+
+
+class SeenTable:
+    """
+    טבלת מזהים עם זמן ראשון/אחרון - תומכת ב-in, len והוספה
+    בדיקות שייכות נעשות מול אינדקס טביעות 64 ביט שנטען מקובץ דרך mmap,
+    ו-SQLite משמש רק לשמירה, לזמנים ולתפוגה.
+    """
+
+    def __init__(self, store: "SeenStore", name: str):
+        self.store = store
+        self.name = name
+        self.fp_path = f"{os.path.splitext(store.path)[0]}.{name}.fp"
+        self.index: Optional[FingerprintSet] = None
+        # האינדקס נבנה מחדש בטעינה (קובץ חסר, קטוע או לא מעודכן) - ייכתב בסגירה גם אם הטבלה לא השתנתה
+        self.rebuilt = False
+        # טביעות שנוספו בריצה הנוכחית (האינדקס נבנה מחדש רק בסגירה)
+        self.added: Set[int] = set()
+
+    def _stamp(self) -> Tuple[float, float]:
+        """חותמת מצב הטבלה - מספר שורות וזמן אחרון מקסימלי, לזיהוי אינדקס לא מעודכן"""
+        with self.store.lock:
+            count, last = self.store.conn.execute(
+                f"SELECT COUNT(*), COALESCE(MAX(last_seen), 0) FROM {self.name}"
+            ).fetchone()
+        return float(count), float(last)
+
+    def _build_index(self, stamp: Tuple[float, float]) -> FingerprintSet:
+        """בונה את אינדקס הטביעות מהטבלה"""
+        with self.store.lock:
+            rows = self.store.conn.execute(f"SELECT id FROM {self.name}").fetchall()
+        return FingerprintSet.from_keys((row[0] for row in rows), use_bloom=SEEN_BLOOM_FILTER, stamp=stamp)
+
+    def load_index(self) -> None:
+        """טוען את האינדקס מהקובץ, ובונה אותו מחדש אם הוא חסר או לא תואם לטבלה"""
+        stamp = self._stamp()
+        index = FingerprintSet.load(self.fp_path)
+        if index is None or tuple(index.stamp) != stamp:
+            if index is not None:
+                index.close()
+            index = self._build_index(stamp)
+            self.rebuilt = True
+        self.index = index
+
+    def save_index(self) -> None:
+        """כותב את האינדקס לקובץ אם הטבלה השתנתה מאז שנטען, או אם הקובץ לא היה תקין"""
+        stamp = self._stamp()
+        current = self.index is not None and tuple(self.index.stamp) == stamp
+        if current and not self.rebuilt and os.path.exists(self.fp_path):
+            return
+        if not current:
+            if self.index is not None:
+                self.index.close()
+            self.index = self._build_index(stamp)
+        self.index.save(self.fp_path)
+        self.rebuilt = False
+
+    def __contains__(self, key: str) -> bool:
+        fp = fingerprint(key)
+        return fp in self.added or fp in self.index
+
+    def __len__(self) -> int:
+        with self.store.lock:
+            return self.store.conn.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+
+    def add(self, keys: Iterable[str]) -> None:
+        """מוסיף מזהים חדשים ומעדכן את הזמן האחרון של קיימים"""
+        keys = list(keys)
+        self.added.update(fingerprint(key) for key in keys)
+        now = time.time()
+        with self.store.lock:
+            self.store.conn.executemany(
+                f"INSERT INTO {self.name} (id, first_seen, last_seen) VALUES (?, ?, ?) "
+                f"ON CONFLICT(id) DO UPDATE SET last_seen = excluded.last_seen",
+                ((key, now, now) for key in keys),
+            )
+            self.store.conn.commit()
+
+    def touch(self, keys: Iterable[str]) -> None:
+        """מעדכן את הזמן האחרון של מזהים קיימים בלבד (פריטים שעדיין מופיעים באתר)"""
+        now = time.time()
+        with self.store.lock:
+            self.store.conn.executemany(
+                f"UPDATE {self.name} SET last_seen = ? WHERE id = ?",
+                ((now, key) for key in keys),
+            )
+            self.store.conn.commit()
+
+
+class SeenStore:
+    """
+    מאגר הפריטים שנראו
+    items - מזהי מודעות שכבר נשלחה עליהן התראה
+    listings - מפתחות מודעות שנסרקו (לעצירת העימוד)
+    """
+
+    def __init__(self, path: str = SEEN_DB_FILE, expiry_days: float = SEEN_EXPIRY_DAYS):
+        self.path = path
+        self.expiry_days = expiry_days
+        self.lock = threading.Lock()
+        is_new = not os.path.exists(path)
+        # הסורק ניגש למאגר מכמה threads - הגישה מסונכרנת במנעול
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        for table in ("items", "listings"):
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                f"id TEXT PRIMARY KEY, first_seen REAL NOT NULL, last_seen REAL NOT NULL"
+                f") WITHOUT ROWID"
+            )
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_seen ON {table} (last_seen)")
+        self.conn.commit()
+        self.items = SeenTable(self, "items")
+        self.listings = SeenTable(self, "listings")
+        if is_new:
+            self._import_json(SEEN_ITEMS_FILE)
+        for table in (self.items, self.listings):
+            table.load_index()
+
+    def _import_json(self, json_path: str) -> None:
+        """מייבא פעם אחת את קובץ ה-JSON הישן"""
+        try:
+            if os.path.exists(json_path):
+                with open(json_path, "r") as f:
+                    items = json.load(f).get("items", [])
+                if items:
+                    self.items.add(items)
+                    print(f"📥 יובאו {len(items)} פריטים מ-{json_path}")
+        except Exception as e:
+            print(f"Error importing seen items: {e}")
+
+    def expire(self) -> int:
+        """מוחק מזהים שלא נראו יותר מ-expiry_days ימים ומחזיר כמה נמחקו"""
+        cutoff = time.time() - self.expiry_days * 24 * 3600
+        removed = 0
+        with self.lock:
+            for table in ("items", "listings"):
+                removed += self.conn.execute(f"DELETE FROM {table} WHERE last_seen < ?", (cutoff,)).rowcount
+            self.conn.commit()
+        return removed
+
+    def close(self) -> None:
+        """שומר את אינדקסי הטביעות וסוגר את החיבור למאגר"""
+        for table in (self.items, self.listings):
+            table.save_index()
+            table.index.close()
+        with self.lock:
+            self.conn.close()
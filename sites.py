@@ -52,6 +52,88 @@ SITES = [
     },
 ]
 
+# תיאורי מתאמים - איך לחלץ מודעות מכל סוג אתר (נבנים פעם אחת לכל ריצה)
+# container_tags/container_class - מיכל הכרטיס; title/desc/price/link - אלמנטים בתוך הכרטיס
+# title_fallback - כותרת כשאין אלמנט כותרת (None = תחילת טקסט הכרטיס)
+# enrich - האם להשלים שדות חסרים מהדף הפנימי של המודעה
+# structured - חילוץ מ-JSON מוטמע לפני ה-DOM ("next_data" = __NEXT_DATA__), עם נפילה ל-HTML
+# page_param - פרמטר העמוד בכתובת; עמודים נסרקים עד "max_pages" של האתר (ברירת מחדל MAX_PAGES)
+# end_marker - ביטוי שמסמן "אין עוד מודעות" בדף; בפענוח זורם ("stream_parse" באתר או STREAM_PARSE) הקריאה נעצרת בו
+ADAPTERS = {
+    "bluegun": {
+        "label": "BlueGun",
+        "container_tags": ["article", "div", "a"],
+        "container_class": r"(card|listing|item|product)",
+        "title_tags": ["h2", "h3", "h4", "span"],
+        "title_class": r"(title|name)",
+        "desc_tags": ["p", "div"],
+        "desc_class": r"(desc|content|text)",
+        "title_fallback": None,
+        "enrich": False,
+    },
+    "gun2": {
+        "label": "Gun2",
+        "container_tags": ["article", "div"],
+        "container_class": r"(card|listing|product|weapon|jet-listing)",
+        "title_tags": ["h2", "h3", "h4", "a"],
+        "title_fallback": "Glock 45 MOS",
+        "enrich": False,
+    },
+    "guntrade": {
+        "label": "GunTrade",
+        "container_tags": ["article", "div", "li"],
+        "container_class": r"(post|listing|item|card|product)",
+        "title_tags": ["h2", "h3", "h4", "a"],
+        "title_fallback": "Glock 45 MOS",
+        "enrich": False,
+    },
+    "yad2": {
+        "label": "Yad2",
+        "container_tags": ["div", "article"],
+        "container_class": r"(feed-item|product|card|item)",
+        "title_tags": ["h2", "h3", "span"],
+        "title_class": r"(title|name)",
+        "title_fallback": "Glock 45 MOS",
+        "enrich": True,
+        "structured": "next_data",
+        "page_param": "page",
+    },
+    "yad2_market": {
+        "label": "Yad2 Market",
+        "container_tags": ["div", "article"],
+        "container_class": r"(product|item|card)",
+        "title_tags": ["h2", "h3", "span"],
+        "price_class": r"price",
+        "title_fallback": "Glock 45 MOS",
+        "enrich": False,
+    },
+    "generic": {
+        "container_tags": ["article", "div", "li"],
+        "container_class": r"(card|listing|item|product|post)",
+        "title_tags": ["h2", "h3", "h4"],
+        "title_fallback": None,
+        "enrich": False,
+    },
+}
+
+# מתאם ברירת מחדל לפי שם השרת, לאתרים שלא הוגדר להם "adapter"
+ADAPTER_BY_HOST = {
+    "bluegun.co.il": "bluegun",
+    "gun2.co.il": "gun2",
+    "guntrade.co.il": "guntrade",
+    "yad2.co.il": "yad2",
+    "market.yad2.co.il": "yad2_market",
+}
+
+# הגבלות קצב לכל שרת (לפי שם השרת, בלי www.) - "default" חל על שרתים שלא הוגדרו
+# rate - בקשות לשנייה; burst - כמה בקשות אפשר לשלוח ברצף; concurrency - בקשות מקבילות (ברירת מחדל MAX_REQUESTS_PER_HOST)
+# אחרי 429/503 הקצב יורד בחצי (עד min_rate), ואחרי כל הצלחה עולה ב-increase (עד max_rate)
+HOST_LIMITS = {
+    "default": {"rate": 2.0, "burst": 4, "min_rate": 0.2, "max_rate": 5.0, "increase": 0.1},
+    "yad2.co.il": {"rate": 1.0, "burst": 3, "min_rate": 0.1, "max_rate": 3.0, "increase": 0.05},
+    "market.yad2.co.il": {"rate": 1.0, "burst": 3, "min_rate": 0.1, "max_rate": 3.0, "increase": 0.05},
+}
+
 def get_enabled_sites():
     """מחזיר רק אתרים פעילים"""
     return [site for site in SITES if site.get("enabled", True)]
@@ -62,3 +144,20 @@ def get_site_by_name(name):
         if site["name"] == name:
             return site
     return None
+
+def get_adapter_name(site):
+    """מחזיר את שם המתאם של אתר - מהגדרת האתר, לפי השרת, או גנרי"""
+    if site.get("adapter") in ADAPTERS:
+        return site["adapter"]
+    host = site.get("base_url") or site.get("url", "")
+    host = host.split("://")[-1].split("/")[0].lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return ADAPTER_BY_HOST.get(host, "generic")
+
+def get_host_limits(host):
+    """מחזיר את הגבלות הקצב של שרת - ברירת המחדל עם ההגדרות הייעודיות שלו"""
+    host = host.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return {**HOST_LIMITS["default"], **HOST_LIMITS.get(host, {})}
@@ -0,0 +1,178 @@
+# streaming.py - פענוח זורם של דפי רשימה: כרטיסים נפלטים ברגע שהם נסגרים ומשוחררים מהזיכרון
+
+import re
+from typing import Callable, List, Optional, Pattern, Sequence
+from lxml import etree
+from cards import TEXT_SEPARATOR
+
+# תגיות שהטקסט שלהן לא נכלל ב-get_text() (כמו ב-cards.py)
+_HIDDEN_TAGS = {"script", "style", "template"}
+
+
+def element_text(element) -> str:
+    """הטקסט של אלמנט lxml כמו ב-extract_cards - בלי סקריפטים, סגנונות והערות, עם רווח אחרי כל קטע"""
+    parts: List[str] = []
+    stack = [(element, False)]
+    while stack:
+        node, tail_only = stack.pop()
+        if not tail_only and isinstance(node.tag, str) and node.tag not in _HIDDEN_TAGS:
+            if node.text:
+                parts.append(node.text)
+            # הילדים נדחפים בסדר הפוך; הזנב של כל ילד בא אחרי התוכן שלו
+            for child in reversed(node):
+                stack.append((child, True))
+                stack.append((child, False))
+        elif tail_only and node is not element and node.tail:
+            parts.append(node.tail)
+    return "".join(f"{part}{TEXT_SEPARATOR}" for part in parts)
+
+
+def first_href(element, class_pattern: Optional[Pattern] = None) -> str:
+    """ה-href של המודעה באלמנט lxml - כמו SiteAdapter.find_link"""
+    if element.tag == "a" and element.get("href"):
+        return element.get("href")
+    links = [link for link in element.iter("a") if link.get("href")]
+    if class_pattern:
+        for link in links:
+            if any(class_pattern.search(c) for c in (link.get("class") or "").split()):
+                return link.get("href")
+    return links[0].get("href") if links else ""
+
+
+def to_html(element) -> str:
+    """ה-HTML של אלמנט (בלי הטקסט שאחריו) - לבניית Tag של BeautifulSoup לכרטיס שהתאים"""
+    return etree.tostring(element, encoding="unicode", method="html", with_tail=False)
+
+
+def _release(element) -> None:
+    """מנקה אלמנט שטופל ואת האחים הקודמים שלו - כך העץ לא גדל לאורך הדף"""
+    element.clear(keep_tail=True)
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+class _Open:
+    """מיכל מתאים פתוח: קישורי המודעות שנסגרו בתוכו, הקישור הראשון, וכרטיסים שממתינים להכרעה"""
+
+    __slots__ = ("element", "links", "first", "held")
+
+    def __init__(self, element):
+        self.element = element
+        self.links = set()
+        self.first = None
+        self.held = []
+
+
+class CardStream:
+    """
+    מחלץ כרטיסי מודעות מ-HTML שמגיע בחלקים, עם אותה סמנטיקה של extract_cards
+    מיכל עם קישור הוא מודעה, ומיכל בלי קישור הוא שדה של המודעה שסביבו.
+    outer - המיכל החיצוני שמכיל קישור מודעה אחד; inner - המיכל הפנימי ביותר שיש בו קישור.
+    כל כרטיס מועבר ל-on_card(כרטיס, טקסט) כשהוא נסגר וברגע שברור שהוא כרטיס: במצב outer כרטיס
+    ממתין עד שבמיכל שסביבו יש קישור מודעה שני (ואז המיכל הוא רשימה) או עד שהמיכל נסגר (ואז המיכל הוא הכרטיס).
+    אחרי on_card הכרטיס מנוקה, כך שהזיכרון לא תלוי בגודל הדף.
+    """
+
+    def __init__(self, tags: Sequence[str], class_pattern: Pattern, on_card: Callable[[object, str], None],
+                 mode: str = "outer", capture_id: Optional[str] = None):
+        if isinstance(class_pattern, str):
+            class_pattern = re.compile(class_pattern, re.I)
+        self.tags = set(tags)
+        self.class_pattern = class_pattern
+        self.on_card = on_card
+        self.mode = mode
+        # מזהה של סקריפט שהתוכן שלו נשמר (למשל __NEXT_DATA__)
+        self.capture_id = capture_id
+        self.captured: Optional[str] = None
+        self.cards = 0
+        self._parser = etree.HTMLPullParser(events=("start", "end"))
+        self._open: List[_Open] = []
+
+    def _is_container(self, element) -> bool:
+        """תגית מהסוג של המתאם עם מחלקה מתאימה (כמו class_matches ב-cards.py)"""
+        if element.tag not in self.tags:
+            return False
+        classes = element.get("class")
+        if not classes:
+            return False
+        return any(self.class_pattern.search(c) for c in classes.split()) or bool(self.class_pattern.search(classes))
+
+    def feed(self, data: str) -> None:
+        """מזין חלק מהדף ומעביר את הכרטיסים שנסגרו בו"""
+        self._parser.feed(data)
+        self._process()
+
+    def close(self) -> None:
+        """מסיים את הפענוח (גם של דף שנקטע באמצע) ומעביר את הכרטיסים האחרונים"""
+        try:
+            self._parser.close()
+        except etree.LxmlError:
+            pass
+        self._process()
+
+    def _card(self, element) -> None:
+        """מעביר כרטיס ומנקה אותו"""
+        self.cards += 1
+        self.on_card(element, element_text(element))
+        element.clear(keep_tail=True)
+
+    def _process(self) -> None:
+        for event, element in self._parser.read_events():
+            if not isinstance(element.tag, str):
+                continue
+            if event == "start":
+                if self._is_container(element):
+                    self._open.append(_Open(element))
+                if element.tag == "a" and element.get("href") and self._open and self._open[-1].first is None:
+                    self._open[-1].first = element.get("href")
+                continue
+
+            if element.tag == "script" and self.capture_id and element.get("id") == self.capture_id:
+                self.captured = element.text or ""
+
+            if not self._open or self._open[-1].element is not element:
+                # אלמנט רגיל - מחוץ לכל מיכל אין בו יותר מה לחלץ
+                if not self._open:
+                    _release(element)
+                continue
+
+            node = self._open.pop()
+            parent = self._open[-1] if self._open else None
+            own = not node.links and node.first is not None
+            if own:
+                node.links.add(node.first)
+            if parent is not None:
+                parent.links |= node.links
+                parent.first = parent.first or node.first
+
+            if not node.links:
+                # מיכל בלי קישור: שדה של המודעה שסביבו, או כרטיס אם הוא לא בתוך מיכל אחר
+                if parent is None:
+                    self._card(element)
+                    _release(element)
+                continue
+
+            if self.mode == "inner":
+                if own:
+                    self._card(element)
+                if parent is None:
+                    _release(element)
+                continue
+
+            # outer: כרטיס הוא מיכל עם קישור מודעה אחד שבהורה שלו יש יותר מקישור אחד (או שאין לו הורה)
+            if parent is None:
+                if len(node.links) == 1:
+                    self._card(element)
+                _release(element)
+                continue
+            if len(node.links) == 1:
+                parent.held.append(element)
+            else:
+                # רשימה פנימית - הכרטיסים שבה כבר הועברו
+                element.clear(keep_tail=True)
+            if len(parent.links) > 1:
+                for held in parent.held:
+                    self._card(held)
+                parent.held = []
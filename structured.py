@@ -0,0 +1,118 @@
+# structured.py - חילוץ מודעות מ-JSON מוטמע בדף (__NEXT_DATA__) במקום מה-DOM
+
+import json
+import re
+from typing import Dict, Iterator, List, Optional
+
+_NEXT_DATA = re.compile(
+    r'<script[^>]*\bid=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>',
+    re.S | re.I,
+)
+
+# שדות שמזהים אובייקט כמודעה: מזהה יציב + לפחות שדה תוכן אחד
+_ID_KEYS = ("token", "link_token", "orderId")
+_CONTENT_KEYS = ("price", "title", "title_1", "address", "city", "manufacturer", "metaData")
+
+
+def extract_next_data(html: str) -> Optional[Dict]:
+    """מחזיר את ה-JSON של __NEXT_DATA__ מתוך הדף, או None"""
+    match = _NEXT_DATA.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+def _text(value) -> str:
+    """ערך טקסט משדה שיכול להיות מחרוזת או אובייקט עם text"""
+    if isinstance(value, dict):
+        return str(value.get("text") or value.get("title") or "")
+    return str(value) if value not in (None, "") else ""
+
+
+def _strings(value) -> Iterator[str]:
+    """כל המחרוזות שבתוך אובייקט - לצורך התאמת מילות החיפוש"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def _listing_id(obj: Dict) -> Optional[str]:
+    """המזהה היציב של המודעה, אם יש"""
+    for key in _ID_KEYS:
+        if isinstance(obj.get(key), (str, int)) and obj[key] != "":
+            return str(obj[key])
+    return None
+
+
+def _iter_listing_objects(data) -> Iterator[Dict]:
+    """עובר על ה-JSON ומחזיר אובייקטים שנראים כמו מודעות (בלי להיכנס לתוך מודעה)"""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if _listing_id(node) and any(key in node for key in _CONTENT_KEYS):
+                yield node
+                continue
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def _parse_price(value) -> Optional[int]:
+    """מחיר כמספר שלם - ממספר או ממחרוזת כמו 1,200 ₪"""
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+    digits = re.sub(r"[^\d]", "", _text(value))
+    return int(digits) if digits else None
+
+
+def decode_listing(obj: Dict, base_url: str) -> Dict:
+    """ממיר אובייקט מודעה של Yad2 לרשומה אחידה"""
+    listing_id = _listing_id(obj)
+    title = _text(obj.get("title")) or _text(obj.get("title_1"))
+    if not title:
+        title = " ".join(filter(None, (_text(obj.get(k)) for k in ("manufacturer", "model", "subModel"))))
+    address = obj.get("address") or {}
+    city = _text(address.get("city")) if isinstance(address, dict) else ""
+    meta = obj.get("metaData") or {}
+    description = (meta.get("description") if isinstance(meta, dict) else "") or _text(obj.get("title_2"))
+    return {
+        "listing_id": listing_id,
+        "title": title,
+        "url": f"{base_url}/item/{listing_id}",
+        "price": _parse_price(obj.get("price")),
+        "location": city or _text(obj.get("city")),
+        "description": description or "",
+        "text": " ".join(_strings(obj)),
+    }
+
+
+def decode_next_data_listings(html: str, base_url: str) -> Optional[List[Dict]]:
+    """
+    מפענח את כל המודעות מה-JSON המוטמע בדף
+    מחזיר None אם אין JSON או שלא נמצאו בו מודעות - ואז חוזרים לחילוץ מה-DOM
+    """
+    data = extract_next_data(html)
+    if data is None:
+        return None
+    return decode_listings(data, base_url)
+
+
+def decode_listings(data, base_url: str) -> Optional[List[Dict]]:
+    """המודעות מתוך JSON שכבר פוענח (למשל מסקריפט שנאסף בפענוח זורם), או None"""
+    listings = []
+    seen = set()
+    for obj in _iter_listing_objects(data):
+        listing = decode_listing(obj, base_url)
+        if listing["listing_id"] not in seen:
+            seen.add(listing["listing_id"])
+            listings.append(listing)
+    return listings or None
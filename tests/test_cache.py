@@ -0,0 +1,130 @@
+# test_cache.py - מטמון הבקשות: טביעת הגדרות ועדכון "נראה לאחרונה" לדפים שלא השתנו
+import datetime
+import time
+
+import pytest
+import requests
+
+import main
+from cache import ResponseCache
+from profiles import ProfileIndex, WatchProfile
+from scraper import GunScraper
+from seen_store import SeenStore
+
+PAGE = """<html><body><div class="results">
+<div class="card"><h2>Glock 45 MOS</h2><a href="/item/1">לפרטים</a><span>3,500 ₪</span><span>050-1234567</span></div>
+<div class="card"><h2>CZ 75</h2><a href="/item/2">לפרטים</a><span>4,200 ₪</span><span>050-7654321</span></div>
+</div></body></html>"""
+SITE = {"name": "Shop", "url": "https://shop.example/list", "base_url": "https://shop.example", "adapter": "generic"}
+
+
+def _response(markup, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response._content = markup.encode("utf-8")
+    response.encoding = "utf-8"
+    response.elapsed = datetime.timedelta(seconds=0.01)
+    return response
+
+
+def test_entry_from_other_config_is_ignored(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http_cache.json"), fingerprint="a")
+    response = _response(PAGE)
+    response.headers["ETag"] = '"v1"'
+    assert not cache.is_unchanged(SITE["url"], response)
+    assert cache.is_unchanged(SITE["url"], response)
+    assert cache.conditional_headers(SITE["url"]) == {"If-None-Match": '"v1"'}
+
+    cache.fingerprint = "b"
+    assert cache.conditional_headers(SITE["url"]) == {}
+    assert not cache.is_unchanged(SITE["url"], _response("", status=304))
+    assert not cache.is_unchanged(SITE["url"], response)
+    assert cache.is_unchanged(SITE["url"], response)
+
+
+def test_profile_change_changes_fingerprint():
+    before = ProfileIndex([WatchProfile("alice", ["glock 45"])])
+    assert before.fingerprint() == ProfileIndex([WatchProfile("alice", ["Glock-45"])]).fingerprint()
+    assert before.fingerprint() != ProfileIndex([WatchProfile("alice", ["glock 45", "cz 75"])]).fingerprint()
+    assert before.fingerprint() != ProfileIndex(
+        [WatchProfile("alice", ["glock 45"], filters="price < 3000")]).fingerprint()
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scraper = GunScraper(known_listings=set(), terms=["glock 45 mos"])
+    scraper.response_cache = ResponseCache(str(tmp_path / "http_cache.json"), scraper.matcher.fingerprint())
+    scraper.session.get = lambda url, **kwargs: _response(PAGE)
+    scraper.item_keys = lambda item: [main.generate_item_id(item)]
+    return scraper
+
+
+def test_unchanged_page_touches_its_items(scraper, tmp_path):
+    results = scraper.scrape_site(SITE)
+    assert [result["title"] for result in results] == ["Glock 45 MOS"]
+    assert not scraper.unchanged_items
+
+    # אותו דף באותן הגדרות - לא נסרק, אבל המזהים שלו מסומנים כעדיין באתר
+    assert scraper.scrape_site(SITE) == []
+    assert scraper.unchanged_items == {main.generate_item_id(results[0])}
+
+    store = SeenStore(str(tmp_path / "seen.db"), expiry_days=90)
+    store.items.add(scraper.unchanged_items)
+    stale = time.time() - 100 * 24 * 3600
+    store.conn.execute("UPDATE items SET last_seen = ?", (stale,))
+    store.conn.commit()
+    main.save_state({}, scraper, store)
+    assert not scraper.unchanged_items
+    assert store.expire() == 0
+    assert main.generate_item_id(results[0]) in store.items
+    store.close()
+
+
+def test_new_terms_rescan_unchanged_page(scraper):
+    scraper.scrape_site(SITE)
+    rescan = GunScraper(known_listings=set(), terms=["glock 45 mos", "cz 75"])
+    rescan.response_cache = scraper.response_cache
+    rescan.response_cache.fingerprint = rescan.matcher.fingerprint()
+    rescan.session.get = scraper.session.get
+    assert sorted(result["title"] for result in rescan.scrape_site(SITE)) == ["CZ 75", "Glock 45 MOS"]
+
+
+def test_same_strong_etag_skips_the_body(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http_cache.json"), fingerprint="a")
+    response = _response(PAGE)
+    response.headers["ETag"] = '"v1"'
+    assert not cache.same_version(SITE["url"], response)
+    assert not cache.is_unchanged(SITE["url"], response)
+
+    # שרת שמתעלם מ-If-None-Match: 200 עם אותו ETag - לא השתנה בלי לקרוא את הגוף (שאין בתגובה הזו)
+    again = requests.Response()
+    again.status_code = 200
+    again.headers["ETag"] = '"v1"'
+    assert cache.same_version(SITE["url"], again)
+    assert cache.is_unchanged(SITE["url"], again)
+
+    again.headers["ETag"] = '"v2"'
+    assert not cache.same_version(SITE["url"], again)
+    weak = _response(PAGE)
+    weak.headers["ETag"] = 'W/"v1"'
+    assert not cache.same_version(SITE["url"], weak)
+
+
+def test_unchanged_streamed_page_builds_no_listings(scraper, monkeypatch):
+    def get(url, **kwargs):
+        response = _response(PAGE)
+        response._content_consumed = True
+        return response
+
+    built = []
+    build_listing = scraper._build_listing
+    monkeypatch.setattr(scraper, "_build_listing", lambda *args, **kwargs: built.append(args[3]) or build_listing(*args, **kwargs))
+    scraper.session.get = get
+    site = dict(SITE, stream_parse=True)
+
+    assert [result["title"] for result in scraper.scrape_site(site)] == ["Glock 45 MOS"]
+    assert len(built) == 1
+    # הגיבוב זהה - הדף נקרא ומפוענח, אבל אף מודעה לא נבנית
+    assert scraper.scrape_site(site) == []
+    assert len(built) == 1
@@ -0,0 +1,72 @@
+# test_cards.py - גבולות כרטיסים מקוננים: DOM ופענוח זורם
+import re
+
+import pytest
+from bs4 import BeautifulSoup
+
+from cards import extract_cards
+from streaming import CardStream
+
+PATTERN = re.compile(r"(card|feed-item|item)", re.I)
+
+BOOTSTRAP = """<html><body><div class="row">
+<div class="card"><div class="card-header">Glock 19</div>
+  <div class="card-body"><p>מצב מעולה</p><a href="/item/1">לפרטים</a></div>
+  <div class="card-footer">3,500 ₪</div></div>
+<div class="card"><div class="card-header">CZ 75</div>
+  <div class="card-body"><p>כמו חדש</p><a href="/item/2">לפרטים</a></div>
+  <div class="card-footer">4,200 ₪</div></div>
+</div></body></html>"""
+
+FEED = """<html><body><div class="feed">
+<div class="feed-item"><div class="item-title"><a href="/a/1">Glock 19</a></div><div class="item-price">3,500 ₪</div></div>
+<div class="feed-item"><a href="/a/2"><img src="x.jpg"></a><div class="item-title"><a href="/a/2">CZ 75</a></div>
+  <div class="item-price">4,200 ₪</div></div>
+</div></body></html>"""
+
+
+def _stream(markup, mode):
+    cards = []
+    stream = CardStream(["div", "a"], PATTERN, lambda element, text: cards.append(text), mode=mode)
+    stream.feed(markup)
+    stream.close()
+    return cards
+
+
+def _dom(markup, mode):
+    soup = BeautifulSoup(markup, "lxml")
+    return [text for _, text in extract_cards(soup, ["div", "a"], PATTERN, mode)[0]]
+
+
+@pytest.mark.parametrize("extract", [_dom, _stream])
+def test_card_with_header_body_footer_is_one_listing(extract):
+    cards = extract(BOOTSTRAP, "outer")
+    assert len(cards) == 2
+    assert "Glock 19" in cards[0] and "מצב מעולה" in cards[0] and "3,500 ₪" in cards[0]
+    assert "CZ 75" in cards[1] and "4,200 ₪" in cards[1]
+
+
+@pytest.mark.parametrize("extract", [_dom, _stream])
+def test_linked_field_and_repeated_link_stay_in_card(extract):
+    cards = extract(FEED, "outer")
+    assert len(cards) == 2
+    assert "3,500 ₪" in cards[0]
+    assert "CZ 75" in cards[1] and "4,200 ₪" in cards[1]
+
+
+def test_dom_card_keeps_its_link():
+    soup = BeautifulSoup(BOOTSTRAP, "lxml")
+    cards, _ = extract_cards(soup, ["div"], PATTERN)
+    assert [card.find("a")["href"] for card, _ in cards] == ["/item/1", "/item/2"]
+
+
+@pytest.mark.parametrize("extract", [_dom, _stream])
+def test_card_without_links_is_kept_when_not_nested(extract):
+    markup = '<html><body><div class="card"><div class="card-body">Glock 19</div></div></body></html>'
+    assert extract(markup, "outer") == ["Glock 19 "]
+
+
+@pytest.mark.parametrize("extract", [_dom, _stream])
+def test_adjacent_elements_do_not_glue_words(extract):
+    markup = '<html><body><div class="card"><h2>Glock 45 MOS</h2><p>מצב מעולה</p><a href="/i/1">₪</a></div></body></html>'
+    assert extract(markup, "outer") == ["Glock 45 MOS מצב מעולה ₪ "]
@@ -0,0 +1,150 @@
+# test_filters.py - שפת השאילתות של פרופילי המעקב וסדר הבדיקות של הפרדיקט
+import pytest
+
+from filters import FilterSyntaxError, _tokenize, parse_query, query_from_filters
+
+README_QUERY = ('"glock 19", "cz 75" and price between 2000 and 6000 and location in (תל אביב, חיפה) '
+                'and exclude term מחסנית, נרתיק and site in (Gun2, BlueGun)')
+
+
+def _item(**fields):
+    item = {"site": "Gun2", "title": "Glock 19 Gen5", "description": "", "price_value": 4500,
+            "currency": "ILS", "location": "תל אביב"}
+    item.update(fields)
+    return item
+
+
+def test_tokenizer_kinds():
+    assert _tokenize(' "glock 19", cz75 and price <= 5,000 and location in (תל אביב)') == [
+        ("string", "glock 19"), ("op", ","), ("word", "cz75"), ("word", "and"),
+        ("word", "price"), ("op", "<="), ("number", "5,000"), ("word", "and"),
+        ("word", "location"), ("word", "in"), ("op", "("), ("word", "תל"), ("word", "אביב"), ("op", ")"),
+    ]
+
+
+def test_tokenizer_keeps_digits_inside_words():
+    # "19x" ו-"p320" הן מילים, לא מספר ואחריו מילה
+    assert _tokenize("19x p320") == [("word", "19x"), ("word", "p320")]
+    # פסיק שאחריו פחות משלוש ספרות מפריד בין ערכים
+    assert _tokenize("12,5") == [("number", "12"), ("op", ","), ("number", "5")]
+
+
+def test_readme_example():
+    query = parse_query(README_QUERY)
+    assert query.terms == ["glock 19", "cz 75"]
+    assert (query.min_price, query.max_price) == (2000, 6000)
+    assert query.locations == ["תל אביב", "חיפה"]
+    assert query.excluded == ["מחסנית", "נרתיק"]
+    assert query.sites == ["Gun2", "BlueGun"]
+
+    assert query(_item())
+    assert query(_item(site="bluegun", location="חיפה, כרמל"))
+    assert not query(_item(site="Yad2"))
+    assert not query(_item(price_value=7000))
+    assert not query(_item(location="באר שבע"))
+    assert not query(_item(description="כולל מחסנית נוספת"))
+
+
+def test_unknown_fields_do_not_reject():
+    query = parse_query(README_QUERY)
+    # לפני ההעשרה אין מחיר ואין מיקום; מחיר במטבע אחר לא נבדק מול טווח השקלים
+    assert query(_item(price_value=None, location=""))
+    assert query(_item(price_value=9000, currency="USD"))
+
+
+def test_between_and_binds_tighter_than_the_clause_separator():
+    query = parse_query("glock and price between 6000 and 2000 and location in חיפה")
+    assert query.terms == ["glock"]
+    assert (query.min_price, query.max_price) == (2000, 6000)
+    assert query.locations == ["חיפה"]
+
+
+def test_unparenthesized_list_ends_at_next_keyword():
+    query = parse_query("glock 19 price < 5000 site in gun2, bluegun exclude airsoft")
+    assert query.terms == ["glock 19"]
+    assert query.max_price == 4999
+    assert query.sites == ["gun2", "bluegun"]
+    assert query.excluded == ["airsoft"]
+
+
+@pytest.mark.parametrize("text, low, high", [
+    ("price > 1,000", 1001, None),
+    ("price >= 1000", 1000, None),
+    ("price < 1000", None, 999),
+    ("price <= 1000", None, 1000),
+])
+def test_price_comparisons(text, low, high):
+    query = parse_query(text)
+    assert (query.min_price, query.max_price) == (low, high)
+
+
+def test_quoted_terms_keep_keywords_and_separators():
+    query = parse_query("\"and\", 'price, location' and site in (\"Blue Gun\")")
+    assert query.terms == ["and", "price, location"]
+    assert query.sites == ["Blue Gun"]
+
+
+def test_keywords_inside_parentheses_are_values():
+    assert parse_query("site in (gun price)").sites == ["gun price"]
+
+
+@pytest.mark.parametrize("text, message", [
+    ("price", "חסר תנאי מחיר"),
+    ("price = 5", "תו לא צפוי"),
+    ("price between 1 and", "חסר מספר"),
+    ("price < abc", "צפוי מספר"),
+    ("price between 1 or 2", 'צפוי "and"'),
+    ("location (חיפה)", 'צפוי "in"'),
+    ("site in (gun2", "חסר ')'"),
+    ("site in ()", "רשימה ריקה"),
+    ("site in (gun2, ( bluegun)", "לא צפוי בתוך רשימה"),
+])
+def test_syntax_errors(text, message):
+    with pytest.raises(FilterSyntaxError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        parse_query(text)
+
+
+def test_filter_syntax_error_is_value_error():
+    with pytest.raises(ValueError):
+        parse_query("price")
+
+
+class _Recorder(dict):
+    """מודעה שרושמת את השדות שנקראו ממנה, לפי הסדר"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = []
+
+    def get(self, key, default=None):
+        self.reads.append(key)
+        return super().get(key, default)
+
+    def __getitem__(self, key):
+        self.reads.append(key)
+        return super().__getitem__(key)
+
+
+def _first_reads(reads):
+    return [field for i, field in enumerate(reads) if field not in reads[:i]]
+
+
+def test_checks_run_site_price_location_exclude():
+    query = query_from_filters({"exclude": ["airsoft"], "locations": ["חיפה"], "max_price": 5000, "sites": ["Gun2"]})
+    item = _Recorder(_item(location="חיפה"))
+    assert query(item)
+    assert _first_reads(item.reads) == ["site_name", "site", "price_value", "currency", "location", "title",
+                                        "description"]
+
+
+@pytest.mark.parametrize("fields, last_read", [
+    ({"site": "Yad2"}, "site"),
+    ({"price_value": 9000}, "price_value"),
+    ({"location": "אילת"}, "location"),
+])
+def test_first_failing_check_stops_the_rest(fields, last_read):
+    query = query_from_filters({"exclude": ["airsoft"], "locations": ["חיפה"], "max_price": 5000, "sites": ["Gun2"]})
+    item = _Recorder(_item(**{"location": "חיפה", **fields}))
+    assert not query(item)
+    assert item.reads[-1] == last_read
+    assert "title" not in item.reads
@@ -0,0 +1,74 @@
+# test_http_archive.py - הקלטה זורמת מול שרת HTTP מקומי ושחזור שלה
+import gzip
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_archive import HttpArchive, attach
+
+BODY = b"".join(f"<div class='card'>item {i}</div>\n".encode() for i in range(20000))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _recorded(archive):
+    with open(archive.index_path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_stream_is_teed_and_completed_on_close(tmp_path, server):
+    archive = HttpArchive(str(tmp_path / "archive"))
+    archive.start_recording([])
+    session = requests.Session()
+    attach(session, archive)
+
+    response = session.get(f"{server}/list", stream=True)
+    first = next(response.iter_content(4096))
+    # הגוף לא נקרא לזיכרון בהקלטה - רק החלק שהצרכן ביקש
+    assert response._content is False and BODY.startswith(first)
+    assert _recorded(archive) == []
+    response.close()
+
+    entries = _recorded(archive)
+    assert len(entries) == 1 and entries[0]["url"] == f"{server}/list"
+    assert entries[0]["body"] == hashlib.sha1(BODY).hexdigest()
+    assert gzip.decompress((tmp_path / "archive" / "bodies" / f"{entries[0]['body']}.gz").read_bytes()) == BODY
+
+
+def test_buffered_request_is_recorded_and_replayed(tmp_path, server):
+    archive = HttpArchive(str(tmp_path / "archive"))
+    archive.start_recording([])
+    session = requests.Session()
+    attach(session, archive)
+    assert session.get(f"{server}/list").content == BODY
+    assert len(_recorded(archive)) == 1
+
+    replay = HttpArchive(str(tmp_path / "archive"))
+    replay.load()
+    session = requests.Session()
+    attach(session, replay, replay=True)
+    assert b"".join(session.get(f"{server}/list", stream=True).iter_content(4096)) == BODY
+    assert replay.served == 1 and replay.missed == []
@@ -0,0 +1,55 @@
+# test_matcher.py - נרמול מילות חיפוש והתאמה על גבולות מילים
+import pytest
+
+from matcher import TermMatcher, normalize_text, term_key
+
+
+def test_normalize_collapses_separators_to_single_space():
+    assert normalize_text("  Glock-19,  Gen5 ") == "glock 19 gen5"
+    assert normalize_text('צה"ל  שָׁלוֹם') == "צהל שלום"
+
+
+@pytest.mark.parametrize("text", [
+    "גלוק 45 מ.ו.ס",
+    "גלוק45 מוס",
+    'גלוֹק 45 מ"ו"ס',
+    "למכירה: גלוק-45 מוס חדש",
+])
+def test_variants_match_same_term(text):
+    assert TermMatcher(["גלוק 45 מ.ו.ס"]).search(text) == "גלוק 45 מ.ו.ס"
+
+
+@pytest.mark.parametrize("text", [
+    "model 45, Most popular",
+    "1945 mos",
+    "kosmos 45 mosaic",
+])
+def test_no_match_across_word_boundaries(text):
+    assert TermMatcher(["45 mos"]).search(text) is None
+    assert TermMatcher(["45 mos"]).find_all(text) == set()
+
+
+def test_find_all_reports_contained_terms():
+    matcher = TermMatcher(["glock", "glock 19", "19"])
+    assert matcher.find_all("Glock19 gen 5") == {"glock", "glock 19", "19"}
+    assert matcher.find_all("glock 195") == {"glock"}
+
+
+def test_term_key_ignores_spacing():
+    assert term_key("glock 19") == term_key("Glock-19") == term_key("glock19")
+
+
+@pytest.mark.parametrize("text", ["הגלוק שלי", "לגלוק 19", "והגלוק החדש", "45 מוסים", "שתי מחסניות לגלוקים"])
+def test_hebrew_prefixes_and_suffixes_match(text):
+    assert TermMatcher(["גלוק", "מוס"]).search(text) is not None
+
+
+@pytest.mark.parametrize("text", ["מוסך", "מוסר", "אגלוק"])
+def test_hebrew_boundary_still_applies(text):
+    assert TermMatcher(["גלוק", "מוס"]).search(text) is None
+
+
+def test_prefixed_match_reports_the_term_itself():
+    matcher = TermMatcher(["גלוק 19", "45 מוס"])
+    assert matcher.search("למכירה לגלוק 19 דור 5") == "גלוק 19"
+    assert matcher.find_all("הגלוק 19 ו-45 מוסים") == {"גלוק 19", "45 מוס"}
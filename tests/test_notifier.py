@@ -0,0 +1,69 @@
+# test_notifier.py - פיצול התראות להודעות טלגרם ולמיילים מרוכזים
+import pytest
+
+import notifier
+from notifier import Notifier, TELEGRAM_MAX_MESSAGE_LENGTH, _message_length
+
+NOW = "18/10/2026 09:00"
+
+
+def _items(count):
+    # עברית ואמוג'י מחוץ ל-BMP: כל אמוג'י הוא זוג surrogates - 2 יחידות UTF-16 אבל תו אחד בפייתון
+    return [
+        {"site": "Gun2", "title": f"🔫🔫 גלוק 19 דור 5 מספר {i} " + "🎯" * 120,
+         "url": f"https://gun2.co.il/item/{i}", "price": "3,500 ₪",
+         "description": "מצב מעולה 💯 " * 20, "location": "תל אביב 🏙️", "phone": "050-1234567",
+         "matched_term": "גלוק 19"}
+        for i in range(count)
+    ]
+
+
+def test_message_length_counts_utf16_units():
+    assert _message_length("גלוק") == 4
+    assert _message_length("🔫") == 2
+    # אמוג'י עם בורר וריאציה (U+FE0F) - עוד יחידה
+    assert _message_length("🏙️") == 3
+    assert _message_length("a🔫ב") == 4
+
+
+@pytest.mark.parametrize("count", [1, 7, 40])
+def test_telegram_parts_stay_under_limit(count):
+    results = _items(count)
+    parts = Notifier(use_config=False).format_telegram_messages(results, NOW)
+
+    for _, message in parts:
+        assert _message_length(message) <= TELEGRAM_MAX_MESSAGE_LENGTH
+    # בלי ספירת UTF-16 ההודעות היו עוברות את המגבלה - הבדיקה באמת מפעילה את ההפרש
+    if count > 1:
+        assert len(parts) > 1
+        assert any(_message_length(message) > len(message) + 500 for _, message in parts)
+
+
+def test_telegram_items_are_never_split():
+    results = _items(40)
+    mailer = Notifier(use_config=False)
+    parts = mailer.format_telegram_messages(results, NOW)
+
+    # כל מודעה בדיוק בהודעה אחת, לפי הסדר, והבלוק שלה שלם בתוכה
+    assert [item for items, _ in parts for item in items] == results
+    number = 1
+    for part, (items, message) in enumerate(parts, 1):
+        assert f"({part}/{len(parts)})" in message
+        for item in items:
+            assert mailer._telegram_item(number, item) in message
+            number += 1
+
+
+def test_email_digests_keep_items_whole(monkeypatch):
+    monkeypatch.setattr(notifier, "EMAIL_DIGEST_SIZE", 4)
+    results = _items(10)
+    mailer = Notifier(use_config=False)
+    digests = mailer.format_email_digests(results, NOW)
+
+    assert [len(items) for items, _ in digests] == [4, 4, 2]
+    assert [item for items, _ in digests for item in items] == results
+    for part, (items, (subject, body)) in enumerate(digests, 1):
+        assert subject.endswith(f"({part}/3)") and "🔔" in subject
+        for item in items:
+            assert mailer._email_item(item) in body
+        assert all(item["url"] not in body for item in results if item not in items)
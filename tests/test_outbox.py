@@ -0,0 +1,210 @@
+# test_outbox.py - תיבת היוצאים מול שרתי טלגרם ו-SMTP מקומיים
+import base64
+import email
+import json
+import smtplib
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import notifier
+import outbox
+from notifier import Notifier
+from outbox import Outbox
+
+ITEM = {"site": "Gun2", "title": "Glock 45 MOS", "url": "https://gun2.co.il/item/1", "price": "3,500 ₪",
+        "description": "מצב מעולה", "phone": "", "location": "", "matched_term": "glock 45 mos"}
+
+
+class TelegramStub(ThreadingHTTPServer):
+    """שרת Bot API מקומי - מחזיר את התגובות מהתור לפי הסדר, ואחריהן ok"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _TelegramHandler)
+        self.replies = []
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _TelegramHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, body))
+        status, reply = self.server.replies.pop(0) if self.server.replies else (200, {"ok": True})
+        data = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class SmtpStub(socketserver.ThreadingTCPServer):
+    """שרת SMTP מקומי - AUTH PLAIN, וקוד התשובה ל-DATA מהתור (ברירת מחדל 250)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.replies = []
+        self.messages = []
+        self.logins = []
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self._reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(" ", 1)[0].upper()
+            if command in ("EHLO", "HELO"):
+                self._reply("250-stub")
+                self._reply("250 AUTH PLAIN")
+            elif command == "AUTH":
+                self.server.logins.append(base64.b64decode(line.split()[-1]).split(b"\0")[1].decode())
+                self._reply("235 ok")
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self._reply("250 ok")
+            elif command == "DATA":
+                self._reply("354 go on")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if data in (b".\r\n", b""):
+                        break
+                    lines.append(data)
+                self.server.messages.append(b"".join(lines))
+                self._reply(self.server.replies.pop(0) if self.server.replies else "250 queued")
+            elif command == "QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("502 unknown")
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    server = TelegramStub()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    monkeypatch.setattr(notifier, "TELEGRAM_API_URL", server.url)
+    monkeypatch.setattr(notifier, "TELEGRAM_BOT_TOKEN", "123:abc")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    server = SmtpStub()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    monkeypatch.setattr(notifier, "SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setattr(notifier, "SMTP_PORT", server.server_address[1])
+    monkeypatch.setattr(notifier, "SMTP_USE_SSL", False)
+    monkeypatch.setattr(notifier, "EMAIL_ADDRESS", "scraper@example.com")
+    monkeypatch.setattr(notifier, "EMAIL_PASSWORD", "secret")
+    # לשרת המקומי אין TLS
+    monkeypatch.setattr(smtplib.SMTP, "starttls", lambda self, *args, **kwargs: (220, b"ok"))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """ההמתנות בין ניסיונות נרשמות במקום להתבצע; בלי רעש אקראי ב-backoff"""
+    delays = []
+    monkeypatch.setattr(outbox.time, "sleep", delays.append)
+    monkeypatch.setattr(outbox.random, "uniform", lambda low, high: 1.0)
+    return delays
+
+
+def _outbox(tmp_path, channels):
+    box = Outbox(str(tmp_path / "outbox.json"))
+    box.add([("item-1", ITEM)], channels)
+    return box
+
+
+def test_telegram_retry_after_is_honored(tmp_path, telegram, sleeps):
+    telegram.replies = [(429, {"ok": False, "error_code": 429, "parameters": {"retry_after": 7}})]
+    box = _outbox(tmp_path, ["telegram"])
+
+    assert box.dispatch(Notifier(telegram_chat_id="42")) == (1, 0)
+    assert sleeps == [7]
+    assert len(telegram.requests) == 2
+    path, body = telegram.requests[-1]
+    assert path == "/bot123:abc/sendMessage" and body["chat_id"] == "42" and "Glock 45 MOS" in body["text"]
+
+
+def test_server_errors_back_off_exponentially(tmp_path, telegram, sleeps):
+    telegram.replies = [(502, {"ok": False})] * 3
+    box = _outbox(tmp_path, ["telegram"])
+
+    assert box.dispatch(Notifier(telegram_chat_id="42")) == (1, 0)
+    base = outbox.OUTBOX_BACKOFF_SECONDS
+    assert sleeps == [base, base * 2, base * 4]
+    assert len(telegram.requests) == 4
+
+
+def test_permanent_telegram_error_is_dead_lettered(tmp_path, telegram, sleeps):
+    telegram.replies = [(400, {"ok": False, "description": "Bad Request: chat not found"})]
+    box = _outbox(tmp_path, ["telegram", "email"])
+    box._dispatch_channel(Notifier(telegram_chat_id="42"), "telegram")
+
+    state = box.entries["item-1"]["channels"]["telegram"]
+    assert state["status"] == "failed" and "chat not found" in state["last_error"]
+    assert sleeps == [] and len(telegram.requests) == 1
+    assert Outbox(box.path).entries["item-1"]["channels"]["telegram"]["status"] == "failed"
+
+
+def test_permanent_smtp_error_is_dead_lettered(tmp_path, smtp, sleeps):
+    smtp.replies = ["550 mailbox unavailable"]
+    box = _outbox(tmp_path, ["email"])
+
+    assert box.dispatch(Notifier(notify_email="user@example.com", use_config=False)) == (0, 0)
+    assert sleeps == [] and len(smtp.messages) == 1
+    assert len(box) == 0
+
+
+def test_smtp_temporary_error_is_retried(tmp_path, smtp, sleeps):
+    smtp.replies = ["451 try again later"]
+    box = _outbox(tmp_path, ["email"])
+    mailer = Notifier(notify_email="user@example.com", use_config=False)
+
+    assert box.dispatch(mailer) == (1, 0)
+    mailer.close()
+    assert sleeps == [outbox.OUTBOX_BACKOFF_SECONDS]
+    assert len(smtp.messages) == 2
+    parts = email.message_from_bytes(smtp.messages[-1]).walk()
+    assert any(b"Glock 45 MOS" in (part.get_payload(decode=True) or b"") for part in parts)
+    assert smtp.logins[0] == "scraper@example.com"
+
+
+def test_pending_outbox_resumes_on_next_run(tmp_path, telegram, sleeps):
+    # השרת מבקש להמתין יותר מ-OUTBOX_MAX_BACKOFF - הריצה מוותרת והפריט נשאר ממתין בקובץ
+    telegram.replies = [(429, {"ok": False, "parameters": {"retry_after": outbox.OUTBOX_MAX_BACKOFF + 1}})]
+    box = _outbox(tmp_path, ["telegram"])
+    assert box.dispatch(Notifier(telegram_chat_id="42")) == (0, 1)
+    assert sleeps == []
+    state = box.entries["item-1"]["channels"]["telegram"]
+    assert state["status"] == "pending" and state["attempts"] == 1
+
+    # הריצה הבאה טוענת את תיבת היוצאים מהדיסק ושולחת בלי לסרוק
+    next_run = Outbox(box.path)
+    assert next_run.pending("telegram") == [("item-1", ITEM)]
+    assert next_run.dispatch(Notifier(telegram_chat_id="42")) == (1, 0)
+    assert len(next_run) == 0 and len(Outbox(box.path)) == 0
+    assert len(telegram.requests) == 2
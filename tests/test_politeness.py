@@ -0,0 +1,62 @@
+# test_politeness.py - המקום בתור של השרת נתפס עד שגוף התגובה נקרא
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from politeness import HostBucket, PoliteAdapter
+
+BODY = b"x" * 200_000
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def polite():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+    adapter = PoliteAdapter()
+    bucket = HostBucket("127.0.0.1", {"rate": 100.0, "burst": 10, "concurrency": 1})
+    adapter._buckets["127.0.0.1"] = bucket
+    session = requests.Session()
+    session.mount("http://", adapter)
+    yield session, bucket, f"http://127.0.0.1:{httpd.server_address[1]}/"
+    session.close()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _slot_free(bucket):
+    if not bucket.slots.acquire(blocking=False):
+        return False
+    bucket.slots.release()
+    return True
+
+
+def test_streamed_response_holds_its_slot_until_closed(polite):
+    session, bucket, url = polite
+    response = session.get(url, stream=True)
+    next(response.iter_content(1024))
+    assert not _slot_free(bucket)
+    response.close()
+    assert _slot_free(bucket)
+
+
+def test_slot_is_released_when_the_body_is_read(polite):
+    session, bucket, url = polite
+    assert session.get(url).content == BODY
+    assert _slot_free(bucket)
+
+    response = session.get(url, stream=True)
+    assert b"".join(response.iter_content(65536)) == BODY
+    assert _slot_free(bucket)
@@ -0,0 +1,104 @@
+# test_profiles.py - ניתוב מודעות לפרופילים, מזהי "נראה" וערוצים לכל מנוי
+import pytest
+
+import main
+import notifier
+from notifier import Notifier
+from outbox import Outbox
+from profiles import DEFAULT_PROFILE, ProfileIndex, ProfileNotifier, WatchProfile
+
+
+def _item(term, **fields):
+    item = {"site": "Gun2", "title": term, "url": "https://gun2.co.il/item/1", "price_value": 4500,
+            "currency": "ILS", "location": "חיפה", "matched_term": term}
+    item.update(fields)
+    return item
+
+
+@pytest.fixture
+def profiles():
+    return [
+        WatchProfile(DEFAULT_PROFILE, ["glock 19", "cz 75"], telegram_chat_id="100"),
+        WatchProfile("alice", ["Glock-19"], telegram_chat_id="111", filters={"max_price": 5000}),
+        WatchProfile("bob", ["cz 75"], telegram_chat_id="222", filters="site in Yad2"),
+    ]
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    """במקום לשלוח - רושם (chat_id, הודעה) לכל הודעת טלגרם"""
+    sent = []
+    monkeypatch.setattr(notifier, "TELEGRAM_BOT_TOKEN", "123:abc")
+    monkeypatch.setattr(notifier, "TELEGRAM_CHAT_ID", "")
+    monkeypatch.setattr(notifier, "EMAIL_ADDRESS", "")
+    monkeypatch.setattr(Notifier, "_post_telegram", lambda self, message: sent.append((self.telegram_chat_id, message)))
+    return sent
+
+
+def _names(profiles):
+    return [profile.name for profile in profiles]
+
+
+def test_route_uses_terms_and_filters(profiles):
+    index = ProfileIndex(profiles)
+    # אותה מילה בכתיב אחר מגיעה גם ל-alice, כל עוד המחיר בטווח שלה
+    assert _names(index.route(_item("glock 19"))) == [DEFAULT_PROFILE, "alice"]
+    assert _names(index.route(_item("glock 19", price_value=6000))) == [DEFAULT_PROFILE]
+    # bob מחפש cz 75 רק ב-Yad2
+    assert _names(index.route(_item("cz 75"))) == [DEFAULT_PROFILE]
+    assert _names(index.route(_item("cz 75", site="Yad2"))) == [DEFAULT_PROFILE, "bob"]
+    assert index.route(_item("sig p320")) == []
+
+
+def test_route_merges_profiles_of_all_matched_terms(profiles):
+    index = ProfileIndex(profiles)
+    item = _item("glock 19", site="Yad2", matched_terms=["glock 19", "cz 75"])
+    assert _names(index.route(item)) == [DEFAULT_PROFILE, "alice", "bob"]
+
+
+def test_item_without_matched_term_goes_to_accepting_profiles(profiles):
+    index = ProfileIndex(profiles)
+    assert _names(index.route(_item(None, price_value=6000))) == [DEFAULT_PROFILE]
+    assert not index.accepts(_item("sig p320"))
+
+
+def test_default_profile_keeps_plain_seen_key(profiles):
+    default, alice, bob = profiles
+    assert default.seen_key("Gun2:1") == "Gun2:1"
+    assert alice.seen_key("Gun2:1") not in ("Gun2:1", bob.seen_key("Gun2:1"))
+    assert alice.seen_key("Gun2:1") == WatchProfile("alice", ["x"]).seen_key("Gun2:1")
+
+
+def test_channels_are_named_per_profile(profiles, telegram):
+    profile_notifier = ProfileNotifier(profiles)
+    assert profile_notifier.channels() == ["telegram", "telegram:alice", "telegram:bob"]
+    assert profile_notifier.channels_for(profiles[1]) == ["telegram:alice"]
+    # מנוי בלי ערוצים לא יורש את הערוצים מ-config
+    assert ProfileNotifier([WatchProfile("carol", ["glock"])]).channels() == []
+
+    profile_notifier.send_part("telegram:alice", "hi alice")
+    profile_notifier.send_part("telegram", "hi default")
+    assert telegram == [("111", "hi alice"), ("100", "hi default")]
+
+
+class _Seen(set):
+    def add(self, keys):
+        self.update(keys)
+
+
+def test_delivery_reaches_only_routed_profiles(tmp_path, profiles, telegram):
+    index = ProfileIndex(profiles)
+    profile_notifier = ProfileNotifier(profiles)
+    seen = _Seen()
+    item = _item("glock 19", url="https://gun2.co.il/item/7")
+
+    sent, recorded = main.deliver_new_items([item], seen, profile_notifier, Outbox(str(tmp_path / "outbox.json")), index)
+    assert recorded and sent == 2
+    assert sorted(chat_id for chat_id, _ in telegram) == ["100", "111"]
+    item_id = main.generate_item_id(item)
+    assert seen == {item_id, profiles[1].seen_key(item_id)}
+
+    # ריצה שנייה - שני הפרופילים כבר ראו את המודעה
+    telegram.clear()
+    main.deliver_new_items([item], seen, profile_notifier, Outbox(str(tmp_path / "outbox.json")), index)
+    assert telegram == []
@@ -0,0 +1,57 @@
+# test_scraper.py - פלט הסריקה המקבילית
+import threading
+import time
+
+import pytest
+
+import scraper as scraper_module
+from scraper import GunScraper
+
+SITES = ["Slow", "Fast", "Broken"]
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    monkeypatch.setattr(scraper_module, "SCRAPE_WORKERS", 3)
+    scraper = GunScraper(known_listings=set(), terms=["glock"])
+    scraper.sites = {name: {"name": name, "url": f"https://{name}.example/"} for name in SITES}
+    started = threading.Barrier(len(SITES))
+
+    def scrape_site(site):
+        # כל האתרים רצים יחד; האתר הראשון מסיים אחרון
+        started.wait()
+        if site["name"] == "Broken":
+            raise RuntimeError("boom")
+        for i in range(3):
+            scraper._log(site["name"], f"{site['name']} line {i}")
+            time.sleep(0.02 if site["name"] == "Slow" else 0.001)
+        return [{"url": f"https://{site['name']}.example/1", "title": site["name"]}]
+
+    scraper.scrape_site = scrape_site
+    return scraper
+
+
+def _site_lines(output):
+    return [line for line in output.splitlines() if any(name in line for name in SITES)]
+
+
+def test_scrape_all_prints_each_site_as_a_block_in_site_order(scraper, capsys):
+    results = scraper.scrape_all()
+    assert [result["title"] for result in results] == ["Slow", "Fast"]
+    lines = _site_lines(capsys.readouterr().out)
+    assert lines[:4] == ["Slow line 0", "Slow line 1", "Slow line 2", lines[3]]
+    assert "Slow" in lines[3] and "✅" in lines[3]
+    assert lines[4:7] == ["Fast line 0", "Fast line 1", "Fast line 2"]
+    assert "Fast" in lines[7]
+    assert len(lines) == 9 and "Broken" in lines[8] and "boom" in lines[8]
+
+
+def test_streaming_mode_prints_each_site_as_a_block(scraper, capsys):
+    titles = [result["title"] for result in scraper.iter_results()]
+    assert sorted(titles) == ["Fast", "Slow"]
+    lines = _site_lines(capsys.readouterr().out)
+    # לפי סדר הסיום, אבל השורות של כל אתר רצופות
+    for name in ("Slow", "Fast"):
+        start = lines.index(f"{name} line 0")
+        assert lines[start:start + 3] == [f"{name} line {i}" for i in range(3)]
+        assert name in lines[start + 3] and "✅" in lines[start + 3]
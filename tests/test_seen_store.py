@@ -0,0 +1,92 @@
+# test_seen_store.py - מאגר הפריטים שנראו ואינדקס הטביעות שלו
+import json
+import sqlite3
+import time
+
+import seen_store
+from fingerprints import BloomFilter, FingerprintSet, fingerprint
+from seen_store import SeenStore
+
+
+def _store(tmp_path, monkeypatch, legacy=None):
+    json_path = tmp_path / "seen_items.json"
+    if legacy is not None:
+        json_path.write_text(json.dumps({"items": legacy}))
+    monkeypatch.setattr(seen_store, "SEEN_ITEMS_FILE", str(json_path))
+    return SeenStore(str(tmp_path / "seen_items.db"))
+
+
+def test_legacy_json_is_imported_once(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch, legacy=["Gun2:1", "Yad2:abc"])
+    assert "Gun2:1" in store.items and "Yad2:abc" in store.items and len(store.items) == 2
+    store.close()
+
+    # המאגר כבר קיים - קובץ ה-JSON לא מיובא שוב גם אם השתנה
+    (tmp_path / "seen_items.json").write_text(json.dumps({"items": ["Gun2:2"]}))
+    store = SeenStore(str(tmp_path / "seen_items.db"))
+    assert "Gun2:2" not in store.items and len(store.items) == 2
+    store.close()
+
+
+def test_index_is_reused_while_stamp_matches(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch)
+    store.items.add(["Gun2:1"])
+    store.close()
+
+    store = SeenStore(str(tmp_path / "seen_items.db"))
+    assert store.items.index._mmap is not None
+    assert "Gun2:1" in store.items and "Gun2:2" not in store.items
+    store.close()
+
+
+def test_stale_index_is_rebuilt_from_sqlite(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch)
+    store.items.add(["Gun2:1"])
+    store.close()
+
+    # שורה שנוספה בלי לעדכן את קובץ הטביעות - החותמת (מספר שורות, זמן אחרון) כבר לא תואמת
+    conn = sqlite3.connect(str(tmp_path / "seen_items.db"))
+    now = time.time() + 1
+    conn.execute("INSERT INTO items (id, first_seen, last_seen) VALUES (?, ?, ?)", ("Gun2:2", now, now))
+    conn.commit()
+    conn.close()
+
+    store = SeenStore(str(tmp_path / "seen_items.db"))
+    assert store.items.index._mmap is None
+    assert "Gun2:1" in store.items and "Gun2:2" in store.items
+    store.close()
+    assert tuple(FingerprintSet.load(store.items.fp_path).stamp) == (2.0, now)
+
+
+def test_truncated_index_file_is_rebuilt(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch)
+    store.items.add([f"Gun2:{i}" for i in range(100)])
+    store.close()
+
+    fp_path = tmp_path / "seen_items.items.fp"
+    data = fp_path.read_bytes()
+    for size in (0, 10, len(data) - 8):
+        fp_path.write_bytes(data[:size])
+        assert FingerprintSet.load(str(fp_path)) is None
+
+        store = SeenStore(str(tmp_path / "seen_items.db"))
+        assert all(f"Gun2:{i}" in store.items for i in range(100))
+        assert "Gun2:100" not in store.items
+        store.close()
+        assert fp_path.read_bytes() == data
+
+
+def test_bloom_false_positives_fall_through_to_the_sorted_set(tmp_path):
+    keys = [f"Gun2:{i}" for i in range(50)]
+    fp_set = FingerprintSet.from_keys(keys)
+    # מסנן שכל הביטים בו דלוקים - כל טביעה עוברת אותו, והחיפוש הבינארי מכריע
+    fp_set.bloom = BloomFilter(bytearray(b"\xff" * len(fp_set.bloom.bits)), fp_set.bloom.k)
+    assert all(fingerprint(key) in fp_set for key in keys)
+    assert not any(fingerprint(f"Yad2:{i}") in fp_set for i in range(1000))
+
+    path = str(tmp_path / "set.fp")
+    FingerprintSet.from_keys(keys).save(path)
+    loaded = FingerprintSet.load(path)
+    assert all(fingerprint(key) in loaded for key in keys)
+    assert not any(fingerprint(f"Yad2:{i}") in loaded for i in range(1000))
+    loaded.close()
@@ -0,0 +1,76 @@
+# test_structured.py - מודעות מ-__NEXT_DATA__ בדף Yad2 שמור
+import datetime
+import os
+
+import pytest
+import requests
+
+from scraper import GunScraper
+from structured import decode_next_data_listings
+
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "yad2.next-data.html")
+BASE_URL = "https://www.yad2.co.il"
+
+
+@pytest.fixture
+def page():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_decodes_listing_fields(page):
+    listings = {listing["listing_id"]: listing for listing in decode_next_data_listings(page, BASE_URL)}
+    assert set(listings) == {"x7k2p9q1", "b3n8w0re", "m1c5t6ha"}
+
+    glock = listings["x7k2p9q1"]
+    assert glock["title"] == "אקדח גלוק 45 MOS"
+    assert glock["url"] == f"{BASE_URL}/item/x7k2p9q1"
+    assert glock["price"] == 4300
+    assert glock["location"] == "פתח תקווה"
+    assert glock["description"].startswith("גלוק 45 מוס במצב מעולה")
+
+    # מחיר כמחרוזת, מחיר 0 (לא צוין) ותיאור מ-title_2
+    assert listings["b3n8w0re"]["price"] == 6900
+    assert listings["m1c5t6ha"]["price"] is None
+    assert listings["m1c5t6ha"]["title"] == "Glock 45 MOS"
+    assert listings["m1c5t6ha"]["description"] == "כולל כוונת רד דוט"
+
+
+class _FreshCache:
+    """מטמון תגובות שלא מדלג על אף דף"""
+
+    def conditional_headers(self, url):
+        return {}
+
+    def same_version(self, url, response):
+        return False
+
+    def is_unchanged(self, url, response, digest=None):
+        return False
+
+
+def _response(page):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = page.encode("utf-8")
+    response._content_consumed = True
+    response.encoding = "utf-8"
+    response.elapsed = datetime.timedelta(seconds=0.01)
+    return response
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_structured_page_counts_only_matching_listings(page, stream):
+    scraper = GunScraper(known_listings=set())
+    scraper.response_cache = _FreshCache()
+    scraper._fetch_page = lambda url, site: _response(page)
+    scraper.session.get = lambda url, **kwargs: _response(page)
+    site = {"name": "Yad2 נשק", "url": f"{BASE_URL}/products/weapons", "base_url": BASE_URL, "stream_parse": stream}
+
+    results, keys, _, from_dom = scraper._scrape_page(scraper.adapters["yad2"], site, site["url"])
+
+    assert not from_dom
+    assert len(keys) == 3
+    assert sorted(result["listing_id"] for result in results) == ["m1c5t6ha", "x7k2p9q1"]
+    assert scraper.metrics.get(site["name"], "cards") == 3
+    assert scraper.metrics.get(site["name"], "matches") == len(results)